@@ -0,0 +1,236 @@
+"""Asyncio scraper for large competitor sweeps with per-host politeness limits.
+
+`AsyncCollegeScraper` keeps hundreds of fetches in flight from one process while
+capping concurrency and request rate per host, so a crawl of many pages per
+university never hammers a single site. Extraction is shared with the blocking
+`CollegeScraper`, so both produce identical college records.
+
+Requires aiohttp (`pip install aiohttp`). Synchronous callers use
+`scrape_urls()`, which runs the event loop for them.
+"""
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple
+from config import (USER_AGENT, ASYNC_MAX_CONCURRENCY,
+                    PER_HOST_CONCURRENCY, PER_HOST_DELAY, HTTP_CACHE_DIR, KEEPALIVE_TIMEOUT,
+                    POOL_DRAIN_LIMIT)
+from scraper import CollegeScraper, FetchedPage, CHUNK_SIZE
+from http_cache import ResponseCache
+from page_archive import PageArchive
+
+try:
+    import aiohttp
+except Exception:
+    aiohttp = None  # Optional dependency
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def read_bounded_async(stream, max_bytes: int) -> Tuple[bytes, bool]:
+    """Async counterpart of scraper.read_bounded for an aiohttp response stream."""
+    body = bytearray()
+    async for chunk in stream.iter_chunked(CHUNK_SIZE):
+        body += chunk
+        if len(body) > max_bytes:
+            return bytes(body[:max_bytes]), True
+    return bytes(body), False
+
+
+async def discard_body_async(stream, limit: int = POOL_DRAIN_LIMIT):
+    """Async counterpart of http_pool.discard_body: drain an unwanted body so the connection is reused."""
+    drained = 0
+    try:
+        async for chunk in stream.iter_chunked(CHUNK_SIZE):
+            drained += len(chunk)
+            if drained > limit:
+                return
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        pass
+
+
+class HostLimiter:
+    """Caps concurrent requests per host and spaces out request starts to each host."""
+
+    def __init__(self, per_host_concurrency: int = PER_HOST_CONCURRENCY,
+                 min_delay: float = PER_HOST_DELAY):
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        self.min_delay = max(0.0, min_delay)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._next_start: Dict[str, float] = {}
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        """Hold one of the host's request slots, waiting out its minimum delay first."""
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.per_host_concurrency))
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            async with self._locks.setdefault(host, asyncio.Lock()):
+                wait = self._next_start.get(host, 0.0) - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._next_start[host] = loop.time() + self.min_delay
+            yield
+
+
+class AsyncCollegeScraper:
+    """Scrapes college websites concurrently on an asyncio event loop."""
+
+    def __init__(self, max_concurrency: int = ASYNC_MAX_CONCURRENCY,
+                 per_host_concurrency: int = PER_HOST_CONCURRENCY,
+                 per_host_delay: float = PER_HOST_DELAY,
+                 cache_dir: Optional[str] = HTTP_CACHE_DIR, db=None,
+                 archive: Optional[PageArchive] = None):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is required for AsyncCollegeScraper. Install with: pip install aiohttp")
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        self.per_host_delay = per_host_delay
+        # Reuse the blocking scraper's extraction rules, response cache and content digests
+        self.extractor = CollegeScraper(cache_dir=cache_dir, db=db, archive=archive)
+        self.cache = self.extractor.cache
+        self.archive = self.extractor.archive
+        self.retry_policy = self.extractor.retry_policy
+        self.breaker = self.extractor.breaker
+        self.metrics = self.extractor.metrics
+
+    async def scrape_many(self, urls: Iterable[str]) -> AsyncIterator[Tuple[str, Optional[Dict]]]:
+        """Scrape URLs concurrently, yielding (url, college_data) pairs as they complete."""
+        urls = list(urls)
+        limiter = HostLimiter(self.per_host_concurrency, self.per_host_delay)
+        global_slots = asyncio.Semaphore(self.max_concurrency)
+        # Idle connections stay open so later pages on the same host skip the handshake
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency,
+                                         limit_per_host=self.per_host_concurrency,
+                                         keepalive_timeout=KEEPALIVE_TIMEOUT)
+        policy = self.retry_policy
+        timeout = aiohttp.ClientTimeout(sock_connect=policy.connect_timeout, sock_read=policy.read_timeout)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers={'User-Agent': USER_AGENT}) as session:
+            async def run(url):
+                async with global_slots:
+                    # Like CollegeScraper.scrape_many: one bad page doesn't end the sweep
+                    try:
+                        return url, await self._scrape_college(session, limiter, url)
+                    except Exception as e:
+                        logger.error(f"Unexpected error scraping {url}: {e}")
+                        return url, None
+
+            tasks = [asyncio.ensure_future(run(url)) for url in urls]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    yield await next_done
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def _scrape_college(self, session, limiter: HostLimiter, url: str) -> Optional[Dict]:
+        """Fetch and parse one URL with the same retry behaviour as CollegeScraper."""
+        if self.archive is not None and self.archive.replaying:
+            # Nothing to wait on: replay through the blocking scraper off the event loop
+            return await asyncio.to_thread(self.extractor.scrape_college, url)
+
+        with self.metrics.timer(url, 'fetch'):
+            page = await self._fetch_page(session, limiter, url)
+        if page is None:
+            return None
+        if page.record is not None:
+            return page.record
+
+        # Parse off the event loop so fetches keep flowing
+        college_data = await asyncio.to_thread(self.extractor._parse_content, page.content, url)
+        college_data = await asyncio.to_thread(self.extractor._render_if_empty, url, college_data)
+        await asyncio.to_thread(self.extractor.remember, page, college_data)
+        logger.info(f"Successfully scraped {college_data.get('name') or url}")
+        return college_data
+
+    async def _fetch_page(self, session, limiter: HostLimiter, url: str) -> Optional[FetchedPage]:
+        """Fetch one URL, retrying transient failures; a FetchedPage like CollegeScraper.fetch_page's.
+
+        Only the network I/O is done here: the cache lookup, response handling,
+        breaker and metrics are CollegeScraper's, and the steps that touch
+        files (the response cache and archive) run off the event loop.
+        """
+        extractor = self.extractor
+        cached, page = await asyncio.to_thread(extractor._cached_page, url)
+        if page is not None:
+            return page
+
+        metrics = self.metrics
+        host = CollegeScraper._get_domain(url)
+        policy = self.retry_policy
+        for attempt in range(policy.max_retries):
+            if not extractor._begin_attempt(url, host, attempt):
+                return None
+
+            content, truncated = None, False
+            try:
+                try:
+                    async with limiter.slot(host):
+                        started = time.perf_counter()
+                        headers = ResponseCache.conditional_headers(cached)
+                        async with session.get(url, headers=headers) as response:
+                            metrics.add_time(url, 'ttfb', time.perf_counter() - started)
+                            status = response.status
+                            headers = response.headers
+                            if extractor._wants_body(status, headers):
+                                with metrics.timer(url, 'download'):
+                                    content, truncated = await read_bounded_async(response.content,
+                                                                                  extractor.max_page_bytes)
+                                metrics.count(url, 'body_bytes', len(content))
+                            else:
+                                await discard_body_async(response.content)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error, retry_after = str(e) or type(e).__name__, None
+                else:
+                    page, error, retry_after = await asyncio.to_thread(
+                        extractor._handle_response, url, cached, status, headers, content, truncated)
+                    if error is None:
+                        return page
+                if extractor._attempt_failed(url, host, attempt, error):
+                    return None
+            finally:
+                # Frees the half-open probe on cancellation or an unexpected error
+                extractor.breaker.release(host)
+            await asyncio.sleep(policy.delay(attempt, retry_after))
+
+        return None
+
+    async def scrape_all(self, urls: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """Scrape URLs concurrently and return a url -> college_data mapping."""
+        return {url: data async for url, data in self.scrape_many(urls)}
+
+
+def scrape_urls(urls: Iterable[str], **kwargs) -> Dict[str, Optional[Dict]]:
+    """Synchronous wrapper around AsyncCollegeScraper.scrape_all.
+
+    Safe to call from code that is already inside a running event loop: the
+    crawl then runs on its own loop in a helper thread.
+    """
+    scraper = AsyncCollegeScraper(**kwargs)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(scraper.scrape_all(urls))
+
+    result = {}
+    errors = []
+
+    def runner():
+        try:
+            result.update(asyncio.run(scraper.scrape_all(urls)))
+        except BaseException as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=runner)
+    thread.start()
+    thread.join()
+    if errors:
+        # Surface the crawl's failure instead of returning a partial result
+        raise errors[0]
+    return result
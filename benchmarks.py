@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+"""
+Micro-benchmarks for scraper and database hot paths.
+
+Usage:
+    python benchmarks.py parsers [--repeat N]
+    python benchmarks.py dedupe [--repeat N]
+    python benchmarks.py bulk-insert [--repeat N]
+    python benchmarks.py course-search [--repeat N]
+    python benchmarks.py iter-competitors [--repeat N]
+    python benchmarks.py records [--repeat N]
+    python benchmarks.py migrations [--repeat N]
+
+Fixture pages live in fixtures/pages, a page archive (see page_archive.py):
+index.json maps each file to the URL it stands in for, so domain-specific
+parsers still apply. Benchmark a recorded crawl by replaying it with
+SCRAPER_ARCHIVE instead.
+"""
+import argparse
+import csv
+import os
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from course_matcher import CourseMatcherAI
+from database import CollegeDatabase
+from importers import import_from_csv
+from html_parsers import available_backends, make_soup
+from page_archive import PageArchive
+from program_names import dedupe_programs
+from scraper import CollegeScraper
+
+FIXTURE_DIR = Path(__file__).parent / 'fixtures' / 'pages'
+
+
+def load_fixture_pages():
+    """Return a list of (url, html_bytes) for the saved fixture pages."""
+    return list(PageArchive(str(FIXTURE_DIR)).items())
+
+
+def _time_it(func, repeat):
+    """Best-of-`repeat` wall time for func(), in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_parsers(repeat=5):
+    """Compare HTML parser backends on parse + full extraction of the fixture pages."""
+    pages = load_fixture_pages()
+    total_kb = sum(len(body) for _, body in pages) / 1024
+    print(f"Parsing {len(pages)} fixture pages ({total_kb:.0f} KB), best of {repeat}\n")
+    print(f"{'backend':<14}{'parse ms':>10}{'speedup':>10}{'parse+extract ms':>19}{'speedup':>10}")
+
+    baseline = None
+    for backend in reversed(available_backends()):
+        scraper = CollegeScraper(cache_dir=None, parser_backend=backend)
+
+        def parse_only():
+            for _, body in pages:
+                make_soup(body, backend)
+
+        def parse_and_extract():
+            for url, body in pages:
+                scraper._parse_content(body, url)
+
+        parse = _time_it(parse_only, repeat)
+        full = _time_it(parse_and_extract, repeat)
+        if baseline is None:
+            baseline = (parse, full)
+        print(f"{backend:<14}{parse * 1000:>10.1f}{baseline[0] / parse:>9.1f}x"
+              f"{full * 1000:>19.1f}{baseline[1] / full:>9.1f}x")
+
+
+def synthetic_link_page(n_links=10000, n_distinct=2000, seed=42):
+    """A link-heavy page: n_links program anchors drawn from n_distinct names."""
+    rng = random.Random(seed)
+    names = [f"Program {i} in Subject {i % 97}" for i in range(n_distinct)]
+    anchors = []
+    for i in range(n_links):
+        name = rng.choice(names)
+        # Vary case and whitespace so normalisation has work to do
+        if i % 3 == 0:
+            name = name.upper()
+        elif i % 3 == 1:
+            name = name.replace(' ', '\n  ')
+        anchors.append(f'<li><a href="/academics/programs/{i}">{name}</a></li>')
+    return '<html><body><ul>' + '\n'.join(anchors) + '</ul></body></html>'
+
+
+def _quadratic_dedupe(programs):
+    """The list-rebuilding de-duplication the scraper used before dedupe_programs."""
+    out = []
+    for p in programs:
+        p_clean = re.sub(r'\s+', ' ', p).strip()
+        if len(p_clean) > 2 and p_clean.lower() not in [o.lower() for o in out]:
+            out.append(p_clean)
+    return out
+
+
+def bench_dedupe(repeat=5):
+    """De-duplication cost on a synthetic 10k-link page."""
+    html = synthetic_link_page()
+    soup = make_soup(html, 'html.parser')
+    links = soup.find_all('a', href=True)
+    texts = [a.get_text(' ', strip=True) for a in links]
+    print(f"{len(texts)} link texts, {len(dedupe_programs(texts))} distinct programs, best of {repeat}\n")
+
+    quadratic = _time_it(lambda: _quadratic_dedupe(texts), max(1, repeat // 2))
+    linear = _time_it(lambda: dedupe_programs(texts), repeat)
+    strategy = _time_it(lambda: CollegeScraper._programs_from_link_tags(links), repeat)
+    print(f"{'quadratic dedupe':<28}{quadratic * 1000:>10.1f} ms")
+    print(f"{'dedupe_programs':<28}{linear * 1000:>10.1f} ms  ({quadratic / linear:.0f}x faster)")
+    print(f"{'links strategy (end to end)':<28}{strategy * 1000:>10.1f} ms")
+
+
+def synthetic_competitors(n_rows, seed=42):
+    """Competitor rows shaped like an imported CSV (one dict per row)."""
+    rng = random.Random(seed)
+    subjects = ['Computer Science', 'Nursing', 'Law', 'Business', 'Engineering', 'History', 'Art & Design']
+    for i in range(n_rows):
+        yield {
+            'id': f'college_{i}', 'name': f'College {i}', 'city': f'Town {i % 500}',
+            'latitude': f'{rng.uniform(50, 55):.5f}', 'longitude': f'{rng.uniform(-4, 1):.5f}',
+            'programs_list': ', '.join(rng.sample(subjects, 3)),
+            'students': str(rng.randint(500, 30000)), 'tuition_usd': str(rng.randint(5000, 40000)),
+            'website': f'https://college{i}.example.ac.uk',
+        }
+
+
+def bench_bulk_insert(repeat=5, n_rows=100000, n_batch=20000):
+    """Row-at-a-time add_competitor against add_competitors_bulk, and a streamed 100k-row CSV import."""
+    column_map = {'college_id': 'id', 'name': 'name', 'location': 'city', 'latitude': 'latitude',
+                  'longitude': 'longitude', 'programs': 'programs_list', 'enrollment': 'students',
+                  'tuition': 'tuition_usd', 'source_url': 'website'}
+    records = [{'college_id': row['id'], 'name': row['name'], 'location': row['city'],
+                'programs': row['programs_list'].split(', ')} for row in synthetic_competitors(n_batch)]
+    runs = max(1, repeat // 2)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'competitors.csv')
+        with open(csv_path, 'w', newline='', encoding='utf-8') as fh:
+            writer = csv.DictWriter(fh, fieldnames=list(column_map.values()))
+            writer.writeheader()
+            writer.writerows(synthetic_competitors(n_rows))
+
+        with CollegeDatabase(os.path.join(tmp, 'bench.db')) as db:
+            def per_row():
+                for record in records:
+                    db.add_competitor(record)
+            single = _time_it(per_row, runs)
+            bulk = _time_it(lambda: db.add_competitors_bulk(records), runs)
+
+            def import_csv():
+                import_from_csv(csv_path, column_map, db)
+            imported = _time_it(import_csv, runs)
+
+    print(f"{n_batch} competitor rows, best of {runs}\n")
+    print(f"{'add_competitor per row':<28}{single * 1000:>10.1f} ms")
+    print(f"{'add_competitors_bulk':<28}{bulk * 1000:>10.1f} ms  ({single / bulk:.0f}x faster)")
+    print(f"{f'import_from_csv, {n_rows} rows':<28}{imported * 1000:>10.1f} ms  "
+          f"({n_rows / imported:,.0f} rows/s, parsing included)")
+
+
+def synthetic_courses(rng):
+    """A handful of course names drawn from several hundred distinct ones."""
+    levels = ['BSc', 'BA', 'MSc', 'MA', 'HND', 'Foundation', 'Level 3', 'PGCE']
+    subjects = ['Computer Science', 'Data Science', 'Nursing', 'Law', 'Business Management', 'Mechanical Engineering',
+                'History', 'Art & Design', 'Psychology', 'Marine Biology', 'Accounting', 'Sports Science',
+                'Criminology', 'Music Production', 'Games Development', 'Midwifery', 'Architecture', 'Economics']
+    modifiers = ['', ' with Foundation Year', ' (Hons)', ' and Society', ' with Placement', ' Apprenticeship']
+    return [f'{rng.choice(levels)} {rng.choice(subjects)}{rng.choice(modifiers)}' for _ in range(rng.randint(3, 12))]
+
+
+def bench_course_search(repeat=5, n_competitors=20000, queries=('data sceince', 'marine biology', 'criminology')):
+    """Loading every competitor and keyword-matching in Python against the course index."""
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        with CollegeDatabase(os.path.join(tmp, 'bench.db')) as db:
+            db.add_competitors_bulk({'college_id': f'college_{i}', 'name': f'College {i}',
+                                     'programs': synthetic_courses(rng)} for i in range(n_competitors))
+
+            def scan():
+                for query in queries:
+                    [c['college_id'] for c in db.get_all_competitors()
+                     if CourseMatcherAI._find_close_matches([query], [p.lower() for p in c['programs']])]
+
+            def search():
+                for query in queries:
+                    db.search_courses(query, limit=20)
+
+            scanned = _time_it(scan, max(1, repeat // 2))
+            indexed = _time_it(search, repeat)
+            distinct = db._query('SELECT count(*) FROM programs')[0][0]
+
+    print(f"{len(queries)} queries over {n_competitors} competitors ({distinct} distinct courses)\n")
+    print(f"{'full scan + keyword match':<28}{scanned * 1000:>10.1f} ms")
+    print(f"{'search_courses (FTS5)':<28}{indexed * 1000:>10.1f} ms  ({scanned / indexed:.0f}x faster)")
+
+
+def _peak_memory(func):
+    """Peak bytes Python allocates while `func` runs."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_iter_competitors(repeat=5, n_rows=100000):
+    """get_all_competitors against streaming two columns of the same rows with iter_competitors."""
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        with CollegeDatabase(os.path.join(tmp, 'bench.db')) as db:
+            db.add_competitors_bulk({'college_id': f'college_{i}', 'name': f'College {i}',
+                                     'enrollment': rng.randint(500, 30000), 'programs': synthetic_courses(rng),
+                                     'metadata': {'source': 'benchmark', 'row': i}} for i in range(n_rows))
+
+            def load_all():
+                return sum(c['enrollment'] for c in db.get_all_competitors())
+
+            def stream():
+                return sum(c['enrollment'] for c in db.iter_competitors(columns=['college_id', 'enrollment']))
+
+            runs = max(1, repeat // 2)
+            results = [(label, _time_it(func, runs), _peak_memory(func))
+                       for label, func in (('get_all_competitors', load_all), ('iter_competitors', stream))]
+
+    print(f"Sum enrollment over {n_rows} competitors, best of {runs}\n")
+    print(f"{'':<22}{'time ms':>10}{'peak MiB':>10}")
+    for label, seconds, peak in results:
+        print(f"{label:<22}{seconds * 1000:>10.1f}{peak / 2 ** 20:>10.1f}")
+
+
+def bench_records(repeat=5, n_rows=100000):
+    """Memory held by get_all_competitors as dicts against compact records, before and after reading programs."""
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        with CollegeDatabase(path) as db:
+            db.add_competitors_bulk({'college_id': f'college_{i}', 'name': f'College {i}',
+                                     'location': f'Town {i % 500}', 'enrollment': rng.randint(500, 30000),
+                                     'programs': synthetic_courses(rng), 'metadata': {'row': i}}
+                                    for i in range(n_rows))
+
+        results = []
+        for label, compact in (('dicts', False), ('compact records', True)):
+            with CollegeDatabase(path, compact_records=compact) as db:
+                seconds = _time_it(db.get_all_competitors, max(1, repeat // 2))
+                tracemalloc.start()
+                rows = db.get_all_competitors()
+                loaded = tracemalloc.get_traced_memory()[0]
+                sum(len(row['programs']) for row in rows)
+                read = tracemalloc.get_traced_memory()[0]
+                tracemalloc.stop()
+                del rows
+            results.append((label, seconds, loaded, read))
+
+    print(f"get_all_competitors over {n_rows} rows: time, and memory held after loading / after reading programs\n")
+    print(f"{'':<18}{'time ms':>10}{'loaded MiB':>12}{'read MiB':>10}")
+    for label, seconds, loaded, read in results:
+        print(f"{label:<18}{seconds * 1000:>10.1f}{loaded / 2 ** 20:>12.1f}{read / 2 ** 20:>10.1f}")
+
+
+def bench_migrations(repeat=5, n_competitors=50000, comparisons_each=4, n_lookups=200):
+    """Per-competitor comparison and by-URL lookups before and after the index migration, and its cost."""
+    import database
+    rng = random.Random(42)
+    index_migration = database.MIGRATIONS[-1]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        with CollegeDatabase(path) as db:
+            db.add_competitors_bulk({'college_id': f'college_{i}', 'name': f'College {i}',
+                                     'source_url': f'https://college{i}.example.ac.uk'} for i in range(n_competitors))
+            db.save_comparisons_bulk({'competitor_id': f'college_{i % n_competitors}',
+                                      'similarity_score': rng.random(), 'competition_level': 'LOW', 'analysis': ''}
+                                     for i in range(n_competitors * comparisons_each))
+            # Back to the schema from before the index migration
+            with db.transaction() as conn:
+                conn.execute('DROP INDEX idx_comparison_results_competitor')
+                conn.execute('DROP INDEX idx_competitor_colleges_source_url')
+                conn.execute('DELETE FROM schema_version WHERE version = ?', (index_migration[0],))
+
+        picks = rng.sample(range(n_competitors), n_lookups)
+
+        def lookups(db):
+            for i in picks:
+                db.get_comparison_history(f'college_{i}')
+                db.get_competitor_by_url(f'https://college{i}.example.ac.uk')
+
+        # Open without the index migration to time the old plans
+        database.MIGRATIONS = database.MIGRATIONS[:-1]
+        try:
+            with CollegeDatabase(path) as db:
+                before = _time_it(lambda: lookups(db), max(1, repeat // 2))
+        finally:
+            database.MIGRATIONS = database.MIGRATIONS + (index_migration,)
+
+        # Opening the database again applies the migration
+        start = time.perf_counter()
+        with CollegeDatabase(path) as db:
+            migrated = time.perf_counter() - start
+            assert db.schema_version() == index_migration[0]
+            after = _time_it(lambda: lookups(db), repeat)
+
+    print(f"{n_lookups} competitors' comparison history and by-URL lookups; "
+          f"{n_competitors} competitors, {n_competitors * comparisons_each} comparisons\n")
+    print(f"{'schema version ' + str(index_migration[0] - 1):<26}{before * 1000:>10.1f} ms")
+    print(f"{'schema version ' + str(index_migration[0]):<26}{after * 1000:>10.1f} ms  ({before / after:.0f}x faster)")
+    print(f"{'startup running migration':<26}{migrated * 1000:>10.1f} ms (once)")
+
+
+BENCHMARKS = {
+    'parsers': bench_parsers,
+    'dedupe': bench_dedupe,
+    'bulk-insert': bench_bulk_insert,
+    'course-search': bench_course_search,
+    'iter-competitors': bench_iter_competitors,
+    'records': bench_records,
+    'migrations': bench_migrations,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS) + ['all'])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    names = sorted(BENCHMARKS) if args.benchmark == 'all' else [args.benchmark]
+    for name in names:
+        print(f"=== {name} ===")
+        BENCHMARKS[name](repeat=args.repeat)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -23,7 +23,8 @@ class InteractiveCLI:
         print("5. Export report (JSON/CSV)")
         print("6. Generate geographic map")
         print("7. Get strategic recommendations")
-        print("8. Exit")
+        print("8. Search competitor courses")
+        print("9. Exit")
         print("="*60)
     
     def setup_college_data(self):
@@ -130,6 +131,23 @@ class InteractiveCLI:
         for i, rec in enumerate(recommendations, 1):
             print(f"{i}. {rec}")
     
+    def search_courses(self):
+        """Look up which stored competitors offer a course (typos and partial names match)"""
+        query = input("\nCourse name: ").strip()
+        if not query:
+            return
+        
+        results = self.ai.db.search_courses(query, limit=10)
+        if not results:
+            print("No competitor offers a matching course.")
+            return
+        
+        print(f"\nCourses matching '{query}':")
+        for i, result in enumerate(results, 1):
+            competitors = result['competitor_ids']
+            shown = ', '.join(competitors[:5]) + (f" (+{len(competitors) - 5} more)" if len(competitors) > 5 else '')
+            print(f"{i}. {result['name']} — {len(competitors)} competitor(s): {shown}")
+    
     def generate_geographic_map(self):
         """Generate and display geographic map"""
         print("\n--- Geographic Map Options ---")
@@ -181,6 +199,8 @@ class InteractiveCLI:
             elif choice == '7':
                 self.get_recommendations()
             elif choice == '8':
+                self.search_courses()
+            elif choice == '9':
                 print("\nThank you for using College Competition AI!")
                 self.running = False
             else:
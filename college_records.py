@@ -0,0 +1,127 @@
+"""Compact, read-mostly records for college rows.
+
+A row turned into a dict costs a hash table per row plus the decoded
+`programs` list and `metadata` dict, whether or not anything reads them. With
+100k+ competitors those dominate an analysis run's memory. `CompetitorRecord`
+and `MyCollegeRecord` keep one slot per column instead. The JSON columns are
+kept as their raw strings until first accessed and decoded once.
+
+The records are mappings with the same keys as the dicts
+`CollegeDatabase` returns (competitor records also carry `scraped_date`), so
+`record['name']`, `record.get('programs')`, `dict(record)` and `**record` all
+work. Fields are also attributes (`record.name`). Assigning to an existing
+key is allowed. Use `to_dict()` where a real dict is needed, e.g. for
+`json.dumps`.
+
+`CollegeDatabase(compact_records=True)` (or `DB_COMPACT_RECORDS=True`) makes
+the query APIs return them.
+"""
+import json
+from collections.abc import Mapping
+from typing import Dict, Iterable, Sequence
+
+# JSON columns and the value an empty column decodes to
+JSON_DEFAULTS = {'programs': list, 'metadata': dict}
+# Slot a database value is stored in: JSON columns go to their raw-text slot
+_ROW_SLOTS = {name: f'_{name}_json' for name in JSON_DEFAULTS}
+_set = object.__setattr__
+
+
+class CollegeRecord(Mapping):
+    """Base for slotted row records; subclasses set FIELDS and matching __slots__."""
+
+    __slots__ = ('_programs_json', '_metadata_json')
+    FIELDS: Sequence[str] = ()
+
+    def __init__(self, **values):
+        for name, value in values.items():
+            if name not in self.FIELDS:
+                raise TypeError(f"{type(self).__name__} has no field {name!r}")
+            if name in JSON_DEFAULTS and not isinstance(value, (list, dict)):
+                # Raw JSON text: decoded on first access
+                object.__setattr__(self, f'_{name}_json', value)
+            else:
+                object.__setattr__(self, name, value)
+
+    @classmethod
+    def from_row(cls, columns: Iterable[str], row: Iterable):
+        """Build a record from a database row selected with `columns` (only those fields are set)."""
+        # Hot path for large result sets: straight to the slots, JSON columns kept raw
+        record = cls.__new__(cls)
+        for column, value in zip(columns, row):
+            _set(record, _ROW_SLOTS.get(column, column), value)
+        return record
+
+    def __getattr__(self, name):
+        # Only called for unset slots: decode a JSON column the first time it's read
+        if name in JSON_DEFAULTS:
+            try:
+                raw = object.__getattribute__(self, f'_{name}_json')
+            except AttributeError:
+                raise AttributeError(name) from None
+            value = json.loads(raw) if raw else JSON_DEFAULTS[name]()
+            object.__setattr__(self, name, value)
+            object.__delattr__(self, f'_{name}_json')
+            return value
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def _has(self, name: str) -> bool:
+        """Whether a field was selected, without decoding it."""
+        for attr in (name, f'_{name}_json') if name in JSON_DEFAULTS else (name,):
+            try:
+                object.__getattribute__(self, attr)
+                return True
+            except AttributeError:
+                pass
+        return False
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS or not self._has(key):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        if key in JSON_DEFAULTS and self._has(f'_{key}_json'):
+            object.__delattr__(self, f'_{key}_json')
+        object.__setattr__(self, key, value)
+
+    def __iter__(self):
+        return (name for name in self.FIELDS if self._has(name))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        return key in self.FIELDS and self._has(key)
+
+    def to_dict(self) -> Dict:
+        return {name: self[name] for name in self}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{k}={self[k]!r}' for k in self)})"
+
+    def __reduce__(self):
+        return (_rebuild, (type(self), self.to_dict()))
+
+
+def _rebuild(cls, values):
+    return cls(**values)
+
+
+class CompetitorRecord(CollegeRecord):
+    """One competitor_colleges row."""
+
+    FIELDS = ('college_id', 'name', 'location', 'latitude', 'longitude', 'programs', 'tuition',
+              'enrollment', 'acceptance_rate', 'avg_gpa', 'avg_sat', 'avg_act', 'source_url',
+              'metadata', 'scraped_date', 'content_hash')
+    __slots__ = FIELDS
+
+
+class MyCollegeRecord(CollegeRecord):
+    """The my_college row."""
+
+    FIELDS = ('id', 'name', 'location', 'programs', 'tuition', 'enrollment', 'acceptance_rate',
+              'avg_gpa', 'avg_sat', 'avg_act', 'metadata')
+    __slots__ = FIELDS
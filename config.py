@@ -7,6 +7,13 @@ load_dotenv()
 # Database settings
 DB_PATH = os.getenv('DB_PATH', 'college_data.db')
 MY_COLLEGE_ID = os.getenv('MY_COLLEGE_ID', 'my_college')
+# SQLite tuning for the long-lived connection (WAL mode is always on for file databases)
+DB_SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', 'NORMAL').upper()  # 'OFF', 'NORMAL', 'FULL' or 'EXTRA'
+DB_CACHE_SIZE_KB = int(os.getenv('DB_CACHE_SIZE_KB', '65536'))  # page cache per connection
+DB_BATCH_SIZE = int(os.getenv('DB_BATCH_SIZE', '1000'))  # rows per executemany in bulk writes
+DB_BUSY_TIMEOUT = float(os.getenv('DB_BUSY_TIMEOUT', '30'))  # seconds to wait on another writer's lock
+# Return slotted, lazily decoded records instead of dicts from queries (see college_records.py)
+DB_COMPACT_RECORDS = os.getenv('DB_COMPACT_RECORDS', 'False').lower() == 'true'
 
 # API settings
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
@@ -14,9 +21,73 @@ USE_AI_ANALYSIS = os.getenv('USE_AI_ANALYSIS', 'True').lower() == 'true'
 
 # Web scraping settings
 SCRAPING_TIMEOUT = 30
+# On-disk HTTP response cache (set HTTP_CACHE_DIR to an empty string to disable)
+HTTP_CACHE_DIR = os.getenv('HTTP_CACHE_DIR', '.http_cache')
+HTTP_CACHE_TTL = float(os.getenv('HTTP_CACHE_TTL', '3600'))  # seconds before revalidation
+HTTP_CACHE_MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_BYTES', str(500 * 1024 * 1024)))
 MAX_RETRIES = 3
+# Pages are streamed and cut off after this many (decoded) bytes; the head is parsed
+MAX_PAGE_BYTES = int(os.getenv('MAX_PAGE_BYTES', str(2 * 1024 * 1024)))
+# Separate connect/read timeouts so unreachable hosts fail fast
+CONNECT_TIMEOUT = float(os.getenv('CONNECT_TIMEOUT', '5'))
+READ_TIMEOUT = float(os.getenv('READ_TIMEOUT', str(SCRAPING_TIMEOUT)))
+# Exponential backoff with jitter between retries (seconds)
+RETRY_BACKOFF_BASE = float(os.getenv('RETRY_BACKOFF_BASE', '0.5'))
+RETRY_BACKOFF_MAX = float(os.getenv('RETRY_BACKOFF_MAX', '30'))
+# Fail fast on a host after this many consecutive failures, probing again after the reset timeout
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', '60'))
+HTML_PARSER = os.getenv('HTML_PARSER', 'auto')  # 'auto', 'lxml', 'html5lib' or 'html.parser'
+DOMAIN_RULES_PATH = os.getenv('DOMAIN_RULES_PATH',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'domain_rules.json'))
+# Offline page archive (directory or .tar.gz/.zip bundle); empty uses the network
+SCRAPER_ARCHIVE = os.getenv('SCRAPER_ARCHIVE', '')
+SCRAPER_ARCHIVE_MODE = os.getenv('SCRAPER_ARCHIVE_MODE', 'replay')  # 'replay' or 'record'
+MAX_CONCURRENCY = int(os.getenv('MAX_CONCURRENCY', '8'))
+# Keep-alive connection pools: host pools kept open, and connections kept per host
+POOL_MAX_HOSTS = int(os.getenv('POOL_MAX_HOSTS', '32'))
+POOL_MAXSIZE_PER_HOST = int(os.getenv('POOL_MAXSIZE_PER_HOST', str(MAX_CONCURRENCY)))
+# Wait for a pooled connection rather than open one past POOL_MAXSIZE_PER_HOST
+POOL_BLOCK = os.getenv('POOL_BLOCK', 'True').lower() == 'true'
+# Unwanted bodies (error pages, non-HTML) up to this size are drained so the connection is reused
+POOL_DRAIN_LIMIT = int(os.getenv('POOL_DRAIN_LIMIT', str(256 * 1024)))
+# Catalogue crawl per competitor: link depth to follow (0 scrapes only the given page) and page budget
+CRAWL_MAX_DEPTH = int(os.getenv('CRAWL_MAX_DEPTH', '0'))
+CRAWL_MAX_PAGES = int(os.getenv('CRAWL_MAX_PAGES', '25'))
+# Seed that crawl with course pages listed in each site's robots.txt/sitemaps
+USE_SITEMAPS = os.getenv('USE_SITEMAPS', 'False').lower() == 'true'
+SITEMAP_MAX_FILES = int(os.getenv('SITEMAP_MAX_FILES', '20'))  # sitemap files read per site
+# Write per-URL scrape timings and counters here as JSON after run_analysis.py (empty: don't)
+SCRAPE_METRICS_PATH = os.getenv('SCRAPE_METRICS_PATH', '')
+# Per-URL metric entries kept before the oldest are folded into per-host totals, and hosts totalled
+METRICS_MAX_URLS = int(os.getenv('METRICS_MAX_URLS', '10000'))
+METRICS_MAX_HOSTS = int(os.getenv('METRICS_MAX_HOSTS', '1000'))
+# Parser processes for pipelined scraping (0 parses on the fetching threads)
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', '0'))
+
+# Async scraper settings (global cap, plus per-host politeness limits)
+USE_ASYNC_SCRAPER = os.getenv('USE_ASYNC_SCRAPER', 'False').lower() == 'true'
+ASYNC_MAX_CONCURRENCY = int(os.getenv('ASYNC_MAX_CONCURRENCY', '200'))
+PER_HOST_CONCURRENCY = int(os.getenv('PER_HOST_CONCURRENCY', '4'))
+PER_HOST_DELAY = float(os.getenv('PER_HOST_DELAY', '0.5'))
+KEEPALIVE_TIMEOUT = float(os.getenv('KEEPALIVE_TIMEOUT', '30'))  # idle seconds before closing a connection
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
 
+# Headless-browser rendering for JavaScript-only catalogues (needs selenium and Chrome or Firefox)
+USE_RENDERER = os.getenv('USE_RENDERER', 'False').lower() == 'true'
+RENDER_BROWSER = os.getenv('RENDER_BROWSER', 'chrome')  # 'chrome' or 'firefox'
+RENDER_POOL_SIZE = int(os.getenv('RENDER_POOL_SIZE', '2'))  # browsers, and so pages rendering at once
+RENDER_TIMEOUT = float(os.getenv('RENDER_TIMEOUT', '20'))  # page load timeout, seconds
+RENDER_SETTLE_TIME = float(os.getenv('RENDER_SETTLE_TIME', '0.5'))  # wait after load for scripts
+RENDER_MAX_PAGES_PER_BROWSER = int(os.getenv('RENDER_MAX_PAGES_PER_BROWSER', '50'))
+
+# Incremental recrawl: hours between re-fetches of a competitor, adapted to how often it changes
+RECRAWL_DEFAULT_INTERVAL = float(os.getenv('RECRAWL_DEFAULT_INTERVAL', '24'))
+RECRAWL_MIN_INTERVAL = float(os.getenv('RECRAWL_MIN_INTERVAL', '6'))
+RECRAWL_MAX_INTERVAL = float(os.getenv('RECRAWL_MAX_INTERVAL', str(24 * 14)))
+RECRAWL_FAILURE_BACKOFF = float(os.getenv('RECRAWL_FAILURE_BACKOFF', '1'))  # hours, doubled per failure
+RECRAWL_MAX_PER_RUN = int(os.getenv('RECRAWL_MAX_PER_RUN', '0'))  # due re-fetches per run (0 = no cap)
+
 # Comparison thresholds
 SIMILARITY_THRESHOLD = 0.75
 COMPETITION_LEVEL_THRESHOLD = 0.6
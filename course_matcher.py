@@ -14,6 +14,8 @@ import json
 from colleges_config import MY_COLLEGES
 from database import CollegeDatabase
 from scraper import CollegeScraper
+from recrawl_scheduler import RecrawlScheduler
+from config import USE_ASYNC_SCRAPER, CRAWL_MAX_DEPTH, USE_SITEMAPS
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -22,9 +24,15 @@ logger = logging.getLogger(__name__)
 class CourseMatcherAI:
     """AI system for detecting and matching courses across colleges"""
     
-    def __init__(self):
-        self.db = CollegeDatabase()
-        self.scraper = CollegeScraper()
+    def __init__(self, use_async: bool = USE_ASYNC_SCRAPER, full_refresh: bool = False,
+                 db: Optional[CollegeDatabase] = None):
+        # The configured DB_PATH database unless one is given (tests pass a temporary one)
+        self.db = db if db is not None else CollegeDatabase()
+        self.scraper = CollegeScraper(db=self.db)
+        self.use_async = use_async
+        # Competitors are only re-fetched when due unless full_refresh is set
+        self.scheduler = RecrawlScheduler(self.db)
+        self.full_refresh = full_refresh
         self.your_colleges = MY_COLLEGES
     
     def get_your_courses(self) -> Dict[str, List[str]]:
@@ -39,6 +47,74 @@ class CourseMatcherAI:
             your_courses[college_id] = [p.lower().strip() for p in programs if p]
         return your_courses
     
+    def find_competitors_for_course(self, course: str, limit: int = 20) -> List[Dict]:
+        """Stored competitor courses resembling `course`, retrieved from the course index
+        
+        Returns:
+            List of {'name', 'competitor_ids', 'match'} best first, where match is
+            'exact', 'close' (the keyword rule used by match_courses) or 'similar'
+            (shares enough letters to be worth a look, e.g. a misspelling)
+        """
+        wanted = course.lower().strip()
+        results = []
+        for candidate in self.db.search_courses(course, limit):
+            name = candidate['name'].lower().strip()
+            if name == wanted:
+                match = 'exact'
+            elif self._find_close_matches([wanted], [name]):
+                match = 'close'
+            else:
+                match = 'similar'
+            results.append({**candidate, 'match': match})
+        return results
+    
+    def scrape_competitors(self, competitor_urls: List[str]) -> Dict[str, Optional[Dict]]:
+        """Scrape competitor websites concurrently
+        
+        Only competitors due for a recrawl are fetched (see recrawl_scheduler.py);
+        the others are answered from their last scrape. Every URL is fetched
+        with `full_refresh`, and when replaying or recording a page archive.
+        
+        Uses the asyncio scraper when `use_async` is set, otherwise the
+        thread-pooled CollegeScraper.scrape_many. With CRAWL_MAX_DEPTH > 0 or
+        USE_SITEMAPS each competitor's catalogue pages are crawled too
+        (threaded scraper only).
+        
+        Returns:
+            Dict mapping each URL to its scraped college data (None on failure)
+        """
+        if self.scraper.archive is not None:
+            return self._fetch_competitors(competitor_urls)
+        return self.scheduler.refresh(competitor_urls, self._fetch_competitors, full=self.full_refresh)
+    
+    def _fetch_competitors(self, competitor_urls: List[str]) -> Dict[str, Optional[Dict]]:
+        """Fetch every given competitor URL now and store what was scraped"""
+        if CRAWL_MAX_DEPTH > 0 or USE_SITEMAPS:
+            scraped = dict(self.scraper.scrape_many(competitor_urls, max_depth=CRAWL_MAX_DEPTH,
+                                                    use_sitemaps=USE_SITEMAPS))
+        elif self.use_async:
+            from async_scraper import scrape_urls
+            scraped = scrape_urls(competitor_urls, db=self.db, archive=self.scraper.archive)
+        else:
+            scraped = dict(self.scraper.scrape_many(competitor_urls))
+        self._store_scraped(scraped)
+        return scraped
+    
+    def _store_scraped(self, scraped: Dict[str, Optional[Dict]]):
+        """Store each scraped record whole under its URL-derived id
+        
+        With every program and the page's content_hash on the row, the
+        scraper skips parsing the page next run if its bytes haven't changed.
+        """
+        records = [record for record in scraped.values() if record and record.get('college_id')]
+        if not records:
+            return
+        try:
+            with self.db.transaction():
+                self.db.add_competitors_bulk(records)
+        except Exception as e:
+            logger.warning(f"Could not store scraped competitors: {e}")
+    
     def detect_competitor_courses(self, competitor_urls: List[str]) -> Dict[str, Dict]:
         """Scrape competitor websites and extract their courses
         
@@ -50,11 +126,12 @@ class CourseMatcherAI:
         """
         competitor_courses = {}
         
+        # Scrape concurrently, then walk the results in input order so reports are stable
+        logger.info(f"🔍 Scraping courses from {len(competitor_urls)} competitor websites")
+        scraped = self.scrape_competitors(competitor_urls)
+        
         for url in competitor_urls:
-            logger.info(f"🔍 Scraping courses from: {url}")
-            
-            # Scrape the college website
-            college_data = self.scraper.scrape_college(url)
+            college_data = scraped.get(url)
             
             if not college_data:
                 logger.warning(f"⚠️  Could not scrape {url}")
@@ -317,13 +394,29 @@ class CourseMatcherAI:
     def _store_competitors_in_db(self, report: Dict):
         """Store matched competitors in the database
 
-        Handles missing names by falling back to the source URL or a
-        generated identifier so storing won't crash on None values.
+        A competitor scraped this run already has its full record stored
+        (see _store_scraped); only the competition figures are added to its
+        metadata, so its programs and content_hash stay intact. Others are
+        stored from the report, with missing names falling back to the
+        source URL or a generated identifier so storing won't crash on None values.
         """
+        records = []
         for competitor_info in report.get('competitors', []):
             # Safe name and ID generation
             raw_name = competitor_info.get('name') or ''
             source_url = competitor_info.get('url') or ''
+            competition = {
+                'competition_score': competitor_info.get('competition_score'),
+                'exact_matches': competitor_info.get('exact_match_count', 0),
+                'close_matches': competitor_info.get('close_match_count', 0),
+                'competition_level': competitor_info.get('competition_level')
+            }
+            stored = self.db.get_competitor(CollegeScraper._generate_college_id(source_url)) if source_url else None
+            if stored:
+                stored = dict(stored)
+                stored['metadata'] = {**(stored.get('metadata') or {}), **competition}
+                records.append(stored)
+                continue
             if raw_name and isinstance(raw_name, str) and raw_name.strip():
                 name = raw_name.strip()
             elif source_url:
@@ -341,19 +434,21 @@ class CourseMatcherAI:
                 'location': competitor_info.get('location') or 'Unknown',
                 'programs': competitor_info.get('unique_to_competitor', []),
                 'source_url': source_url,
-                'metadata': {
-                    'competition_score': competitor_info.get('competition_score'),
-                    'exact_matches': competitor_info.get('exact_match_count', 0),
-                    'close_matches': competitor_info.get('close_match_count', 0),
-                    'competition_level': competitor_info.get('competition_level')
-                }
+                'metadata': competition
             }
 
-            try:
-                self.db.add_competitor(competitor_data)
-                logger.info(f"✓ Stored {name} in database")
-            except Exception as e:
-                logger.warning(f"Could not store {name}: {e}")
+            records.append(competitor_data)
+
+        # One transaction for every row and priority instead of a commit per competitor
+        try:
+            with self.db.transaction():
+                self.db.add_competitors_bulk(records)
+                for record in records:
+                    # Competitors that compete hardest are recrawled first next run
+                    self.scheduler.set_priority(record['source_url'], record['metadata'].get('competition_score'))
+            logger.info(f"✓ Stored {len(records)} competitors in database")
+        except Exception as e:
+            logger.warning(f"Could not store competitors: {e}")
     
     def print_report(self, report: Dict):
         """Print formatted competition analysis report"""
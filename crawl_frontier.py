@@ -0,0 +1,186 @@
+"""Bounded multi-page crawl of a competitor's course catalogue.
+
+A college's home page rarely lists every course; the full list sits a few
+links deep on program indexes, A-Z pages and department listings.
+`CatalogueCrawler` starts at the given page, follows only same-site links
+that look like catalogue pages, and merges the programs from every page it
+visits into the start page's record.
+
+The `CrawlFrontier` keeps the crawl bounded: URLs are normalised and
+de-duplicated, links deeper than `max_depth` are dropped and at most
+`max_pages` pages are fetched. Pages at the same depth are fetched
+concurrently.
+"""
+import logging
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urlparse, urlunparse, parse_qsl, urlencode
+from config import CRAWL_MAX_DEPTH, CRAWL_MAX_PAGES, MAX_CONCURRENCY
+from program_names import dedupe_programs
+
+logger = logging.getLogger(__name__)
+
+# Link text or URL path words that mark a catalogue page worth following
+CATALOGUE_KEYWORDS = re.compile(
+    r'program|major|degree|course|academic|department|subject|study|studies|'
+    r'undergraduate|graduate|postgraduate|catalog|a-z|a-to-z',
+    re.IGNORECASE,
+)
+# Links to files that are never HTML catalogue pages
+SKIP_EXTENSIONS = ('.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.zip',
+                   '.jpg', '.jpeg', '.png', '.gif', '.svg', '.mp4', '.mp3', '.ics')
+# Query parameters that only track clicks and would make duplicate URLs look distinct
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid')
+
+
+def normalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """Absolute, canonical form of a (possibly relative) link; None if it isn't http(s).
+
+    Lowercases scheme and host, drops default ports, fragments, tracking
+    parameters and trailing slashes, and sorts the remaining query string.
+    """
+    url = (url or '').strip()
+    if base:
+        url = urljoin(base, url)
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    if scheme not in ('http', 'https') or not parsed.hostname:
+        return None
+    host = parsed.hostname.lower()
+    if parsed.port and parsed.port != {'http': 80, 'https': 443}[scheme]:
+        host = f"{host}:{parsed.port}"
+    path = re.sub(r'/{2,}', '/', parsed.path).rstrip('/')
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+                             if not k.lower().startswith(TRACKING_PARAMS)))
+    return urlunparse((scheme, host, path, '', query, ''))
+
+
+def site_domain(url: str) -> str:
+    """Host without 'www.', used to keep the crawl on the competitor's own site."""
+    host = (urlparse(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def is_catalogue_link(url: str, text: str = '') -> bool:
+    """Whether a link looks like a program index, A-Z list or department page."""
+    path = urlparse(url).path.lower()
+    if path.endswith(SKIP_EXTENSIONS):
+        return False
+    return bool(CATALOGUE_KEYWORDS.search(path) or CATALOGUE_KEYWORDS.search(text or ''))
+
+
+class CrawlFrontier:
+    """Breadth-first queue of URLs to visit, bounded by depth and page budget."""
+
+    def __init__(self, start_url: str, max_depth: int = CRAWL_MAX_DEPTH,
+                 max_pages: int = CRAWL_MAX_PAGES):
+        self.max_depth = max(0, max_depth)
+        self.max_pages = max(1, max_pages)
+        self.start_url = normalize_url(start_url) or start_url
+        self.domain = site_domain(self.start_url)
+        self._seen: Set[str] = {self.start_url}
+        self._queue: Deque[Tuple[str, int]] = deque([(self.start_url, 0)])
+
+    def __len__(self):
+        return len(self._queue)
+
+    @property
+    def scheduled(self) -> int:
+        """URLs accepted so far, including those already visited."""
+        return len(self._seen)
+
+    def in_scope(self, url: str) -> bool:
+        """Same site as the start page, including its subdomains (e.g. catalog.example.edu)."""
+        domain = site_domain(url)
+        return domain == self.domain or domain.endswith('.' + self.domain)
+
+    def add(self, url: str, depth: int, base: Optional[str] = None) -> bool:
+        """Queue a link found at `depth - 1`; returns False if it was dropped."""
+        if depth > self.max_depth or len(self._seen) >= self.max_pages:
+            return False
+        url = normalize_url(url, base)
+        if url is None or url in self._seen or not self.in_scope(url):
+            return False
+        self._seen.add(url)
+        self._queue.append((url, depth))
+        return True
+
+    def seed(self, url: str) -> bool:
+        """Queue a known catalogue page (e.g. from a sitemap) one level below the start page.
+
+        Seeds are taken even when `max_depth` is 0; only links found on them
+        are subject to the depth limit.
+        """
+        if len(self._seen) >= self.max_pages:
+            return False
+        url = normalize_url(url)
+        if url is None or url in self._seen or not self.in_scope(url):
+            return False
+        self._seen.add(url)
+        self._queue.append((url, 1))
+        return True
+
+    def next_level(self) -> List[Tuple[str, int]]:
+        """Pop every queued URL at the shallowest queued depth."""
+        if not self._queue:
+            return []
+        depth = self._queue[0][1]
+        level = []
+        while self._queue and self._queue[0][1] == depth:
+            level.append(self._queue.popleft())
+        return level
+
+
+class CatalogueCrawler:
+    """Crawls one competitor site breadth-first and merges the programs found."""
+
+    def __init__(self, scraper, max_depth: int = CRAWL_MAX_DEPTH, max_pages: int = CRAWL_MAX_PAGES,
+                 max_concurrency: int = MAX_CONCURRENCY):
+        self.scraper = scraper
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.max_concurrency = max(1, max_concurrency)
+
+    def crawl(self, url: str, seeds: Iterable[str] = ()) -> Optional[Dict]:
+        """Record for the start page with programs merged from the catalogue pages below it.
+
+        `seeds` are catalogue pages already known to exist (see sitemap.py);
+        they are fetched ahead of the links found on the start page.
+        Returns None if the start page itself could not be fetched.
+        """
+        frontier = CrawlFrontier(url, self.max_depth, self.max_pages)
+        for seed in seeds:
+            frontier.seed(seed)
+        record = None
+        programs: List[str] = []
+        visited = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            while True:
+                level = frontier.next_level()
+                if not level:
+                    break
+                # Fetch a whole level at once; results are merged in discovery order.
+                # The start page is fetched as given so its record keeps the caller's URL.
+                fetch_urls = [url if depth == 0 else page_url for page_url, depth in level]
+                results = list(executor.map(self.scraper._scrape_page_with_links, fetch_urls))
+                for (page_url, depth), (page_record, links) in zip(level, results):
+                    if page_record is None:
+                        if depth == 0:
+                            return None
+                        continue
+                    visited += 1
+                    if depth == 0:
+                        record = page_record
+                    programs.extend(page_record.get('programs') or [])
+                    for href, text in links:
+                        if is_catalogue_link(urljoin(page_url, href), text):
+                            frontier.add(href, depth + 1, base=page_url)
+
+        record = dict(record)
+        record['programs'] = dedupe_programs(programs)
+        logger.info(f"Crawled {visited} page(s) from {url}: {len(record['programs'])} programs")
+        return record
+
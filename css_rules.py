@@ -0,0 +1,96 @@
+"""Precompiled CSS selector rules that can be matched during a single tree walk.
+
+`soup.select(selector)` walks the whole document for every selector. To run
+many selectors in one pass, each rule is compiled once with soupsieve and
+indexed by a cheap necessary condition on its rightmost compound (a class,
+an attribute or a tag name). While walking the tree, only rules whose key is
+present on the current tag are matched properly.
+"""
+import re
+from typing import Iterable, List
+import soupsieve as sv
+
+# Rightmost compound made only of an optional tag name, classes and [attr] tests
+_SIMPLE_COMPOUND = re.compile(r'^([a-zA-Z][\w-]*)?((?:\.[\w-]+)*)((?:\[[\w-]+\])*)$')
+
+
+class SelectorRule:
+    """A compiled CSS selector plus the index key used to pre-filter tags."""
+
+    __slots__ = ('selector', 'matcher', 'index_key')
+
+    def __init__(self, selector: str):
+        self.selector = selector
+        self.matcher = sv.compile(selector)
+        self.index_key = self._index_key(selector)
+
+    def match(self, tag) -> bool:
+        return self.matcher.match(tag)
+
+    @staticmethod
+    def _index_key(selector: str):
+        """('class'|'attr'|'name', value) for simple selectors, else None (always test)."""
+        parts = selector.split()
+        if ',' in selector or not parts:
+            return None
+        m = _SIMPLE_COMPOUND.match(parts[-1])
+        if not m:
+            return None
+        classes = [c for c in m.group(2).split('.') if c]
+        attrs = re.findall(r'\[([\w-]+)\]', m.group(3))
+        if classes:
+            # Compared lowercased: soupsieve matches classes case-insensitively in quirks mode
+            return 'class', classes[0].lower()
+        if attrs:
+            return 'attr', attrs[0].lower()
+        if m.group(1):
+            return 'name', m.group(1).lower()
+        return None
+
+
+class SelectorIndex:
+    """A list of rules indexed for fast per-tag matching."""
+
+    def __init__(self, rules: Iterable[SelectorRule]):
+        self.rules: List[SelectorRule] = list(rules)
+        self._by_class = {}
+        self._by_attr = {}
+        self._by_name = {}
+        self._always = []
+        for i, rule in enumerate(self.rules):
+            key = rule.index_key
+            if key is None:
+                self._always.append(i)
+            else:
+                kind, value = key
+                bucket = {'class': self._by_class, 'attr': self._by_attr, 'name': self._by_name}[kind]
+                bucket.setdefault(value, []).append(i)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def matching(self, tag) -> List[int]:
+        """Indexes of the rules that match `tag`."""
+        candidates = list(self._always)
+        by_name = self._by_name.get(tag.name)
+        if by_name:
+            candidates.extend(by_name)
+        attrs = tag.attrs
+        if attrs:
+            if self._by_attr:
+                for attr in attrs:
+                    hit = self._by_attr.get(attr)
+                    if hit:
+                        candidates.extend(hit)
+            classes = attrs.get('class')
+            if classes and self._by_class:
+                if isinstance(classes, str):
+                    classes = classes.split()
+                for cls in classes:
+                    hit = self._by_class.get(cls.lower())
+                    if hit:
+                        candidates.extend(hit)
+        if not candidates:
+            return candidates
+        rules = self.rules
+        return [i for i in sorted(set(candidates)) if rules[i].match(tag)]
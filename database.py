@@ -1,22 +1,249 @@
-"""Database management for college data storage and retrieval"""
+"""Database management for college data storage and retrieval
+
+Each CollegeDatabase keeps one long-lived SQLite connection in WAL mode,
+shared by all threads behind a re-entrant lock. Every write method runs in
+`transaction()`, so calling them inside an outer `with db.transaction():`
+block commits all the rows at once instead of once per row.
+"""
 import sqlite3
 import json
+import logging
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
-from config import DB_PATH, MY_COLLEGE_ID
+from itertools import islice
+from typing import Iterable, Iterator, List, Dict, Optional
+from config import (DB_PATH, MY_COLLEGE_ID, DB_SYNCHRONOUS, DB_CACHE_SIZE_KB, DB_BUSY_TIMEOUT, DB_BATCH_SIZE,
+                    DB_COMPACT_RECORDS)
+from college_records import CompetitorRecord, MyCollegeRecord
+from program_names import normalize_program_name, program_key
+
+logger = logging.getLogger(__name__)
+
+SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+COMPETITOR_UPSERT = '''
+    INSERT OR REPLACE INTO competitor_colleges
+    (college_id, name, location, latitude, longitude, programs, tuition, enrollment,
+     acceptance_rate, avg_gpa, avg_sat, avg_act, source_url, metadata, content_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+COMPARISON_INSERT = '''
+    INSERT INTO comparison_results
+    (competitor_id, similarity_score, competition_level, analysis)
+    VALUES (?, ?, ?, ?)
+'''
+
+# Programs are also stored normalised: one `programs` row per distinct name (keyed by
+# program_key) and join rows per college, so program questions are index lookups
+CRAWL_SCHEDULE_UPSERT = '''
+    INSERT OR REPLACE INTO crawl_schedule
+    (source_url, scraped_date, next_due, interval_hours, fingerprint, checks, changes,
+     failures, priority, last_record)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+PROGRAM_INSERT = 'INSERT OR IGNORE INTO programs (name, name_key) VALUES (?, ?)'
+COMPETITOR_PROGRAM_INSERT = '''
+    INSERT OR IGNORE INTO competitor_programs (competitor_id, program_id, position)
+    SELECT ?, id, ? FROM programs WHERE name_key = ?
+'''
+MY_COLLEGE_PROGRAM_INSERT = '''
+    INSERT OR IGNORE INTO my_college_programs (college_id, program_id, position)
+    SELECT ?, id, ? FROM programs WHERE name_key = ?
+'''
+# Join table -> (its college id column, insert statement)
+PROGRAM_JOINS = {
+    'competitor_programs': ('competitor_id', COMPETITOR_PROGRAM_INSERT),
+    'my_college_programs': ('college_id', MY_COLLEGE_PROGRAM_INSERT),
+}
+
+# Columns iter_competitors can return, in table order; the JSON ones are decoded only when asked for
+COMPETITOR_COLUMNS = CompetitorRecord.FIELDS
+JSON_COLUMNS = ('programs', 'metadata')
+# iter_competitors range filters: filter name -> column, each given as (low, high) with None for open ends
+RANGE_FILTERS = {'enrollment': 'enrollment', 'tuition': 'tuition', 'scraped_date': 'scraped_date'}
+
+# Full-text index over program names: an external-content FTS5 table on programs.name_key,
+# kept in step by triggers, so every INSERT into programs (from any write path) is indexed
+COURSE_INDEX_TABLES = [
+    '''CREATE VIRTUAL TABLE course_index USING fts5(
+        name_key, content='programs', content_rowid='id', tokenize='trigram')''',
+    '''CREATE TRIGGER IF NOT EXISTS programs_course_index_insert AFTER INSERT ON programs BEGIN
+        INSERT INTO course_index (rowid, name_key) VALUES (new.id, new.name_key);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS programs_course_index_delete AFTER DELETE ON programs BEGIN
+        INSERT INTO course_index (course_index, rowid, name_key) VALUES ('delete', old.id, old.name_key);
+    END''',
+]
+
+
+def like_pattern(text: str) -> str:
+    """LIKE pattern (used with ESCAPE '\\') matching values that contain `text` literally"""
+    return '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def trigram_query(text: str) -> str:
+    """FTS5 query matching any trigram of `text`; bm25 ranks names sharing the most trigrams first"""
+    key = program_key(text)
+    trigrams = dict.fromkeys(key[i:i + 3] for i in range(len(key) - 2))
+    return ' OR '.join('"' + gram.replace('"', '""') + '"' for gram in trigrams)
+
+
+def program_rows(programs) -> List[tuple]:
+    """(position, display name, key) for each distinct non-empty program name, in order"""
+    rows = []
+    seen = set()
+    for name in programs or []:
+        if not isinstance(name, str):
+            continue
+        cleaned = normalize_program_name(name)
+        key = program_key(cleaned)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        rows.append((len(rows), cleaned, key))
+    return rows
+
 
 class CollegeDatabase:
     """Manages college data in SQLite database"""
     
-    def __init__(self, db_path: str = DB_PATH):
+    def __init__(self, db_path: str = DB_PATH, compact_records: bool = DB_COMPACT_RECORDS):
         self.db_path = db_path
-        self.init_database()
+        # Query APIs return slotted CompetitorRecord/MyCollegeRecord objects instead of dicts
+        self.compact_records = compact_records
+        # One connection for the object's lifetime; the lock serialises threads and
+        # is held for a whole transaction so other threads' statements can't interleave
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._conn = self._connect()
+        # Set by init_database: False when this SQLite lacks FTS5 or the trigram tokenizer
+        self.has_course_index = False
+        try:
+            self.init_database()
+        except BaseException:
+            self._conn.close()
+            raise
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the connection in autocommit mode (transactions are explicit) and tune it"""
+        conn = sqlite3.connect(self.db_path, timeout=DB_BUSY_TIMEOUT, check_same_thread=False,
+                               isolation_level=None)
+        if self.db_path != ':memory:':
+            # Readers don't block the writer, and commits append to the log instead of rewriting pages
+            conn.execute('PRAGMA journal_mode=WAL')
+        # NORMAL is durable in WAL mode except for the last commits on power loss, and skips most fsyncs
+        if DB_SYNCHRONOUS not in SYNCHRONOUS_MODES:
+            raise ValueError(f"DB_SYNCHRONOUS must be one of {', '.join(SYNCHRONOUS_MODES)}")
+        conn.execute(f'PRAGMA synchronous={DB_SYNCHRONOUS}')
+        conn.execute(f'PRAGMA cache_size={-abs(DB_CACHE_SIZE_KB)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+    
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block of statements atomically with a single commit
+        
+        Nested blocks become savepoints: an exception rolls back only the
+        innermost block, and nothing is committed until the outermost exits.
+        """
+        with self._lock:
+            depth = self._depth
+            self._conn.execute('BEGIN' if depth == 0 else f'SAVEPOINT sp{depth}')
+            self._depth += 1
+            try:
+                yield self._conn
+            except BaseException:
+                self._depth -= 1
+                if depth == 0:
+                    self._conn.execute('ROLLBACK')
+                else:
+                    self._conn.execute(f'ROLLBACK TO sp{depth}')
+                    self._conn.execute(f'RELEASE sp{depth}')
+                raise
+            self._depth -= 1
+            self._conn.execute('COMMIT' if depth == 0 else f'RELEASE sp{depth}')
+    
+    def _query(self, sql: str, params=()) -> List[tuple]:
+        """Run a read and fetch every row"""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+    
+    def close(self):
+        """Close the connection (WAL contents are checkpointed into the database file)"""
+        with self._lock:
+            self._conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
     
     def init_database(self):
-        """Initialize database tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """Create the base tables and bring the schema up to date, all in one transaction"""
+        with self.transaction() as conn:
+            self._create_tables(conn.cursor())
+            self.migrate(conn)
+            self.has_course_index = self._create_course_index(conn)
+    
+    @staticmethod
+    def migrate(conn: sqlite3.Connection) -> List[int]:
+        """Apply the MIGRATIONS newer than the recorded schema version; returns the versions applied
+        
+        Must run inside a transaction, so a failing step leaves the database
+        as it was. Steps are idempotent: databases that predate the
+        schema_version table already have some of the changes, and every
+        step is re-run against them safely.
+        """
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        current = conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+        if current > SCHEMA_VERSION:
+            logger.warning(f"Database schema version {current} is newer than this code's ({SCHEMA_VERSION})")
+        applied = []
+        for version, description, step in MIGRATIONS:
+            if version <= current:
+                continue
+            logger.info(f"Migrating database to schema version {version}: {description}")
+            step(conn)
+            conn.execute('INSERT OR REPLACE INTO schema_version (version, description) VALUES (?, ?)',
+                         (version, description))
+            applied.append(version)
+        return applied
+    
+    def schema_version(self) -> int:
+        """The latest migration applied to this database"""
+        return self._query('SELECT COALESCE(MAX(version), 0) FROM schema_version')[0][0]
+    
+    @staticmethod
+    def _create_course_index(conn: sqlite3.Connection) -> bool:
+        """Create (and on first creation fill) the FTS5 course index; False if FTS5/trigram is unavailable
         
+        Not a migration: whether it can exist depends on the SQLite build
+        opening the file, so it is checked on every startup.
+        """
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'course_index'").fetchone():
+            return True
+        try:
+            for statement in COURSE_INDEX_TABLES:
+                conn.execute(statement)
+        except sqlite3.OperationalError:
+            # Older SQLite builds: search_courses falls back to LIKE over programs
+            return False
+        conn.execute("INSERT INTO course_index (course_index) VALUES ('rebuild')")
+        return True
+    
+    @staticmethod
+    def _create_tables(cursor: sqlite3.Cursor):
+        """The base schema; later additions are MIGRATIONS"""
         # My college data table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS my_college (
@@ -69,48 +296,55 @@ class CollegeDatabase:
                 FOREIGN KEY (competitor_id) REFERENCES competitor_colleges(college_id)
             )
         ''')
-        
-        conn.commit()
-        conn.close()
     
     def add_my_college(self, college_data: Dict):
         """Add or update my college data"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO my_college 
-            (id, name, location, programs, tuition, enrollment, acceptance_rate, 
-             avg_gpa, avg_sat, avg_act, metadata)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            MY_COLLEGE_ID,
-            college_data.get('name'),
-            college_data.get('location'),
-            json.dumps(college_data.get('programs', [])),
-            college_data.get('tuition'),
-            college_data.get('enrollment'),
-            college_data.get('acceptance_rate'),
-            college_data.get('avg_gpa'),
-            college_data.get('avg_sat'),
-            college_data.get('avg_act'),
-            json.dumps(college_data.get('metadata', {}))
-        ))
-        
-        conn.commit()
-        conn.close()
+        with self.transaction() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO my_college 
+                (id, name, location, programs, tuition, enrollment, acceptance_rate, 
+                 avg_gpa, avg_sat, avg_act, metadata)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                MY_COLLEGE_ID,
+                college_data.get('name'),
+                college_data.get('location'),
+                json.dumps(college_data.get('programs', [])),
+                college_data.get('tuition'),
+                college_data.get('enrollment'),
+                college_data.get('acceptance_rate'),
+                college_data.get('avg_gpa'),
+                college_data.get('avg_sat'),
+                college_data.get('avg_act'),
+                json.dumps(college_data.get('metadata', {}))
+            ))
+            self._index_programs(conn, 'my_college_programs',
+                                 [(MY_COLLEGE_ID, college_data.get('programs', []))])
     
     def add_competitor(self, college_data: Dict):
         """Add or update competitor college data"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self.transaction() as conn:
+            conn.execute(COMPETITOR_UPSERT, self._competitor_params(college_data))
+            self._index_programs(conn, 'competitor_programs',
+                                 [(college_data.get('college_id'), college_data.get('programs', []))])
+    
+    def add_competitors_bulk(self, colleges: Iterable[Dict], batch_size: int = DB_BATCH_SIZE) -> int:
+        """Add or update many competitors in one transaction; returns the number of rows written
         
-        cursor.execute('''
-            INSERT OR REPLACE INTO competitor_colleges 
-            (college_id, name, location, latitude, longitude, programs, tuition, enrollment, 
-             acceptance_rate, avg_gpa, avg_sat, avg_act, source_url, metadata)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        `colleges` is consumed lazily and written `batch_size` rows per
+        executemany, so a generator over a large file never has to fit in memory.
+        """
+        def index_batch(conn, batch):
+            # Params tuples: college_id first, programs JSON sixth
+            self._index_programs(conn, 'competitor_programs',
+                                 [(params[0], json.loads(params[5])) for params in batch])
+        
+        return self._write_batches(COMPETITOR_UPSERT, map(self._competitor_params, colleges), batch_size,
+                                   after_batch=index_batch)
+    
+    @staticmethod
+    def _competitor_params(college_data: Dict) -> tuple:
+        return (
             college_data.get('college_id'),
             college_data.get('name'),
             college_data.get('location'),
@@ -124,68 +358,327 @@ class CollegeDatabase:
             college_data.get('avg_sat'),
             college_data.get('avg_act'),
             college_data.get('source_url'),
-            json.dumps(college_data.get('metadata', {}))
-        ))
+            json.dumps(college_data.get('metadata', {})),
+            college_data.get('content_hash')
+        )
+    
+    def _write_batches(self, sql: str, params: Iterable[tuple], batch_size: int,
+                       after_batch=None) -> int:
+        """executemany `sql` over `params` in batches, all inside one transaction
+        
+        `after_batch(conn, batch)` runs after each batch is written.
+        """
+        params = iter(params)
+        written = 0
+        with self.transaction() as conn:
+            while True:
+                batch = list(islice(params, max(1, batch_size)))
+                if not batch:
+                    break
+                conn.executemany(sql, batch)
+                if after_batch is not None:
+                    after_batch(conn, batch)
+                written += len(batch)
+        return written
+    
+    @staticmethod
+    def _index_programs(conn: sqlite3.Connection, table: str, colleges: List[tuple]):
+        """Replace the rows in join `table` for each (college id, programs) pair
+        
+        A college id given twice keeps only its last programs, matching the
+        upsert of its row, which also leaves the last one in place.
+        """
+        column, join_insert = PROGRAM_JOINS[table]
+        latest = dict(colleges)
+        conn.executemany(f'DELETE FROM {table} WHERE {column} = ?', [(college_id,) for college_id in latest])
+        joins = []
+        names = []
+        for college_id, programs in latest.items():
+            for position, name, key in program_rows(programs):
+                names.append((name, key))
+                joins.append((college_id, position, key))
+        conn.executemany(PROGRAM_INSERT, names)
+        conn.executemany(join_insert, joins)
+    
+    def get_competitor(self, college_id: str) -> Optional[Dict]:
+        """Get a single competitor college by its college_id"""
+        rows = self._competitors('FROM competitor_colleges cc WHERE cc.college_id = ?', (college_id,))
         
-        conn.commit()
-        conn.close()
+        return rows[0] if rows else None
     
     def get_my_college(self) -> Optional[Dict]:
         """Get my college data"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        if self.compact_records:
+            rows = self._query(f'SELECT {", ".join(MyCollegeRecord.FIELDS)} FROM my_college WHERE id = ?',
+                               (MY_COLLEGE_ID,))
+            return MyCollegeRecord.from_row(MyCollegeRecord.FIELDS, rows[0]) if rows else None
         
-        cursor.execute('SELECT * FROM my_college WHERE id = ?', (MY_COLLEGE_ID,))
-        row = cursor.fetchone()
-        conn.close()
+        rows = self._query('SELECT * FROM my_college WHERE id = ?', (MY_COLLEGE_ID,))
         
-        if not row:
+        if not rows:
             return None
         
-        return self._row_to_dict(row, 'my_college')
+        return self._row_to_dict(rows[0], 'my_college')
+    
+    def get_competitor_by_url(self, source_url: str) -> Optional[Dict]:
+        """Get the most recently scraped competitor with this source URL"""
+        rows = self._competitors('FROM competitor_colleges cc WHERE cc.source_url = ? '
+                                 'ORDER BY cc.scraped_date DESC LIMIT 1', (source_url,))
+        
+        return rows[0] if rows else None
     
     def get_all_competitors(self) -> List[Dict]:
         """Get all competitor colleges"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM competitor_colleges')
-        rows = cursor.fetchall()
-        conn.close()
+        return self._competitors('FROM competitor_colleges cc')
+    
+    def _competitors(self, sql_from: str, params=()) -> List[Dict]:
+        """Competitor rows for a FROM/WHERE clause (the table aliased cc) as dicts or compact records"""
+        if self.compact_records:
+            rows = self._query(f'SELECT {", ".join("cc." + c for c in COMPETITOR_COLUMNS)} {sql_from}', params)
+            return [CompetitorRecord.from_row(COMPETITOR_COLUMNS, row) for row in rows]
         
+        rows = self._query(f'SELECT cc.* {sql_from}', params)
         return [self._row_to_dict(row, 'competitor_colleges') for row in rows]
+
+    def iter_competitors(self, filters: Optional[Dict] = None, columns: Optional[Iterable[str]] = None,
+                         batch_size: int = DB_BATCH_SIZE) -> Iterator[Dict]:
+        """Yield competitors matching `filters` one at a time, reading `batch_size` rows per query
+        
+        Pages are fetched by keyset (id > last id seen), so each query starts
+        where the previous one stopped and memory stays flat however many rows
+        match. Filters are applied in SQL:
+        
+        - location: substring of the location, case-insensitive
+        - bbox: (south, west, north, east) in degrees; west > east wraps the antimeridian
+        - enrollment, tuition, scraped_date: (low, high) inclusive, None for an open end;
+          scraped_date bounds may be datetimes or 'YYYY-MM-DD HH:MM:SS' strings
+        
+        `columns` limits each dict to those keys (all of COMPETITOR_COLUMNS by
+        default); programs and metadata JSON is only decoded when selected.
+        With compact_records, CompetitorRecords with only those fields are
+        yielded instead, and their JSON is decoded on first access.
+        
+        Bad arguments (batch_size < 1, unknown columns or filters) raise
+        ValueError straight away, not on the first row.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+        columns = list(dict.fromkeys(columns or COMPETITOR_COLUMNS))
+        unknown = [c for c in columns if c not in COMPETITOR_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown competitor column(s): {', '.join(unknown)}")
+        where, params = self._competitor_filters(filters or {})
+        sql = (f"SELECT id, {', '.join(columns)} FROM competitor_colleges "
+               f"WHERE id > ?{''.join(' AND ' + clause for clause in where)} ORDER BY id LIMIT ?")
+        return self._iter_competitor_pages(sql, params, columns, batch_size)
+    
+    def _iter_competitor_pages(self, sql: str, params: list, columns: List[str],
+                               batch_size: int) -> Iterator[Dict]:
+        decode = [c in JSON_COLUMNS for c in columns]
+        last_id = 0
+        while True:
+            rows = self._query(sql, (last_id, *params, batch_size))
+            for row in rows:
+                if self.compact_records:
+                    yield CompetitorRecord.from_row(columns, row[1:])
+                    continue
+                yield {column: (json.loads(value) if value else ({} if column == 'metadata' else []))
+                       if json_column else value
+                       for column, value, json_column in zip(columns, row[1:], decode)}
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
     
+    @staticmethod
+    def _competitor_filters(filters: Dict) -> tuple:
+        """SQL conditions and parameters for iter_competitors filters"""
+        unknown = set(filters) - {'location', 'bbox', *RANGE_FILTERS}
+        if unknown:
+            raise ValueError(f"Unknown competitor filter(s): {', '.join(sorted(unknown))}")
+        where, params = [], []
+        if filters.get('location'):
+            where.append("location LIKE ? ESCAPE '\\'")
+            params.append(like_pattern(filters['location']))
+        if filters.get('bbox'):
+            south, west, north, east = filters['bbox']
+            where.append('latitude BETWEEN ? AND ?')
+            params += [south, north]
+            where.append('longitude BETWEEN ? AND ?' if west <= east else '(longitude >= ? OR longitude <= ?)')
+            params += [west, east]
+        for name, column in RANGE_FILTERS.items():
+            low, high = filters.get(name) or (None, None)
+            for bound, op in ((low, '>='), (high, '<=')):
+                if bound is None:
+                    continue
+                if isinstance(bound, datetime):
+                    bound = bound.strftime('%Y-%m-%d %H:%M:%S')
+                where.append(f'{column} {op} ?')
+                params.append(bound)
+        return where, params
+    
+    def competitors_offering(self, program: str) -> List[Dict]:
+        """Competitors that offer `program` (matched case- and whitespace-insensitively)"""
+        return self._competitors('''
+            FROM programs p
+            JOIN competitor_programs cp ON cp.program_id = p.id
+            JOIN competitor_colleges cc ON cc.college_id = cp.competitor_id
+            WHERE p.name_key = ?
+            ORDER BY cc.name
+        ''', (program_key(program),))
+
+    def get_competitor_programs(self, college_id: str) -> List[str]:
+        """A competitor's program names in the order they were scraped"""
+        rows = self._query('''
+            SELECT p.name FROM competitor_programs cp
+            JOIN programs p ON p.id = cp.program_id
+            WHERE cp.competitor_id = ?
+            ORDER BY cp.position
+        ''', (college_id,))
+
+        return [row[0] for row in rows]
+
+    def get_program_overlap(self) -> Dict[str, List[str]]:
+        """Programs each competitor shares with my college, keyed by competitor college_id"""
+        rows = self._query('''
+            SELECT cp.competitor_id, p.name FROM my_college_programs mp
+            JOIN competitor_programs cp ON cp.program_id = mp.program_id
+            JOIN programs p ON p.id = mp.program_id
+            WHERE mp.college_id = ?
+            ORDER BY cp.competitor_id, mp.position
+        ''', (MY_COLLEGE_ID,))
+
+        overlap: Dict[str, List[str]] = {}
+        for competitor_id, name in rows:
+            overlap.setdefault(competitor_id, []).append(name)
+        return overlap
+
+    def search_courses(self, query: str, limit: int = 20) -> List[Dict]:
+        """Competitor course names similar to `query`, best match first
+        
+        Each result has the course `name` and the `competitor_ids` offering it.
+        With the FTS5 index, names sharing the most trigrams with the query
+        rank first (so typos and word order still match); without it, or for
+        queries under three characters, names containing the query are returned.
+        """
+        key = program_key(query)
+        if not key:
+            return []
+        if self.has_course_index and len(key) >= 3:
+            rows = self._query('''
+                SELECT p.id, p.name FROM course_index
+                JOIN programs p ON p.id = course_index.rowid
+                WHERE course_index MATCH ?
+                  AND EXISTS (SELECT 1 FROM competitor_programs cp WHERE cp.program_id = p.id)
+                ORDER BY course_index.rank
+                LIMIT ?
+            ''', (trigram_query(key), limit))
+        else:
+            rows = self._query('''
+                SELECT p.id, p.name FROM programs p
+                WHERE p.name_key LIKE ? ESCAPE '\\'
+                  AND EXISTS (SELECT 1 FROM competitor_programs cp WHERE cp.program_id = p.id)
+                ORDER BY length(p.name_key), p.name_key
+                LIMIT ?
+            ''', (like_pattern(key), limit))
+        if not rows:
+            return []
+
+        competitors: Dict[int, List[str]] = {}
+        for program_id, competitor_id in self._query(
+                f'SELECT program_id, competitor_id FROM competitor_programs '
+                f'WHERE program_id IN ({",".join("?" * len(rows))}) ORDER BY competitor_id',
+                [row[0] for row in rows]):
+            competitors.setdefault(program_id, []).append(competitor_id)
+        return [{'name': name, 'competitor_ids': competitors.get(program_id, [])} for program_id, name in rows]
+
     def save_comparison(self, competitor_id: str, similarity_score: float, 
                        competition_level: str, analysis: str):
         """Save comparison results"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO comparison_results 
-            (competitor_id, similarity_score, competition_level, analysis)
-            VALUES (?, ?, ?, ?)
-        ''', (competitor_id, similarity_score, competition_level, analysis))
+        with self.transaction() as conn:
+            conn.execute(COMPARISON_INSERT, (competitor_id, similarity_score, competition_level, analysis))
+    
+    def save_comparisons_bulk(self, comparisons: Iterable[Dict], batch_size: int = DB_BATCH_SIZE) -> int:
+        """Save many comparison results in one transaction; returns the number of rows written
         
-        conn.commit()
-        conn.close()
+        Each item has the save_comparison fields: competitor_id,
+        similarity_score, competition_level and analysis.
+        """
+        params = ((c['competitor_id'], c.get('similarity_score'), c.get('competition_level'), c.get('analysis'))
+                  for c in comparisons)
+        return self._write_batches(COMPARISON_INSERT, params, batch_size)
     
     def get_comparisons(self) -> List[Dict]:
         """Get all comparison results"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        return self._query('''
             SELECT cr.*, cc.name as competitor_name 
             FROM comparison_results cr
             JOIN competitor_colleges cc ON cr.competitor_id = cc.college_id
             ORDER BY cr.similarity_score DESC
         ''')
-        rows = cursor.fetchall()
-        conn.close()
-        
-        return rows
-    
+
+    def get_comparison_history(self, competitor_id: str) -> List[tuple]:
+        """One competitor's comparison results, newest first"""
+        return self._query('''
+            SELECT * FROM comparison_results
+            WHERE competitor_id = ?
+            ORDER BY created_date DESC, id DESC
+        ''', (competitor_id,))
+
+    def get_crawl_schedule(self, urls: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Recrawl schedule entries keyed by source URL (all entries, or only those for `urls`)"""
+        if urls is None:
+            rows = self._query('SELECT * FROM crawl_schedule')
+        else:
+            rows = []
+            urls = list(urls)
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(urls), 500):
+                chunk = urls[start:start + 500]
+                rows.extend(self._query(
+                    f'SELECT * FROM crawl_schedule WHERE source_url IN ({",".join("?" * len(chunk))})', chunk))
+
+        return {row[0]: self._row_to_dict(row, 'crawl_schedule') for row in rows}
+
+    def save_crawl_schedule(self, entry: Dict):
+        """Add or update one URL's recrawl schedule entry"""
+        with self.transaction() as conn:
+            conn.execute(CRAWL_SCHEDULE_UPSERT, self._crawl_schedule_params(entry))
+
+    def save_crawl_schedules_bulk(self, entries: Iterable[Dict], batch_size: int = DB_BATCH_SIZE) -> int:
+        """Add or update many recrawl schedule entries in one transaction; returns the number written"""
+        return self._write_batches(CRAWL_SCHEDULE_UPSERT, map(self._crawl_schedule_params, entries), batch_size)
+
+    @staticmethod
+    def _crawl_schedule_params(entry: Dict) -> tuple:
+        return (
+            entry['source_url'],
+            entry.get('scraped_date'),
+            entry.get('next_due'),
+            entry.get('interval_hours'),
+            entry.get('fingerprint'),
+            entry.get('checks', 0),
+            entry.get('changes', 0),
+            entry.get('failures', 0),
+            entry.get('priority', 0),
+            json.dumps(entry['last_record']) if entry.get('last_record') is not None else None
+        )
+
+    def set_crawl_priority(self, source_url: str, priority: float):
+        """Set the recrawl priority (the latest competition score) for a URL"""
+        with self.transaction() as conn:
+            conn.execute('''
+                INSERT INTO crawl_schedule (source_url, priority) VALUES (?, ?)
+                ON CONFLICT(source_url) DO UPDATE SET priority = excluded.priority
+            ''', (source_url, priority))
+
+    def clear_competitor_data(self):
+        """Delete all competitors, comparison results and the recrawl schedule (a full refresh)"""
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM comparison_results')
+            conn.execute('DELETE FROM competitor_colleges')
+            conn.execute('DELETE FROM competitor_programs')
+            conn.execute('DELETE FROM crawl_schedule')
+
     @staticmethod
     def _row_to_dict(row, table_name):
         """Convert database row to dictionary"""
@@ -218,6 +711,106 @@ class CollegeDatabase:
                 'avg_sat': row[11],
                 'avg_act': row[12],
                 'source_url': row[13],
-                'metadata': json.loads(row[14])
+                'metadata': json.loads(row[14]),
+                'content_hash': row[16]
+            }
+        elif table_name == 'crawl_schedule':
+            return {
+                'source_url': row[0],
+                'scraped_date': row[1],
+                'next_due': row[2],
+                'interval_hours': row[3],
+                'fingerprint': row[4],
+                'checks': row[5] or 0,
+                'changes': row[6] or 0,
+                'failures': row[7] or 0,
+                'priority': row[8] or 0,
+                'last_record': json.loads(row[9]) if row[9] else None
             }
         return dict(row)
+
+
+# Schema migrations, applied in order by CollegeDatabase.migrate. Append new steps with the next
+# version; never edit or renumber a released one. Every step must be safe to re-run.
+
+def _add_content_hash(conn: sqlite3.Connection):
+    columns = [col[1] for col in conn.execute('PRAGMA table_info(competitor_colleges)')]
+    if 'content_hash' not in columns:
+        conn.execute('ALTER TABLE competitor_colleges ADD COLUMN content_hash TEXT')
+
+
+def _create_crawl_schedule(conn: sqlite3.Connection):
+    # Recrawl schedule: when each competitor URL was scraped, how often it changes and when it's due
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_schedule (
+            source_url TEXT PRIMARY KEY,
+            scraped_date TIMESTAMP,
+            next_due TIMESTAMP,
+            interval_hours REAL,
+            fingerprint TEXT,
+            checks INTEGER DEFAULT 0,
+            changes INTEGER DEFAULT 0,
+            failures INTEGER DEFAULT 0,
+            priority REAL DEFAULT 0,
+            last_record TEXT
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_crawl_schedule_due ON crawl_schedule(next_due)')
+
+
+def _create_program_tables(conn: sqlite3.Connection):
+    # Normalised programs: distinct names, with a unique index on the comparison key
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS programs (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            name_key TEXT NOT NULL UNIQUE
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS competitor_programs (
+            competitor_id TEXT NOT NULL,
+            program_id INTEGER NOT NULL REFERENCES programs(id),
+            position INTEGER,
+            PRIMARY KEY (competitor_id, program_id)
+        ) WITHOUT ROWID
+    ''')
+    # "Which competitors offer X" walks this index instead of every competitor
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_competitor_programs_program '
+                 'ON competitor_programs(program_id, competitor_id)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS my_college_programs (
+            college_id TEXT NOT NULL,
+            program_id INTEGER NOT NULL REFERENCES programs(id),
+            position INTEGER,
+            PRIMARY KEY (college_id, program_id)
+        ) WITHOUT ROWID
+    ''')
+
+    # Fill them from the JSON columns, unless a previous run already did
+    if conn.execute('SELECT 1 FROM competitor_programs LIMIT 1').fetchone():
+        return
+    if conn.execute('SELECT 1 FROM my_college_programs LIMIT 1').fetchone():
+        return
+    for college_id, programs in conn.execute('SELECT id, programs FROM my_college').fetchall():
+        CollegeDatabase._index_programs(conn, 'my_college_programs', [(college_id, json.loads(programs or '[]'))])
+    rows = conn.execute('SELECT college_id, programs FROM competitor_colleges').fetchall()
+    CollegeDatabase._index_programs(conn, 'competitor_programs',
+                                    [(college_id, json.loads(programs or '[]')) for college_id, programs in rows])
+
+
+def _add_lookup_indexes(conn: sqlite3.Connection):
+    # Looking up a competitor's comparisons or a competitor by website scanned the whole table
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_comparison_results_competitor '
+                 'ON comparison_results(competitor_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_competitor_colleges_source_url '
+                 'ON competitor_colleges(source_url)')
+
+
+MIGRATIONS = (
+    (1, 'content_hash column on competitor_colleges', _add_content_hash),
+    (2, 'crawl_schedule table', _create_crawl_schedule),
+    (3, 'normalised program tables, filled from the JSON columns', _create_program_tables),
+    (4, 'indexes on comparison_results.competitor_id and competitor_colleges.source_url', _add_lookup_indexes),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
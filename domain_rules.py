@@ -0,0 +1,155 @@
+"""Declarative extraction rules: generic selectors plus per-domain overrides.
+
+Per-domain rules are loaded from a JSON data file (`domain_rules.json` by
+default, see DOMAIN_RULES_PATH) so new sites need no code changes:
+
+    {
+      "harvard.edu": {"programs": [".programs-list li", ".field-list li"]},
+      "*.ox.ac.uk": {
+        "programs": [".course-list li"],
+        "fields": {"location": [".college-address"]}
+      }
+    }
+
+Keys are domains as returned by `CollegeScraper._get_domain` (lowercase, no
+leading 'www.'). A "*.example.edu" key matches any subdomain of example.edu.
+"programs" selectors are tried before every generic strategy; "fields"
+selectors are tried before the generic selectors for that field.
+
+Every selector is compiled once when the registry loads. Lookups are a dict
+hit on the exact domain, then one dict hit per parent domain for wildcards.
+"""
+import json
+import os
+from typing import Dict, List, Optional
+import soupsieve as sv
+from config import DOMAIN_RULES_PATH
+from css_rules import SelectorRule, SelectorIndex
+
+NAME_SELECTORS = ['h1', '.college-name', '.institution-name']
+
+FIELD_SELECTORS = {
+    'name': NAME_SELECTORS,
+    'location': ['.location', '.address', '[data-location]'],
+    'tuition': ['.tuition', '[data-tuition]'],
+    'enrollment': ['.enrollment', '[data-enrollment]'],
+    'acceptance_rate': ['.acceptance-rate', '[data-acceptance]'],
+    'avg_gpa': ['.avg-gpa', '[data-gpa]'],
+    'avg_sat': ['.avg-sat', '[data-sat]'],
+    'avg_act': ['.avg-act', '[data-act]'],
+}
+
+PROGRAM_SELECTORS = [
+    '.program', '.major', '[data-program]', 'li.program', '.programs li', '.majors li', '.degree-list li'
+]
+
+# Compiled rules are shared between every domain that uses the same selector
+_compiled: Dict[str, SelectorRule] = {}
+
+
+def _rule(selector: str) -> SelectorRule:
+    rule = _compiled.get(selector)
+    if rule is None:
+        rule = _compiled[selector] = SelectorRule(selector)
+    return rule
+
+
+def normalize_domain(domain: str) -> str:
+    """Normalise a registry key the same way CollegeScraper._get_domain does."""
+    domain = domain.strip().lower()
+    if domain.startswith('www.'):
+        domain = domain[4:]
+    return domain.replace('-', '_')
+
+
+class DomainRules:
+    """Generic and domain-specific selectors for one domain, compiled into one index.
+
+    Index layout: field selectors, then PROGRAM_SELECTORS, then the domain's
+    program selectors, so PageCandidates can slice the per-rule hits.
+    """
+
+    __slots__ = ('pattern', 'field_selectors', 'field_list', 'program_count', 'domain_program_count', 'index')
+
+    def __init__(self, pattern: str, programs: Optional[List[str]] = None,
+                 fields: Optional[Dict[str, List[str]]] = None):
+        programs = list(programs or [])
+        fields = fields or {}
+        unknown = set(fields) - set(FIELD_SELECTORS)
+        if unknown:
+            raise ValueError(f"Domain rule '{pattern}' has unknown fields: {', '.join(sorted(unknown))}")
+
+        self.pattern = pattern
+        self.field_selectors = {
+            field: list(fields.get(field, [])) + generic for field, generic in FIELD_SELECTORS.items()
+        }
+        self.field_list = list(dict.fromkeys(s for sels in self.field_selectors.values() for s in sels))
+        self.program_count = len(PROGRAM_SELECTORS)
+        self.domain_program_count = len(programs)
+        try:
+            self.index = SelectorIndex(_rule(s) for s in self.field_list + PROGRAM_SELECTORS + programs)
+        except sv.SelectorSyntaxError as e:
+            raise ValueError(f"Domain rule '{pattern}' has an invalid selector: {e}") from e
+
+
+class DomainRegistry:
+    """Maps domains and "*.domain" subdomain patterns to compiled DomainRules."""
+
+    def __init__(self, entries: Optional[Dict[str, Dict]] = None):
+        self.default = DomainRules('*')
+        # Raw specs, kept so the registry can be rebuilt in other processes
+        self.entries: Dict[str, Dict] = {}
+        self._exact: Dict[str, DomainRules] = {}
+        self._wildcard: Dict[str, DomainRules] = {}
+        for pattern, spec in (entries or {}).items():
+            self.add(pattern, spec)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'DomainRegistry':
+        """Load a registry from a JSON rules file (an empty registry if the file is missing)."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding='utf-8') as fh:
+            entries = json.load(fh)
+        if not isinstance(entries, dict):
+            raise ValueError(f"{path}: expected a JSON object mapping domains to rules")
+        # Keys starting with '_' are comments
+        return cls({k: v for k, v in entries.items() if not k.startswith('_')})
+
+    def add(self, pattern: str, spec: Dict):
+        """Register (or replace) the rules for a domain or "*.domain" pattern."""
+        if not isinstance(spec, dict):
+            raise ValueError(f"Domain rule '{pattern}' must be an object")
+        rules = DomainRules(pattern, spec.get('programs'), spec.get('fields'))
+        self.entries[pattern] = spec
+        if pattern.startswith('*.'):
+            self._wildcard[normalize_domain(pattern[2:])] = rules
+        else:
+            self._exact[normalize_domain(pattern)] = rules
+
+    def lookup(self, domain: str) -> DomainRules:
+        """Rules for a domain: exact match, then the closest "*.parent" pattern, else defaults."""
+        rules = self._exact.get(domain)
+        if rules is not None:
+            return rules
+        if self._wildcard:
+            parts = domain.split('.')
+            for i in range(1, len(parts)):
+                rules = self._wildcard.get('.'.join(parts[i:]))
+                if rules is not None:
+                    return rules
+        return self.default
+
+    def __len__(self):
+        return len(self._exact) + len(self._wildcard)
+
+
+_default_registry: Optional[DomainRegistry] = None
+
+
+def get_default_registry() -> DomainRegistry:
+    """The registry loaded from DOMAIN_RULES_PATH, loaded and compiled on first use."""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = DomainRegistry.from_file(DOMAIN_RULES_PATH)
+    return _default_registry
@@ -0,0 +1,40 @@
+"""HTML parser backends for the scrapers.
+
+All extraction rules in `scraper.py` run against a BeautifulSoup tree, so a
+backend is a BeautifulSoup tree builder. The C-based lxml builder is several
+times faster than the pure-Python `html.parser`, which stays as the fallback
+when lxml isn't installed.
+"""
+import logging
+from typing import List, Optional
+from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
+from config import HTML_PARSER
+
+logger = logging.getLogger(__name__)
+
+# Fastest first; 'auto' picks the first one that is installed
+PARSER_BACKENDS = ['lxml', 'html5lib', 'html.parser']
+FALLBACK_BACKEND = 'html.parser'
+
+
+def available_backends() -> List[str]:
+    """Backends whose underlying parser library is installed."""
+    return [name for name in PARSER_BACKENDS if builder_registry.lookup(name) is not None]
+
+
+def resolve_backend(name: Optional[str] = HTML_PARSER) -> str:
+    """Resolve a backend name ('auto' or a specific parser) to one that is installed."""
+    available = available_backends()
+    if not name or name == 'auto':
+        # html5lib is slower than html.parser; only use it when asked for explicitly
+        return next(b for b in available if b != 'html5lib')
+    if name in available:
+        return name
+    logger.warning(f"HTML parser backend '{name}' is not available, falling back to {FALLBACK_BACKEND}")
+    return FALLBACK_BACKEND
+
+
+def make_soup(content, backend: Optional[str] = None) -> BeautifulSoup:
+    """Parse an HTML document with the given (or configured) backend."""
+    return BeautifulSoup(content, backend or resolve_backend())
@@ -0,0 +1,182 @@
+"""Persistent on-disk HTTP response cache for the scrapers.
+
+Each URL gets a metadata file (validators, fetch time, extracted record) and a
+body file, both named by a hash of the URL. Entries younger than the freshness
+TTL are served without touching the network; older ones are revalidated with a
+conditional GET (If-None-Match / If-Modified-Since), and a 304 reuses the
+stored record without re-parsing. The cache is trimmed least-recently-used
+first once it grows past its size limit, down to EVICT_TO of the limit so
+trimming runs rarely. Entry sizes and recency are kept in an in-memory LRU
+index built once at startup, so neither a store nor a trim lists the directory.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from config import HTTP_CACHE_DIR, HTTP_CACHE_TTL, HTTP_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Share of max_bytes the cache is trimmed down to once it overflows
+EVICT_TO = 0.8
+
+
+class ResponseCache:
+    """URL-keyed response cache stored in a directory."""
+
+    def __init__(self, cache_dir: str = HTTP_CACHE_DIR, ttl: float = HTTP_CACHE_TTL,
+                 max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        # key -> bytes on disk, least recently used first
+        self._index: 'OrderedDict[str, int]' = OrderedDict()
+        entries = []
+        for key in self._keys():
+            try:
+                entries.append((os.path.getmtime(self._paths(key)[0]), key))
+            except OSError:
+                continue
+        for _, key in sorted(entries):
+            self._index[key] = self._entry_size(key)
+        self._total_bytes = sum(self._index.values())
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Return the cached entry for a URL, or None if it isn't cached."""
+        key = self._key(url)
+        meta_path, _ = self._paths(key)
+        try:
+            with open(meta_path, encoding='utf-8') as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if entry.get('url') != url:
+            return None
+        # Most recently used now; the file's mtime carries that over to the next run
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return entry
+
+    def get_body(self, url: str) -> Optional[bytes]:
+        """Return the cached response body for a URL, if any."""
+        _, body_path = self._paths(self._key(url))
+        try:
+            with open(body_path, 'rb') as fh:
+                return fh.read()
+        except OSError:
+            return None
+
+    def is_fresh(self, entry: Dict) -> bool:
+        """True if the entry is within the freshness TTL and can skip revalidation."""
+        return time.time() - entry.get('fetched_at', 0) < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+        """Headers for a conditional GET that revalidates the entry."""
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url: str, body: bytes, headers, record: Optional[Dict]):
+        """Cache a 200 response body with its validators and extracted record."""
+        entry = {
+            'url': url,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+            'size': len(body),
+            'record': record,
+        }
+        key = self._key(url)
+        meta_path, body_path = self._paths(key)
+        with self._lock:
+            self._write_atomic(body_path, body)
+            self._write_atomic(meta_path, json.dumps(entry).encode('utf-8'))
+            self._track(key)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def refresh(self, url: str, entry: Dict, headers=None):
+        """Mark a revalidated (304) entry as freshly fetched, updating its validators."""
+        entry = dict(entry, fetched_at=time.time())
+        if headers is not None:
+            entry['etag'] = headers.get('ETag') or entry.get('etag')
+            entry['last_modified'] = headers.get('Last-Modified') or entry.get('last_modified')
+        key = self._key(url)
+        meta_path, _ = self._paths(key)
+        with self._lock:
+            self._write_atomic(meta_path, json.dumps(entry).encode('utf-8'))
+            self._track(key)
+
+    def clear(self):
+        """Remove every cached entry."""
+        with self._lock:
+            for key in list(self._keys()):
+                self._remove(key)
+            self._index.clear()
+            self._total_bytes = 0
+
+    def _track(self, key: str):
+        """Record an entry's current size as the most recently used; caller holds the lock."""
+        size = self._entry_size(key)
+        self._total_bytes += size - self._index.pop(key, 0)
+        self._index[key] = size
+
+    def _evict(self):
+        """Drop least-recently-used entries until the cache is down to EVICT_TO of max_bytes."""
+        target = self.max_bytes * EVICT_TO
+        while self._index and self._total_bytes > target:
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self._remove(key)
+
+    def _keys(self):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                yield name[:-5]
+
+    def _entry_size(self, key: str) -> int:
+        size = 0
+        for path in self._paths(key):
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        return size
+
+    def _remove(self, key: str):
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _paths(self, key: str):
+        base = os.path.join(self.cache_dir, key)
+        return base + '.json', base + '.body'
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
@@ -0,0 +1,162 @@
+"""Pooled, keep-alive HTTP sessions for the blocking scraper.
+
+Crawling many pages per university only pays for the TCP and TLS handshake
+once per connection if connections are kept alive and returned to a pool big
+enough for the number of concurrent fetches. `make_session` builds a
+requests Session whose adapter keeps up to POOL_MAX_HOSTS host pools of up
+to POOL_MAXSIZE_PER_HOST connections each, and asks for compressed bodies
+(gzip/deflate, plus brotli when the `brotli` package is installed; urllib3
+decodes them transparently). With POOL_BLOCK, a thread that finds its host's
+pool fully checked out waits for a connection instead of opening one that
+would be thrown away afterwards, so a crawl holds at most
+POOL_MAX_HOSTS * POOL_MAXSIZE_PER_HOST idle connections and never more than
+POOL_MAXSIZE_PER_HOST per host.
+
+A connection only goes back to the pool once its response body has been
+read to the end. `discard_body()` drains the body of a response nobody
+wants (an error page, a PDF) so the connection is reused rather than closed.
+
+`PooledHTTPAdapter.connection_stats()` reports how many requests each host
+served over how many new connections, so handshake amortisation can be
+checked after a crawl. Its pools also time every new connection (DNS, TCP
+and TLS); `take_connect_time()` hands the calling thread's total to the
+scrape metrics.
+"""
+import threading
+import time
+from typing import Dict
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util import parse_url
+from urllib3.util.request import ACCEPT_ENCODING
+from config import USER_AGENT, POOL_MAX_HOSTS, POOL_MAXSIZE_PER_HOST, POOL_BLOCK, POOL_DRAIN_LIMIT
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+# Connection set-up time and count per thread; requests run on the thread that calls session.get
+_connect_times = threading.local()
+
+
+def take_connect_time() -> float:
+    """Seconds this thread spent opening connections since the last call, and reset."""
+    seconds = getattr(_connect_times, 'total', 0.0)
+    _connect_times.total = 0.0
+    return seconds
+
+
+def _connections_opened() -> int:
+    """New connections this thread has opened so far."""
+    return getattr(_connect_times, 'opened', 0)
+
+
+def discard_body(response: requests.Response, limit: int = POOL_DRAIN_LIMIT):
+    """Read and drop an unread streamed body so its connection can go back to the pool.
+
+    Bodies longer than `limit` bytes aren't worth downloading to save a
+    handshake: the connection is closed instead, as is one that fails mid-read.
+    """
+    drained = 0
+    try:
+        for chunk in response.raw.stream(64 * 1024, decode_content=False):
+            drained += len(chunk)
+            if drained > limit:
+                break
+    except (requests.RequestException, urllib3.exceptions.HTTPError, OSError):
+        pass
+    response.close()
+
+
+class _TimedConnect:
+    def connect(self):
+        start = time.perf_counter()
+        _connect_times.opened = _connections_opened() + 1
+        try:
+            super().connect()
+        finally:
+            _connect_times.total = getattr(_connect_times, 'total', 0.0) + time.perf_counter() - start
+
+
+class TimedHTTPConnection(_TimedConnect, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnect, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that counts requests and new connections per host."""
+
+    def __init__(self, pool_connections: int = POOL_MAX_HOSTS,
+                 pool_maxsize: int = POOL_MAXSIZE_PER_HOST, pool_block: bool = POOL_BLOCK, **kwargs):
+        self._stats_lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, int]] = {}
+        super().__init__(pool_connections=max(1, pool_connections),
+                         pool_maxsize=max(1, pool_maxsize), pool_block=pool_block, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': TimedHTTPConnectionPool,
+                                                   'https': TimedHTTPSConnectionPool}
+
+    def send(self, request, *args, **kwargs):
+        # Connections are opened on this thread while the request is sent
+        opened = _connections_opened()
+        try:
+            return super().send(request, *args, **kwargs)
+        finally:
+            self._count(request.url, _connections_opened() - opened)
+
+    def _count(self, url: str, connections: int):
+        parsed = parse_url(url)
+        host = f"{parsed.scheme}://{parsed.host}:{parsed.port or DEFAULT_PORTS.get(parsed.scheme)}"
+        with self._stats_lock:
+            entry = self._hosts.setdefault(host, {'requests': 0, 'connections': 0})
+            entry['requests'] += 1
+            entry['connections'] += connections
+
+    def connection_stats(self) -> Dict:
+        """Requests, new connections and reuse ratio, in total and per host."""
+        with self._stats_lock:
+            hosts = {host: dict(entry) for host, entry in self._hosts.items()}
+
+        for entry in hosts.values():
+            entry['reuse_ratio'] = _reuse_ratio(entry['requests'], entry['connections'])
+        total_requests = sum(e['requests'] for e in hosts.values())
+        total_connections = sum(e['connections'] for e in hosts.values())
+        return {
+            'requests': total_requests,
+            'connections': total_connections,
+            'reuse_ratio': _reuse_ratio(total_requests, total_connections),
+            'hosts': hosts,
+        }
+
+
+def _reuse_ratio(requests_made: int, connections: int) -> float:
+    """Share of requests sent over an already-open connection."""
+    if not requests_made:
+        return 0.0
+    return max(0.0, 1 - connections / requests_made)
+
+
+def make_session(pool_connections: int = POOL_MAX_HOSTS, pool_maxsize: int = POOL_MAXSIZE_PER_HOST,
+                 pool_block: bool = POOL_BLOCK) -> requests.Session:
+    """A requests Session with a sized keep-alive pool and compressed transfers."""
+    session = requests.Session()
+    session.headers.update({'User-Agent': USER_AGENT, 'Accept-Encoding': ACCEPT_ENCODING})
+    adapter = PooledHTTPAdapter(pool_connections, pool_maxsize, pool_block)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
@@ -7,6 +7,9 @@ Allows users to:
 2. Select which courses to analyze competitors for
 3. Select geographic radius to filter competitors
 4. Run matching and generate report
+
+Only competitors due for a recrawl are re-fetched; run with `--full` to
+clear previous competitor data and re-fetch every site.
 """
 
 import sys
@@ -41,6 +44,19 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     return R * c
 
 
+def bounding_box(lat, lon, radius_miles):
+    """(south, west, north, east) box enclosing the circle of `radius_miles` around a point."""
+    lat_delta = math.degrees(radius_miles / 3959)
+    south, north = max(-90.0, lat - lat_delta), min(90.0, lat + lat_delta)
+    # Degrees of longitude shrink towards the poles, so size the box at its poleward edge
+    cos_edge = math.cos(math.radians(max(abs(south), abs(north))))
+    lon_delta = lat_delta / cos_edge if cos_edge > 1e-6 else 180
+    if lon_delta >= 180:
+        return south, -180.0, north, 180.0
+    # Wrap into [-180, 180); west > east then means the box crosses the antimeridian
+    return south, (lon - lon_delta + 180) % 360 - 180, north, (lon + lon_delta + 180) % 360 - 180
+
+
 def print_header():
     """Print application header."""
     print("\n" + "="*80)
@@ -134,6 +150,7 @@ def select_courses(college):
     # Suppress logging during menu interaction
     import logging
     logging.getLogger('scraper').setLevel(logging.WARNING)
+    logging.getLogger('async_scraper').setLevel(logging.WARNING)
     logging.getLogger('course_matcher').setLevel(logging.WARNING)
     
     if HAS_MENU:
@@ -191,24 +208,23 @@ def select_courses(college):
     return selected
 
 
-def run_analysis(college_id, college, selected_courses, radius_miles):
-    """Run competition analysis on selected courses with geographic filtering."""
+def run_analysis(college_id, college, selected_courses, radius_miles, full_refresh=False):
+    """Run competition analysis on selected courses with geographic filtering.
+    
+    Competitor sites are only re-fetched when due for a recrawl; with
+    `full_refresh` previous competitor data is cleared and every site is fetched.
+    """
     
     # Re-enable logging for analysis phase
     import logging
     logging.getLogger('scraper').setLevel(logging.INFO)
+    logging.getLogger('async_scraper').setLevel(logging.INFO)
     logging.getLogger('course_matcher').setLevel(logging.INFO)
     
     db = CollegeDatabase()
     
-    # Clear previous results
-    import sqlite3
-    conn = sqlite3.connect(db.db_path)
-    cur = conn.cursor()
-    cur.execute('DELETE FROM comparison_results')
-    cur.execute('DELETE FROM competitor_colleges')
-    conn.commit()
-    conn.close()
+    if full_refresh:
+        db.clear_competitor_data()
     
     # Import sample CSV if present
     csv_path = Path('sample_competitors.csv')
@@ -228,16 +244,26 @@ def run_analysis(college_id, college, selected_courses, radius_miles):
         import_from_csv(str(csv_path), COLUMN_MAP, db)
         print(f"📥 Imported competitor data from {csv_path}\n")
     
-    # Get competitors
-    competitors = db.get_all_competitors()
-    
     # Get your college location
     your_lat = college.get('latitude')
     your_lon = college.get('longitude')
+    use_radius = radius_miles is not None and your_lat is not None and your_lon is not None
+    
+    # Get competitors (one per website: imported and previously stored rows can share a URL),
+    # streamed with only the columns needed and, for a radius, pre-filtered to its bounding box in SQL
+    filters = {'bbox': bounding_box(your_lat, your_lon, radius_miles)} if use_radius else {}
+    competitors = []
+    seen_urls = set()
+    for comp in db.iter_competitors(filters, columns=['name', 'source_url', 'latitude', 'longitude']):
+        url = comp.get('source_url')
+        if url and url in seen_urls:
+            continue
+        seen_urls.add(url)
+        competitors.append(comp)
     
     # Filter by radius if applicable
     filtered_competitors = []
-    if radius_miles is not None and your_lat is not None and your_lon is not None:
+    if use_radius:
         print(f"📍 Filtering competitors within {radius_miles} miles...\n")
         for comp in competitors:
             comp_lat = comp.get('latitude')
@@ -262,7 +288,7 @@ def run_analysis(college_id, college, selected_courses, radius_miles):
     print("=" * 80)
     
     # Run matcher with selected courses
-    matcher = CourseMatcherAI()
+    matcher = CourseMatcherAI(full_refresh=full_refresh)
     
     print("\n🔍 Step 3: Scraping Competitor Websites...")
     print("-" * 40)
@@ -270,14 +296,19 @@ def run_analysis(college_id, college, selected_courses, radius_miles):
     # Detect courses from competitors (using all their programs, not filtered yet)
     competitor_programs = {}
     competitor_distances = {}
+    competitor_urls_by_name = {}
+    scraped = matcher.scrape_competitors(
+        [comp.get('source_url') for comp, _ in filtered_competitors if comp.get('source_url')]
+    )
     for comp, distance in filtered_competitors:
         url = comp.get('source_url')
         comp_name = comp.get('name') or url
-        result = matcher.scraper.scrape_college(url)
+        result = scraped.get(url)
         if result:
             name = result.get('name') or comp_name
             programs = result.get('programs', [])
             competitor_programs[name] = programs
+            competitor_urls_by_name[name] = url
             if distance is not None:
                 competitor_distances[name] = distance
     
@@ -306,6 +337,7 @@ def run_analysis(college_id, college, selected_courses, radius_miles):
         )
         
         distance = competitor_distances.get(competitor_name)
+        matcher.scheduler.set_priority(competitor_urls_by_name.get(competitor_name), competition_score)
         
         report['competitors'][competitor_name] = {
             'exact_matches': matches,
@@ -388,7 +420,8 @@ def main():
             sys.exit(0)
         
         # Step 3: Run analysis
-        run_analysis(college_id, college, selected_courses, radius_miles)
+        run_analysis(college_id, college, selected_courses, radius_miles,
+                     full_refresh='--full' in sys.argv[1:])
         
         print("✅ Analysis complete!\n")
     
@@ -4,7 +4,8 @@ from database import CollegeDatabase
 from scraper import CollegeScraper
 from analyzer import CompetitionAnalyzer
 from geo_mapper import GeoMapper
-from typing import List, Dict
+from config import DB_BATCH_SIZE
+from typing import List, Dict, Optional
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,9 +16,9 @@ logger = logging.getLogger(__name__)
 class CollegeCompetitionAI:
     """Main AI system for analyzing college competition"""
     
-    def __init__(self):
-        self.db = CollegeDatabase()
-        self.scraper = CollegeScraper()
+    def __init__(self, db: Optional[CollegeDatabase] = None):
+        self.db = db if db is not None else CollegeDatabase()
+        self.scraper = CollegeScraper(db=self.db)
         self.analyzer = CompetitionAnalyzer()
         self.mapper = GeoMapper()
     
@@ -27,12 +28,14 @@ class CollegeCompetitionAI:
         self.db.add_my_college(college_data)
         logger.info("College data stored successfully")
     
-    def analyze_competitors(self, college_urls: List[str]) -> List[Dict]:
+    def analyze_competitors(self, college_urls: List[str], batch_size: int = DB_BATCH_SIZE) -> List[Dict]:
         """
         Scrape and analyze competitor colleges
         
         Args:
             college_urls: List of URLs to scrape
+            batch_size: Competitors written per transaction; what was written
+                survives an error or Ctrl-C later in the run
             
         Returns:
             List of analysis results
@@ -50,59 +53,77 @@ class CollegeCompetitionAI:
             logger.info(f"Your college location: {my_college_coords}")
         
         results = []
+        competitors = []
+        comparisons = []
         
-        for i, url in enumerate(college_urls, 1):
-            logger.info(f"Processing college {i}/{len(college_urls)}: {url}")
-            
-            # Scrape college data
-            competitor_data = self.scraper.scrape_college(url)
-            if not competitor_data:
-                logger.warning(f"Could not scrape {url}")
-                continue
-            
-            # Get geographic coordinates
-            coords = self.mapper.get_coordinates(competitor_data.get('location'))
-            if coords:
-                competitor_data['latitude'] = coords[0]
-                competitor_data['longitude'] = coords[1]
-            
-            # Store in database
-            self.db.add_competitor(competitor_data)
-            
-            # Analyze competition (ONLY courses/programs focused)
-            similarity_score, competition_level, analysis = self.analyzer.compare_colleges(
-                my_college, 
-                competitor_data
-            )
-            
-            # Skip if not a real competitor (no program overlap)
-            if competition_level == "NONE":
-                logger.info(f"⊘ Skipped {competitor_data.get('name')} - No program overlap")
-                continue
-            
-            # Store comparison results
-            self.db.save_comparison(
-                competitor_data['college_id'],
-                similarity_score,
-                competition_level,
-                analysis
-            )
-            
-            result = {
-                'college_name': competitor_data.get('name', 'Unknown'),
-                'location': competitor_data.get('location'),
-                'coordinates': coords,
-                'similarity_score': similarity_score,
-                'competition_level': competition_level,
-                'programs': competitor_data.get('programs', []),
-                'analysis': analysis
-            }
-            results.append(result)
-            
-            logger.info(f"✓ Analyzed {competitor_data.get('name')} - Level: {competition_level}")
+        try:
+            # Scrape concurrently; geocoding and analysis stay on this thread
+            for i, (url, competitor_data) in enumerate(self.scraper.scrape_many(college_urls), 1):
+                if len(competitors) >= batch_size:
+                    self._store_batch(competitors, comparisons)
+                logger.info(f"Processing college {i}/{len(college_urls)}: {url}")
+                
+                if not competitor_data:
+                    logger.warning(f"Could not scrape {url}")
+                    continue
+                
+                # Get geographic coordinates
+                coords = self.mapper.get_coordinates(competitor_data.get('location'))
+                if coords:
+                    competitor_data['latitude'] = coords[0]
+                    competitor_data['longitude'] = coords[1]
+                
+                # Stored in batches of batch_size competitors, each in its own transaction
+                competitors.append(competitor_data)
+                
+                # Analyze competition (ONLY courses/programs focused)
+                similarity_score, competition_level, analysis = self.analyzer.compare_colleges(
+                    my_college, 
+                    competitor_data
+                )
+                
+                # Skip if not a real competitor (no program overlap)
+                if competition_level == "NONE":
+                    logger.info(f"⊘ Skipped {competitor_data.get('name')} - No program overlap")
+                    continue
+                
+                # Store comparison results
+                comparisons.append({
+                    'competitor_id': competitor_data['college_id'],
+                    'similarity_score': similarity_score,
+                    'competition_level': competition_level,
+                    'analysis': analysis
+                })
+                
+                result = {
+                    'college_name': competitor_data.get('name', 'Unknown'),
+                    'location': competitor_data.get('location'),
+                    'coordinates': coords,
+                    'similarity_score': similarity_score,
+                    'competition_level': competition_level,
+                    'programs': competitor_data.get('programs', []),
+                    'analysis': analysis
+                }
+                results.append(result)
+                
+                logger.info(f"✓ Analyzed {competitor_data.get('name')} - Level: {competition_level}")
+        finally:
+            # Whatever was processed is kept, even if the run stops early
+            self._store_batch(competitors, comparisons)
         
         return results
     
+    def _store_batch(self, competitors: List[Dict], comparisons: List[Dict]):
+        """Write pending competitors and comparisons in one transaction, then clear both lists"""
+        if not competitors and not comparisons:
+            return
+        with self.db.transaction():
+            self.db.add_competitors_bulk(competitors)
+            self.db.save_comparisons_bulk(comparisons)
+        logger.info(f"Stored {len(competitors)} competitors and {len(comparisons)} comparisons")
+        competitors.clear()
+        comparisons.clear()
+    
     def get_competition_report(self) -> Dict:
         """Generate a comprehensive competition report"""
         logger.info("Generating competition report")
@@ -117,7 +138,7 @@ class CollegeCompetitionAI:
         low_competition = [c for c in comparisons if c[-3] == 'LOW']
         
         report = {
-            'my_college': my_college,
+            'my_college': dict(my_college) if my_college else None,
             'total_competitors_analyzed': len(competitors),
             'competition_summary': {
                 'high_competition': len(high_competition),
@@ -0,0 +1,243 @@
+"""Offline page archive for recording live crawls and replaying them without network.
+
+An archive is a directory holding the raw page bodies plus an `index.json`
+that maps each body file to the URL it was fetched from (the same layout as
+fixtures/pages), or that directory packed into a .tar.gz/.tgz/.zip bundle:
+
+    index.json          {"3f2a9c0d1e4b5a67.html": "https://www.harvard.edu", ...}
+    3f2a9c0d1e4b5a67.html
+
+In 'record' mode every page the scraper downloads is added to the archive;
+in 'replay' mode `CollegeScraper.fetch_page` serves pages from the archive
+only, never touching the network or the HTTP cache, so runs are repeatable.
+URLs are matched ignoring scheme, a leading 'www.', case in the host and a
+trailing slash.
+
+While recording a directory, each body is written as it arrives, but the
+index is only rewritten every INDEX_FLUSH_EVERY pages and on close (also
+run at interpreter exit). Every file is replaced atomically, so a crash
+leaves the last complete index and loses at most the pages recorded after it.
+"""
+import atexit
+import hashlib
+import io
+import json
+import logging
+import os
+import tarfile
+import threading
+import zipfile
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+from config import SCRAPER_ARCHIVE, SCRAPER_ARCHIVE_MODE
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_MODES = ['replay', 'record']
+BUNDLE_SUFFIXES = ('.tar.gz', '.tgz', '.zip')
+INDEX_FILE = 'index.json'
+# Pages recorded between rewrites of a directory archive's index
+INDEX_FLUSH_EVERY = 100
+
+
+def archive_key(url: str) -> str:
+    """Lookup key for a URL: host (lowercase, no 'www.') + path without trailing slash + query."""
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    key = host + parsed.path.rstrip('/')
+    if parsed.query:
+        key += '?' + parsed.query
+    return key
+
+
+def is_bundle(path: str) -> bool:
+    return path.lower().endswith(BUNDLE_SUFFIXES)
+
+
+class PageArchive:
+    """URL-keyed page bodies stored in a directory or a compressed bundle."""
+
+    def __init__(self, path: str, mode: str = 'replay', flush_every: int = INDEX_FLUSH_EVERY):
+        if mode not in ARCHIVE_MODES:
+            raise ValueError(f"Unknown archive mode '{mode}'. Choose one of: {', '.join(ARCHIVE_MODES)}")
+        self.path = path
+        self.mode = mode
+        self.bundle = is_bundle(path)
+        self._lock = threading.Lock()
+        self._files: Dict[str, str] = {}    # archive key -> body file name
+        self._urls: Dict[str, str] = {}     # body file name -> URL as recorded
+        self._bodies: Dict[str, bytes] = {}  # body file name -> content (bundles only)
+        self._dirty = False
+        self._unflushed = 0  # pages recorded since the index was last written
+        self.flush_every = max(1, flush_every)
+
+        if self.bundle:
+            if os.path.exists(path):
+                self._load_bundle()
+            elif mode == 'replay':
+                raise FileNotFoundError(f"Page archive not found: {path}")
+        elif os.path.isdir(path):
+            self._load_index(self._read_dir_index())
+        elif mode == 'replay':
+            raise FileNotFoundError(f"Page archive not found: {path}")
+        else:
+            os.makedirs(path, exist_ok=True)
+        if self.recording:
+            # Recorded pages are only indexed on flush; don't lose them at exit
+            atexit.register(self.close)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == 'record'
+
+    def __len__(self):
+        return len(self._urls)
+
+    def __contains__(self, url: str) -> bool:
+        return archive_key(url) in self._files
+
+    def get(self, url: str) -> Optional[bytes]:
+        """The archived body for a URL, or None if it was never recorded."""
+        fname = self._files.get(archive_key(url))
+        if fname is None:
+            return None
+        if self.bundle:
+            return self._bodies.get(fname)
+        try:
+            with open(os.path.join(self.path, fname), 'rb') as fh:
+                return fh.read()
+        except OSError as e:
+            logger.warning(f"Archived page for {url} is unreadable: {e}")
+            return None
+
+    def record(self, url: str, content: bytes):
+        """Add (or replace) the body for a URL. Only allowed in record mode."""
+        if not self.recording:
+            raise RuntimeError("PageArchive.record() needs an archive opened in 'record' mode")
+        key = archive_key(url)
+        with self._lock:
+            fname = self._files.get(key) or hashlib.sha256(key.encode('utf-8')).hexdigest()[:16] + '.html'
+            self._files[key] = fname
+            self._urls[fname] = url
+            self._dirty = True
+            if self.bundle:
+                self._bodies[fname] = content
+                return
+            # The body goes first, so the index never names a missing file
+            self._write_atomic(os.path.join(self.path, fname), content)
+            self._unflushed += 1
+            if self._unflushed >= self.flush_every:
+                self._flush_index()
+
+    def items(self) -> Iterator[Tuple[str, bytes]]:
+        """Yield (url, body) for every archived page, sorted by file name."""
+        for fname in sorted(self._urls):
+            body = self.get(self._urls[fname])
+            if body is not None:
+                yield self._urls[fname], body
+
+    def flush(self):
+        """Write out a directory archive's index now (bundles are written on close)."""
+        with self._lock:
+            if not self.bundle and self._dirty:
+                self._flush_index()
+
+    def close(self):
+        """Write out the pending index (directory) or the whole bundle; safe to call more than once."""
+        with self._lock:
+            if not self._dirty:
+                return
+            if not self.bundle:
+                self._flush_index()
+                return
+            files = {INDEX_FILE: self._index_bytes(), **self._bodies}
+            tmp_path = self.path + '.tmp'
+            if self.path.lower().endswith('.zip'):
+                with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+                    for name, data in sorted(files.items()):
+                        zf.writestr(name, data)
+            else:
+                with tarfile.open(tmp_path, 'w:gz') as tf:
+                    for name, data in sorted(files.items()):
+                        info = tarfile.TarInfo(name)
+                        info.size = len(data)
+                        tf.addfile(info, io.BytesIO(data))
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        logger.info(f"Wrote {len(self._urls)} pages to {self.path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read_dir_index(self) -> Dict[str, str]:
+        index_path = os.path.join(self.path, INDEX_FILE)
+        if not os.path.exists(index_path):
+            return {}
+        with open(index_path, encoding='utf-8') as fh:
+            return json.load(fh)
+
+    def _load_bundle(self):
+        """Read a whole bundle into memory; archives are small next to a crawl's run time."""
+        if self.path.lower().endswith('.zip'):
+            with zipfile.ZipFile(self.path) as zf:
+                members = {name: zf.read(name) for name in zf.namelist() if not name.endswith('/')}
+        else:
+            with tarfile.open(self.path, 'r:*') as tf:
+                members = {m.name: tf.extractfile(m).read() for m in tf.getmembers() if m.isfile()}
+
+        # Allow the files to sit inside one top-level folder of the bundle
+        index_name = min((name for name in members if os.path.basename(name) == INDEX_FILE),
+                         key=len, default=None)
+        if index_name is None:
+            raise ValueError(f"{self.path}: bundle has no {INDEX_FILE}")
+        prefix = index_name[:-len(INDEX_FILE)]
+        index = json.loads(members[index_name].decode('utf-8'))
+        self._load_index(index)
+        self._bodies = {fname: members[prefix + fname] for fname in self._urls if prefix + fname in members}
+
+    def _load_index(self, index: Dict[str, str]):
+        if not isinstance(index, dict):
+            raise ValueError(f"{self.path}: {INDEX_FILE} must map file names to URLs")
+        for fname, url in index.items():
+            self._files[archive_key(url)] = fname
+            self._urls[fname] = url
+
+    def _flush_index(self):
+        # Caller holds the lock
+        self._write_atomic(os.path.join(self.path, INDEX_FILE), self._index_bytes(), sync=True)
+        self._unflushed = 0
+        self._dirty = False
+
+    def _index_bytes(self) -> bytes:
+        return json.dumps(dict(sorted(self._urls.items())), indent=2).encode('utf-8')
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes, sync: bool = False):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as fh:
+            fh.write(data)
+            if sync:
+                # On disk before the rename, so a crash can't leave an empty index
+                fh.flush()
+                os.fsync(fh.fileno())
+        os.replace(tmp_path, path)
+
+
+_default_archive: Optional[PageArchive] = None
+
+
+def get_default_archive() -> Optional[PageArchive]:
+    """The archive configured by SCRAPER_ARCHIVE / SCRAPER_ARCHIVE_MODE, or None if unset."""
+    global _default_archive
+    if _default_archive is None and SCRAPER_ARCHIVE:
+        _default_archive = PageArchive(SCRAPER_ARCHIVE, SCRAPER_ARCHIVE_MODE)
+    return _default_archive
@@ -0,0 +1,44 @@
+"""Normalisation and de-duplication of program/course names.
+
+Scraped names arrive with stray whitespace (newlines, non-breaking spaces) and
+inconsistent case. `program_key` gives the canonical comparison key (Unicode
+NFKC plus case folding), and `dedupe_programs` removes duplicates in a single
+pass while keeping the first spelling seen.
+"""
+import unicodedata
+from typing import Iterable, List, Optional
+
+
+def normalize_program_name(name: str) -> str:
+    """Collapse all runs of (Unicode) whitespace to single spaces and trim."""
+    return ' '.join(name.split())
+
+
+def program_key(name: str) -> str:
+    """Case- and width-insensitive comparison key for a program name."""
+    return unicodedata.normalize('NFKC', normalize_program_name(name)).casefold()
+
+
+def dedupe_programs(names: Iterable[Optional[str]], min_length: int = 3,
+                    limit: Optional[int] = None) -> List[str]:
+    """Normalise names and drop duplicates, preserving first-seen order.
+
+    Names shorter than `min_length` after normalisation are skipped; at most
+    `limit` names are returned.
+    """
+    seen = set()
+    out = []
+    for name in names:
+        if not name or not isinstance(name, str):
+            continue
+        cleaned = normalize_program_name(name)
+        if len(cleaned) < min_length:
+            continue
+        key = program_key(cleaned)
+        if key in seen:
+            continue
+        seen.add(key)
+        out.append(cleaned)
+        if limit is not None and len(out) >= limit:
+            break
+    return out
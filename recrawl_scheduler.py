@@ -0,0 +1,181 @@
+"""Incremental recrawl of competitor sites with a per-competitor freshness policy.
+
+Rescraping every competitor on every run makes a nightly run cost the same
+whether one course list changed or none did. `RecrawlScheduler` keeps a row
+per competitor URL in the `crawl_schedule` table and only re-fetches the
+URLs that are due:
+
+- each URL has its own interval, halved when a re-fetch finds a changed
+  course list and doubled when it finds the same one (between
+  RECRAWL_MIN_INTERVAL and RECRAWL_MAX_INTERVAL hours), so sites that change
+  often are checked often;
+- a failed fetch pushes the URL back by RECRAWL_FAILURE_BACKOFF hours,
+  doubling with each consecutive failure, and the last good record is used
+  meanwhile. URLs that have never been fetched successfully back off the
+  same way;
+- due URLs are fetched highest competition score first, and at most
+  RECRAWL_MAX_PER_RUN of them per run when that is set. URLs never scraped
+  before are fetched first and aren't capped.
+
+A run reads the schedule once and writes all its updates in one transaction.
+
+Everything that isn't due is answered from the record stored at its last
+successful scrape.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+from config import (RECRAWL_DEFAULT_INTERVAL, RECRAWL_MIN_INTERVAL, RECRAWL_MAX_INTERVAL,
+                    RECRAWL_FAILURE_BACKOFF, RECRAWL_MAX_PER_RUN)
+
+logger = logging.getLogger(__name__)
+
+# Same layout as SQLite's CURRENT_TIMESTAMP, so stored dates compare as strings
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def format_timestamp(moment: datetime) -> str:
+    return moment.strftime(TIMESTAMP_FORMAT)
+
+
+def record_fingerprint(record: Dict) -> str:
+    """Digest of the parts of a record the analysis uses (name and course list).
+
+    Page bytes change with every session token or timestamp, so the page's
+    content_hash would make almost every site look changed on every run.
+    """
+    programs = sorted(p.strip().lower() for p in record.get('programs') or [] if p)
+    payload = json.dumps([record.get('name'), programs], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RecrawlScheduler:
+    """Decides which competitor URLs to re-fetch this run and records the outcome."""
+
+    def __init__(self, db, default_interval: float = RECRAWL_DEFAULT_INTERVAL,
+                 min_interval: float = RECRAWL_MIN_INTERVAL, max_interval: float = RECRAWL_MAX_INTERVAL,
+                 failure_backoff: float = RECRAWL_FAILURE_BACKOFF, max_per_run: int = RECRAWL_MAX_PER_RUN):
+        self.db = db
+        self.min_interval = max(0.0, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.default_interval = min(max(default_interval, self.min_interval), self.max_interval)
+        self.failure_backoff = max(0.0, failure_backoff)
+        # 0 means every due URL is fetched
+        self.max_per_run = max(0, max_per_run)
+
+    def due(self, urls: Iterable[str], now: Optional[datetime] = None) -> List[str]:
+        """URLs to fetch this run: never-scraped ones, then due ones by priority."""
+        urls = list(dict.fromkeys(u for u in urls if u))
+        return self._due(urls, self.db.get_crawl_schedule(urls), format_timestamp(now or utc_now()))
+
+    def _due(self, urls: List[str], schedule: Dict[str, Dict], now_str: str) -> List[str]:
+        new, due = [], []
+        for url in urls:
+            entry = schedule.get(url)
+            if entry is not None and entry['next_due'] and entry['next_due'] > now_str:
+                continue  # Not due yet, or backing off after a failure
+            if entry is None or entry['last_record'] is None:
+                new.append(url)
+            else:
+                due.append(entry)
+
+        # Highest competition score first; among equals, the longest overdue
+        due.sort(key=lambda e: (-e['priority'], e['next_due'] or ''))
+        if self.max_per_run:
+            due = due[:self.max_per_run]
+        return new + [entry['source_url'] for entry in due]
+
+    def record_success(self, url: str, record: Dict, now: Optional[datetime] = None):
+        """Store a fresh record and schedule the next fetch from how much it changed."""
+        entry = self._succeeded(self._entry(url), record, now or utc_now())
+        self.db.save_crawl_schedule(entry)
+
+    def record_failure(self, url: str, now: Optional[datetime] = None):
+        """Push the next attempt back, doubling the wait with each consecutive failure."""
+        entry = self._failed(self._entry(url), now or utc_now())
+        self.db.save_crawl_schedule(entry)
+
+    def _succeeded(self, entry: Dict, record: Dict, now: datetime) -> Dict:
+        fingerprint = record_fingerprint(record)
+        interval = entry['interval_hours'] or self.default_interval
+
+        if entry['fingerprint'] is not None:
+            if fingerprint != entry['fingerprint']:
+                entry['changes'] += 1
+                interval = interval / 2
+            else:
+                interval = interval * 2
+        interval = min(max(interval, self.min_interval), self.max_interval)
+
+        entry.update({
+            'scraped_date': format_timestamp(now),
+            'next_due': format_timestamp(now + timedelta(hours=interval)),
+            'interval_hours': interval,
+            'fingerprint': fingerprint,
+            'checks': entry['checks'] + 1,
+            'failures': 0,
+            'last_record': record,
+        })
+        return entry
+
+    def _failed(self, entry: Dict, now: datetime) -> Dict:
+        entry['failures'] += 1
+        backoff = min(self.failure_backoff * (2 ** (entry['failures'] - 1)), self.max_interval)
+        entry['next_due'] = format_timestamp(now + timedelta(hours=backoff))
+        return entry
+
+    def set_priority(self, url: str, competition_score: Optional[float]):
+        """Rank a URL for future runs by its latest competition score."""
+        if url:
+            self.db.set_crawl_priority(url, float(competition_score or 0))
+
+    def refresh(self, urls: Iterable[str], fetch: Callable[[List[str]], Dict[str, Optional[Dict]]],
+                full: bool = False, now: Optional[datetime] = None) -> Dict[str, Optional[Dict]]:
+        """Records for every URL, calling `fetch` only for the ones that are due.
+
+        With `full`, every URL is fetched regardless of schedule. A URL whose
+        fetch fails falls back to its last good record (None if it never had one).
+        """
+        urls = list(dict.fromkeys(u for u in urls if u))
+        now = now or utc_now()
+        schedule = self.db.get_crawl_schedule(urls)
+        to_fetch = urls if full else self._due(urls, schedule, format_timestamp(now))
+        logger.info(f"Recrawl: fetching {len(to_fetch)} of {len(urls)} competitor(s)"
+                    f"{' (full refresh)' if full else ''}")
+
+        # The fetch runs outside the transaction so the database isn't held during network I/O
+        fetched = fetch(to_fetch) if to_fetch else {}
+        updated = []
+        for url in to_fetch:
+            entry = schedule.get(url) or self._new_entry(url)
+            record = fetched.get(url)
+            updated.append(self._succeeded(entry, record, now) if record else self._failed(entry, now))
+        # One transaction for the whole run's schedule updates
+        self.db.save_crawl_schedules_bulk(updated)
+
+        attempted = set(to_fetch)
+        results = {}
+        for url in urls:
+            record = fetched.get(url)
+            if record is None and url in schedule:
+                record = schedule[url]['last_record']
+                if record is not None and url in attempted:
+                    logger.warning(f"Could not refresh {url}; using the record from "
+                                   f"{schedule[url]['scraped_date']}")
+            results[url] = record
+        return results
+
+    def _entry(self, url: str) -> Dict:
+        return self.db.get_crawl_schedule([url]).get(url) or self._new_entry(url)
+
+    @staticmethod
+    def _new_entry(url: str) -> Dict:
+        return {'source_url': url, 'scraped_date': None, 'next_due': None, 'interval_hours': None,
+                'fingerprint': None, 'checks': 0, 'changes': 0, 'failures': 0, 'priority': 0,
+                'last_record': None}
@@ -0,0 +1,162 @@
+"""Headless-browser rendering for course catalogues built client-side.
+
+Some competitor sites ship an empty page and fill in their course list with
+JavaScript, so every static extraction strategy finds nothing. `BrowserPool`
+keeps a small pool of warm headless browsers (started once, reused across
+pages), lets at most `size` pages render at once and bounds each page with a
+load timeout. The scraper only sends it URLs whose static extraction came
+back without programs.
+
+Requires selenium and a headless Chrome or Firefox with its driver on PATH
+(`pip install selenium`). Enable with USE_RENDERER=True.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Optional
+from config import (RENDER_BROWSER, RENDER_POOL_SIZE, RENDER_TIMEOUT, RENDER_SETTLE_TIME,
+                    RENDER_MAX_PAGES_PER_BROWSER, USE_RENDERER, USER_AGENT)
+
+try:
+    from selenium import webdriver
+except Exception:
+    webdriver = None  # Optional dependency
+
+logger = logging.getLogger(__name__)
+
+
+def make_headless_driver(browser: str = RENDER_BROWSER, page_timeout: float = RENDER_TIMEOUT):
+    """Start a headless Chrome or Firefox WebDriver with images disabled."""
+    if webdriver is None:
+        raise RuntimeError("selenium is required for page rendering. Install with: pip install selenium")
+    if browser == 'firefox':
+        options = webdriver.FirefoxOptions()
+        options.add_argument('-headless')
+        options.set_preference('permissions.default.image', 2)
+        options.set_preference('general.useragent.override', USER_AGENT)
+        driver = webdriver.Firefox(options=options)
+    elif browser == 'chrome':
+        options = webdriver.ChromeOptions()
+        for arg in ('--headless=new', '--disable-gpu', '--no-sandbox', '--disable-dev-shm-usage',
+                    '--blink-settings=imagesEnabled=false', f'--user-agent={USER_AGENT}'):
+            options.add_argument(arg)
+        driver = webdriver.Chrome(options=options)
+    else:
+        raise ValueError(f"Unknown browser '{browser}'. Choose 'chrome' or 'firefox'")
+    driver.set_page_load_timeout(page_timeout)
+    return driver
+
+
+class _PooledDriver:
+    __slots__ = ('driver', 'pages')
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+
+class BrowserPool:
+    """A bounded pool of reusable headless browsers that render pages to HTML."""
+
+    def __init__(self, size: int = RENDER_POOL_SIZE, page_timeout: float = RENDER_TIMEOUT,
+                 settle_time: float = RENDER_SETTLE_TIME,
+                 max_pages_per_browser: int = RENDER_MAX_PAGES_PER_BROWSER,
+                 driver_factory: Optional[Callable] = None):
+        self.size = max(1, size)
+        self.page_timeout = page_timeout
+        # Extra wait after the load event for scripts that fetch and insert the course list
+        self.settle_time = max(0.0, settle_time)
+        # Browsers are restarted after this many pages so leaks can't build up
+        self.max_pages_per_browser = max(1, max_pages_per_browser)
+        self.driver_factory = driver_factory or (lambda: make_headless_driver(page_timeout=page_timeout))
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._idle: 'queue.LifoQueue[_PooledDriver]' = queue.LifoQueue()
+        self._closed = False
+
+    def warm(self, count: Optional[int] = None):
+        """Start browsers ahead of time so the first renders don't pay the start-up cost."""
+        for _ in range(min(self.size, count or self.size) - self._idle.qsize()):
+            self._idle.put(_PooledDriver(self.driver_factory()))
+
+    def render(self, url: str) -> Optional[bytes]:
+        """The page's DOM after scripts have run, as UTF-8 HTML; None on failure or timeout."""
+        if self._closed:
+            raise RuntimeError("BrowserPool is closed")
+        with self._slots:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                try:
+                    pooled = _PooledDriver(self.driver_factory())
+                except Exception as e:
+                    logger.error(f"Could not start a headless browser: {e}")
+                    return None
+
+            try:
+                pooled.driver.get(url)
+                if self.settle_time:
+                    time.sleep(self.settle_time)
+                html = pooled.driver.page_source
+            except Exception as e:
+                # A timed-out or crashed browser may be stuck mid-load: don't reuse it
+                logger.warning(f"Rendering {url} failed: {e}")
+                self._quit(pooled)
+                return None
+
+            pooled.pages += 1
+            if pooled.pages >= self.max_pages_per_browser or self._closed:
+                self._quit(pooled)
+            else:
+                self._idle.put(pooled)
+            return html.encode('utf-8') if html else None
+
+    def close(self):
+        """Shut down every idle browser (browsers still rendering quit when they finish)."""
+        self._closed = True
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _quit(pooled: _PooledDriver):
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+
+
+def renderer_available(browser: str = RENDER_BROWSER) -> bool:
+    """Whether a headless browser can be started here."""
+    if webdriver is None:
+        return False
+    try:
+        make_headless_driver(browser).quit()
+        return True
+    except Exception:
+        return False
+
+
+_default_pool: Optional[BrowserPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_renderer() -> Optional[BrowserPool]:
+    """The shared BrowserPool when USE_RENDERER is set, else None. Browsers start on first use."""
+    global _default_pool
+    if not USE_RENDERER:
+        return None
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = BrowserPool()
+            atexit.register(_default_pool.close)
+    return _default_pool
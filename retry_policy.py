@@ -0,0 +1,126 @@
+"""Retry timing and per-host failure isolation for the scrapers.
+
+`RetryPolicy` decides whether a failed request is worth retrying and how
+long to wait first: exponential backoff with full jitter, or the server's
+`Retry-After` when it sends one. It also carries separate connect and read
+timeouts, so an unreachable host fails in seconds rather than after the
+full read timeout.
+
+`CircuitBreaker` counts consecutive failures per host. Once a host reaches
+the threshold, its circuit opens and requests to it fail immediately. After
+`reset_timeout` seconds one probe request is let through: if it succeeds the
+circuit closes, otherwise it stays open for another `reset_timeout`.
+Callers `release()` the host in a `finally` around the guarded request, so a
+probe that ends in an unexpected exception doesn't keep the host blocked.
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from config import (MAX_RETRIES, CONNECT_TIMEOUT, READ_TIMEOUT, RETRY_BACKOFF_BASE, RETRY_BACKOFF_MAX,
+                    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+
+# Statuses that signal a temporary condition; any other 4xx/5xx fails at once
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), if valid."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+class RetryPolicy:
+    """How many times to try a request, how long to wait between tries, and timeouts."""
+
+    def __init__(self, max_retries: int = MAX_RETRIES, backoff_base: float = RETRY_BACKOFF_BASE,
+                 backoff_max: float = RETRY_BACKOFF_MAX, connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT):
+        self.max_retries = max(1, max_retries)
+        self.backoff_base = max(0.0, backoff_base)
+        self.backoff_max = max(0.0, backoff_max)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        """(connect, read) timeout tuple as accepted by requests."""
+        return self.connect_timeout, self.read_timeout
+
+    @staticmethod
+    def should_retry_status(status: int) -> bool:
+        return status in RETRYABLE_STATUSES
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to sleep after failed attempt number `attempt` (0-based).
+
+        Honours Retry-After (capped at backoff_max); otherwise "full jitter":
+        uniform between 0 and backoff_base * 2**attempt, so clients that failed
+        together don't retry together.
+        """
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """Per-host consecutive-failure counter that fails fast once a host looks down."""
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._probing: Dict[str, bool] = {}
+
+    def allow(self, host: str) -> bool:
+        """Whether a request to `host` may go ahead (claims the probe slot when half-open)."""
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return True
+            if self._probing.get(host) or time.monotonic() - opened_at < self.reset_timeout:
+                return False
+            self._probing[host] = True
+            return True
+
+    def release(self, host: str):
+        """End a guarded request: frees a probe slot it claimed but never resolved.
+
+        A no-op after record_success/record_failure; otherwise the next allow()
+        may send another probe.
+        """
+        with self._lock:
+            if self._probing.get(host):
+                self._probing[host] = False
+
+    def is_open(self, host: str) -> bool:
+        with self._lock:
+            return host in self._opened_at
+
+    def record_success(self, host: str):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+            self._probing.pop(host, None)
+
+    def record_failure(self, host: str):
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if failures >= self.failure_threshold:
+                # (Re)open: a failed probe restarts the wait
+                self._opened_at[host] = time.monotonic()
+                self._probing[host] = False
@@ -2,17 +2,32 @@
 Run full analysis: import -> detect -> match -> save report + map
 
 This script:
- - Clears previous competitor and comparison data
  - Imports `sample_competitors.csv` using the standard column map
  - Runs the CourseMatcherAI to generate a report for `college_1`
  - Saves the report to `competition_report.json`
  - Generates a geographic map (folium) and saves `competition_map.html`
+
+Competitor sites are re-fetched only when due for a recrawl (see
+recrawl_scheduler.py); pass `--full` to clear previous competitor and
+comparison data and re-fetch everything.
+
+Pass `--record PATH` to save every scraped page into a page archive (a
+directory or a .tar.gz/.zip bundle), and `--replay PATH` to run the same
+analysis later from that archive with no network access.
+
+A summary of scrape timings (connect, TTFB, download, parse and each
+extraction strategy) is printed at the end; `--metrics PATH` (or
+SCRAPE_METRICS_PATH) also writes the per-URL figures as JSON.
 """
+import argparse
 import json
 from importers import import_from_csv
 from course_matcher import CourseMatcherAI
 from database import CollegeDatabase
 from main import CollegeCompetitionAI
+from page_archive import PageArchive
+from scrape_metrics import get_default_metrics
+from config import SCRAPE_METRICS_PATH
 from pathlib import Path
 
 # Column map used by examples
@@ -34,21 +49,26 @@ MAP_HTML = 'competition_map.html'
 
 
 def clear_database(db: CollegeDatabase):
-    """Remove previous competitor and comparison results"""
-    import sqlite3
-    conn = sqlite3.connect(db.db_path)
-    cur = conn.cursor()
-    cur.execute('DELETE FROM comparison_results')
-    cur.execute('DELETE FROM competitor_colleges')
-    conn.commit()
-    conn.close()
+    """Remove previous competitor and comparison results and the recrawl schedule"""
+    db.clear_competitor_data()
 
 
 def main():
+    parser = argparse.ArgumentParser(description='Run the full competition analysis')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--replay', metavar='PATH', help='scrape from a recorded page archive instead of the network')
+    source.add_argument('--record', metavar='PATH', help='record scraped pages into a page archive')
+    parser.add_argument('--metrics', metavar='PATH', default=SCRAPE_METRICS_PATH or None,
+                        help='write per-URL scrape timings and counters to this JSON file')
+    parser.add_argument('--full', action='store_true',
+                        help='clear previous results and re-fetch every competitor, not just those due')
+    args = parser.parse_args()
+
     db = CollegeDatabase()
 
-    # Clear previous results to keep runs idempotent
-    clear_database(db)
+    # Incremental by default: imports overwrite rows in place and only due sites are re-fetched
+    if args.full:
+        clear_database(db)
 
     # Import sample CSV if present
     csv_path = Path('sample_competitors.csv')
@@ -59,10 +79,29 @@ def main():
         print("No sample CSV found, skipping import")
 
     # Run matcher
-    matcher = CourseMatcherAI()
-    competitor_urls = [c.get('source_url') for c in db.get_all_competitors() if c.get('source_url')]
+    matcher = CourseMatcherAI(full_refresh=args.full)
+    archive = None
+    if args.replay or args.record:
+        archive = PageArchive(args.replay or args.record, 'replay' if args.replay else 'record')
+        matcher.scraper.archive = archive
+        print(f"{'Replaying' if args.replay else 'Recording'} pages: {archive.path}")
+    # Imported rows and stored report rows can share a URL
+    competitor_urls = list(dict.fromkeys(c.get('source_url') for c in db.get_all_competitors()
+                                         if c.get('source_url')))
+
+    try:
+        report = matcher.generate_competition_report('college_1', competitor_urls)
+    finally:
+        # Flushes a recording's index even if the run fails or is interrupted
+        if archive is not None:
+            archive.close()
 
-    report = matcher.generate_competition_report('college_1', competitor_urls)
+    metrics = get_default_metrics()
+    if len(metrics):
+        print(metrics.format_summary())
+    if args.metrics:
+        metrics.export_json(args.metrics)
+        print(f"Saved scrape metrics -> {args.metrics}")
 
     # Save report JSON
     with open(REPORT_JSON, 'w', encoding='utf-8') as fh:
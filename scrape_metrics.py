@@ -0,0 +1,272 @@
+"""Per-URL scrape timings and counters, kept in process for finding slow hosts and strategies.
+
+`CollegeScraper` records into a `MetricsRegistry` as it works. For each URL it
+records:
+
+- connect: seconds spent opening new connections (DNS, TCP and TLS); left out
+  when a kept-alive connection was reused
+- ttfb: from sending the request to having the response headers, including
+  any connect time (summed over attempts)
+- download: reading the body
+- fetch: the whole fetch, including retries and their backoff
+- parse: building the tree and running extraction
+- strategy.<name>: each program-extraction strategy that ran
+- render: headless-browser rendering, when it was needed
+
+It also records counters: requests, retries, bytes (as sent over the wire,
+so compressed) and body_bytes (decoded). It records fields too: the HTTP
+status, where the page came from (network, cache or archive) and the
+strategy that produced the programs.
+
+`summary()` aggregates per phase, per host and per strategy.
+`format_summary()` renders that as text, and `export_json()` writes it
+together with every per-URL entry.
+
+Memory stays bounded over long crawls. Past METRICS_MAX_URLS entries, the
+oldest URL is folded into a running total for its host, and hosts past
+METRICS_MAX_HOSTS share one '(other hosts)' total. Folded URLs still count
+in the summary's totals, strategy wins and host table. Phase percentiles,
+slowest URLs and the exported per-URL entries cover only the URLs still held.
+
+Scrapers record into the process-wide registry unless given their own.
+`set_default_metrics()` swaps that registry, e.g. for a fresh one per test
+or per run.
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+from config import METRICS_MAX_URLS, METRICS_MAX_HOSTS
+
+COUNTERS = ('requests', 'retries', 'bytes', 'body_bytes')
+# Phases that add up to the time a URL took end to end
+ELAPSED_PHASES = ('fetch', 'parse', 'render')
+# Host total that folded URLs share once METRICS_MAX_HOSTS hosts are tracked
+OTHER_HOSTS = '(other hosts)'
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _stats(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    total = sum(ordered)
+    return {
+        'count': len(ordered),
+        'total': round(total, 6),
+        'mean': round(total / len(ordered), 6) if ordered else 0.0,
+        'p50': round(_percentile(ordered, 0.5), 6),
+        'p95': round(_percentile(ordered, 0.95), 6),
+        'max': round(ordered[-1], 6) if ordered else 0.0,
+    }
+
+
+class MetricsRegistry:
+    """Thread-safe registry of per-URL timings, counters and fields."""
+
+    def __init__(self, max_urls: int = METRICS_MAX_URLS, max_hosts: int = METRICS_MAX_HOSTS):
+        self.max_urls = max(1, max_urls)
+        self.max_hosts = max(1, max_hosts)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self._folded: Dict[str, Dict] = {}  # host -> totals of URLs evicted from _entries
+
+    def add_time(self, url: str, name: str, seconds: float):
+        """Add `seconds` to the URL's `name` timing (timings accumulate across attempts)."""
+        with self._lock:
+            timings = self._entry(url)['timings']
+            timings[name] = timings.get(name, 0.0) + seconds
+
+    @contextmanager
+    def timer(self, url: str, name: str):
+        """Time the body of a with-block into the URL's `name` timing."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(url, name, time.perf_counter() - start)
+
+    def count(self, url: str, name: str, amount: int = 1):
+        with self._lock:
+            entry = self._entry(url)
+            entry[name] = entry.get(name, 0) + amount
+
+    def set(self, url: str, **fields):
+        """Set fields such as status, source or strategy on the URL's entry."""
+        with self._lock:
+            self._entry(url).update(fields)
+
+    def get(self, url: str) -> Optional[Dict]:
+        """A copy of the URL's entry, or None if nothing was recorded for it."""
+        with self._lock:
+            entry = self._entries.get(url)
+            return self._copy(entry) if entry is not None else None
+
+    def pop(self, url: str) -> Optional[Dict]:
+        """Remove and return the URL's entry (used to ship a worker's entry back to the parent)."""
+        with self._lock:
+            return self._entries.pop(url, None)
+
+    def merge(self, url: str, other: Optional[Dict]):
+        """Fold an entry recorded elsewhere (e.g. in a parser process) into the URL's entry."""
+        if not other:
+            return
+        with self._lock:
+            entry = self._entry(url)
+            for name, seconds in other.get('timings', {}).items():
+                entry['timings'][name] = entry['timings'].get(name, 0.0) + seconds
+            for name, value in other.items():
+                if name in COUNTERS:
+                    entry[name] = entry.get(name, 0) + value
+                elif name not in ('url', 'host', 'timings') and value is not None:
+                    entry[name] = value
+
+    def entries(self) -> List[Dict]:
+        with self._lock:
+            return [self._copy(entry) for entry in self._entries.values()]
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self._folded.clear()
+
+    def __len__(self):
+        """URLs with a per-URL entry (folded ones excluded)."""
+        with self._lock:
+            return len(self._entries)
+
+    def summary(self, top: int = 5) -> Dict:
+        """Totals, per-phase distributions, strategy wins and the slowest hosts and URLs."""
+        with self._lock:
+            entries = [self._copy(entry) for entry in self._entries.values()]
+            folded = [self._copy(totals) for totals in self._folded.values()]
+        phases: Dict[str, List[float]] = {}
+        wins: Dict[str, int] = {}
+        hosts: Dict[str, Dict] = {}
+        for entry in entries:
+            for name, seconds in entry['timings'].items():
+                phases.setdefault(name, []).append(seconds)
+            if entry.get('strategy'):
+                wins[entry['strategy']] = wins.get(entry['strategy'], 0) + 1
+            self._add_to_host(hosts, entry, 1)
+        for totals in folded:
+            for name, count in totals['wins'].items():
+                wins[name] = wins.get(name, 0) + count
+            self._add_to_host(hosts, totals, totals['urls'])
+
+        for host in hosts.values():
+            host['mean_elapsed'] = round(host['elapsed'] / host['urls'], 6)
+            host['mean_ttfb'] = round(host['ttfb'] / host['requests'], 6) if host['requests'] else 0.0
+            host['elapsed'] = round(host['elapsed'], 6)
+            del host['ttfb']
+
+        slowest = sorted(entries, key=self.elapsed, reverse=True)[:top]
+        return {
+            'urls': len(entries) + sum(t['urls'] for t in folded),
+            'folded_urls': sum(t['urls'] for t in folded),
+            **{name: sum(e.get(name, 0) for e in entries + folded) for name in COUNTERS},
+            'phases': {name: _stats(values) for name, values in sorted(phases.items())},
+            'strategy_wins': dict(sorted(wins.items(), key=lambda item: -item[1])),
+            'slowest_hosts': dict(sorted(hosts.items(), key=lambda item: -item[1]['elapsed'])[:top]),
+            'slowest_urls': [{'url': e['url'], 'elapsed': round(self.elapsed(e), 6)} for e in slowest],
+        }
+
+    def format_summary(self, top: int = 5) -> str:
+        """The summary as a plain-text table for logs and the console."""
+        summary = self.summary(top)
+        lines = [f"Scrape metrics: {summary['urls']} URL(s), {summary['requests']} request(s), "
+                 f"{summary['retries']} retr{'y' if summary['retries'] == 1 else 'ies'}, "
+                 f"{summary['bytes'] / 1024:.1f} KiB transferred "
+                 f"({summary['body_bytes'] / 1024:.1f} KiB decoded)"]
+        if summary['phases']:
+            lines.append(f"  {'phase':<24}{'count':>7}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+            for name, stats in summary['phases'].items():
+                lines.append(f"  {name:<24}{stats['count']:>7}{stats['mean'] * 1000:>10.1f}"
+                             f"{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}{stats['max'] * 1000:>10.1f}")
+        if summary['strategy_wins']:
+            lines.append('  programs found by: ' + ', '.join(
+                f"{name} ({count})" for name, count in summary['strategy_wins'].items()))
+        for host, stats in summary['slowest_hosts'].items():
+            lines.append(f"  slow host {host}: {stats['elapsed']:.2f}s over {stats['urls']} URL(s), "
+                         f"mean TTFB {stats['mean_ttfb'] * 1000:.0f} ms, {stats['retries']} retries")
+        return '\n'.join(lines)
+
+    def to_json(self, top: int = 5) -> str:
+        return json.dumps({'summary': self.summary(top), 'urls': self.entries()}, indent=2)
+
+    def export_json(self, path: str, top: int = 5):
+        """Write the summary and every per-URL entry to `path` as JSON."""
+        with open(path, 'w', encoding='utf-8') as fh:
+            fh.write(self.to_json(top))
+
+    @staticmethod
+    def elapsed(entry: Dict) -> float:
+        """Seconds a URL took end to end (fetch, parse and render)."""
+        return sum(entry['timings'].get(name, 0.0) for name in ELAPSED_PHASES)
+
+    @classmethod
+    def _add_to_host(cls, hosts: Dict[str, Dict], entry: Dict, urls: int):
+        host = hosts.setdefault(entry['host'], {'urls': 0, 'elapsed': 0.0, 'ttfb': 0.0,
+                                                'requests': 0, 'retries': 0, 'bytes': 0})
+        host['urls'] += urls
+        host['elapsed'] += cls.elapsed(entry)
+        host['ttfb'] += entry['timings'].get('ttfb', 0.0)
+        for name in ('requests', 'retries', 'bytes'):
+            host[name] += entry.get(name, 0)
+
+    def _entry(self, url: str) -> Dict:
+        # Caller holds the lock
+        entry = self._entries.get(url)
+        if entry is None:
+            if len(self._entries) >= self.max_urls:
+                self._fold(self._entries.pop(next(iter(self._entries))))
+            entry = {'url': url, 'host': urlparse(url).netloc.lower() or url, 'timings': {},
+                     **{name: 0 for name in COUNTERS}}
+            self._entries[url] = entry
+        return entry
+
+    def _fold(self, entry: Dict):
+        """Add an evicted URL's figures to its host's running total."""
+        host = entry['host']
+        if host not in self._folded and len(self._folded) >= self.max_hosts:
+            host = OTHER_HOSTS
+        totals = self._folded.get(host)
+        if totals is None:
+            totals = {'host': host, 'urls': 0, 'timings': {}, 'wins': {}, **{name: 0 for name in COUNTERS}}
+            self._folded[host] = totals
+        totals['urls'] += 1
+        for name, seconds in entry['timings'].items():
+            totals['timings'][name] = totals['timings'].get(name, 0.0) + seconds
+        for name in COUNTERS:
+            totals[name] += entry.get(name, 0)
+        if entry.get('strategy'):
+            totals['wins'][entry['strategy']] = totals['wins'].get(entry['strategy'], 0) + 1
+
+    @staticmethod
+    def _copy(entry: Dict) -> Dict:
+        copy = {**entry, 'timings': dict(entry['timings'])}
+        if 'wins' in entry:
+            copy['wins'] = dict(entry['wins'])
+        return copy
+
+
+_default_registry = MetricsRegistry()
+
+
+def get_default_metrics() -> MetricsRegistry:
+    """The process-wide registry every scraper records into unless given its own."""
+    return _default_registry
+
+
+def set_default_metrics(registry: MetricsRegistry) -> MetricsRegistry:
+    """Make `registry` the process-wide one for scrapers created from now on; returns the old one."""
+    global _default_registry
+    previous, _default_registry = _default_registry, registry
+    return previous
@@ -0,0 +1,133 @@
+"""Pipelined scraping: network fetches on threads, HTML parsing in a process pool.
+
+Parsing in `CollegeScraper._extract_college_data` is CPU-bound and holds the
+GIL, so fetching threads alone can only keep one core busy. `ScrapePipeline`
+fetches on a thread pool, queues each new page body for a pool of parser
+processes, and hands finished records back to the calling thread, which is
+the only one that writes to the `CollegeDatabase`. Pages whose parsed record
+has no programs are rendered in the scraper's browser pool (when it has one)
+on a fetch thread, as `scrape_college` would.
+"""
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from config import MAX_CONCURRENCY, PARSE_WORKERS
+from scraper import CollegeScraper
+from domain_rules import DomainRegistry
+from scrape_metrics import MetricsRegistry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+# One extractor per parser process, created by the pool initializer
+_worker_scraper = None
+
+
+def _init_worker(parser_backend: str, domain_rules: Dict[str, Dict]):
+    global _worker_scraper
+    # Its own metrics: entries are sent back with each record and merged in the parent
+    _worker_scraper = CollegeScraper(cache_dir=None, parser_backend=parser_backend,
+                                     domain_registry=DomainRegistry(domain_rules),
+                                     metrics=MetricsRegistry())
+
+
+def _parse_in_worker(content: bytes, url: str, content_hash: str) -> Tuple[Dict, Optional[Dict]]:
+    record = _worker_scraper._extract_from_content(content, url, content_hash)
+    return record, _worker_scraper.metrics.pop(url)
+
+
+class ScrapePipeline:
+    """Fetch with threads, parse with processes, write results from one thread."""
+
+    def __init__(self, scraper: Optional[CollegeScraper] = None,
+                 fetch_concurrency: int = MAX_CONCURRENCY,
+                 parse_workers: int = PARSE_WORKERS, db=None):
+        self.scraper = scraper or CollegeScraper()
+        self.fetch_concurrency = max(1, fetch_concurrency)
+        self.parse_workers = parse_workers if parse_workers and parse_workers > 0 else (os.cpu_count() or 1)
+        # Optional CollegeDatabase; records are written as they come off the parsers
+        self.db = db
+
+    def run(self, urls: Iterable[str]) -> Iterator[Tuple[str, Optional[Dict]]]:
+        """Scrape URLs, yielding (url, college_data) pairs in completion order."""
+        url_iter = iter(urls)
+        fetch_pool = ThreadPoolExecutor(max_workers=self.fetch_concurrency)
+        parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers, initializer=_init_worker,
+                                         initargs=(self.scraper.parser_backend,
+                                                   self.scraper.domain_registry.entries))
+        fetching = {}  # fetch future -> url
+        parsing = {}   # parse future -> FetchedPage
+        rendering = {}  # render future -> (FetchedPage, static record)
+        # Backpressure: stop fetching while this many bodies are waiting on the parsers
+        max_parse_backlog = 2 * self.parse_workers
+
+        def refill():
+            while (len(fetching) + len(rendering) < self.fetch_concurrency
+                   and len(parsing) < max_parse_backlog):
+                url = next(url_iter, _END)
+                if url is _END:
+                    return
+                fetching[fetch_pool.submit(self.scraper.fetch_page, url)] = url
+
+        try:
+            refill()
+            while fetching or parsing or rendering:
+                done, _ = wait(list(fetching) + list(parsing) + list(rendering), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in fetching:
+                        url = fetching.pop(future)
+                        try:
+                            page = future.result()
+                        except Exception as e:
+                            logger.error(f"Unexpected error fetching {url}: {e}")
+                            page = None
+                        if page is None or page.record is not None:
+                            yield self._finish(url, page.record if page else None)
+                            continue
+
+                        content_hash = hashlib.sha256(page.content).hexdigest()
+                        stored = self.scraper._stored_record_if_unchanged(url, content_hash)
+                        if stored is not None:
+                            yield self._finish(url, stored)
+                            continue
+                        parsing[parse_pool.submit(_parse_in_worker, page.content, url, content_hash)] = page
+                    elif future in parsing:
+                        page = parsing.pop(future)
+                        try:
+                            college_data, parse_metrics = future.result()
+                            self.scraper.metrics.merge(page.url, parse_metrics)
+                        except Exception as e:
+                            logger.error(f"Unexpected error parsing {page.url}: {e}")
+                            yield self._finish(page.url, None)
+                            continue
+                        if self.scraper.renderer is not None and not college_data.get('programs'):
+                            # Browser rendering blocks for seconds: keep it off this thread
+                            rendering[fetch_pool.submit(self.scraper._render_if_empty, page.url,
+                                                        college_data)] = (page, college_data)
+                            continue
+                        yield self._record(page, college_data)
+                    else:
+                        page, college_data = rendering.pop(future)
+                        try:
+                            college_data = future.result()
+                        except Exception as e:
+                            logger.error(f"Unexpected error rendering {page.url}: {e}")
+                        yield self._record(page, college_data)
+                refill()
+        finally:
+            fetch_pool.shutdown(wait=False, cancel_futures=True)
+            parse_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _record(self, page, college_data: Dict) -> Tuple[str, Optional[Dict]]:
+        self.scraper.remember(page, college_data)
+        logger.info(f"Successfully scraped {college_data.get('name') or page.url}")
+        return self._finish(page.url, college_data)
+
+    def _finish(self, url: str, college_data: Optional[Dict]) -> Tuple[str, Optional[Dict]]:
+        if college_data and self.db is not None:
+            self.db.add_competitor(college_data)
+        return url, college_data
@@ -2,11 +2,24 @@
 import requests
 from bs4 import BeautifulSoup
 import logging
-from typing import Dict, Optional, List
-from config import SCRAPING_TIMEOUT, MAX_RETRIES, USER_AGENT
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Optional, List, Iterable, Iterator, Tuple
+from config import (MAX_CONCURRENCY, PARSE_WORKERS, HTTP_CACHE_DIR, HTML_PARSER,
+                    CRAWL_MAX_DEPTH, CRAWL_MAX_PAGES, USE_SITEMAPS, MAX_PAGE_BYTES)
+from http_cache import ResponseCache
+from http_pool import discard_body, make_session, take_connect_time
+from retry_policy import RetryPolicy, CircuitBreaker, parse_retry_after
+from page_archive import PageArchive, get_default_archive
+from renderer import BrowserPool, get_default_renderer
+from scrape_metrics import MetricsRegistry, get_default_metrics
+from html_parsers import make_soup, resolve_backend
+from domain_rules import DomainRegistry, DomainRules, PROGRAM_SELECTORS, get_default_registry
+from program_names import dedupe_programs
 from urllib.parse import urlparse
+from functools import partial
+import hashlib
 import json
-import re
+import time
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -15,84 +28,497 @@ logger = logging.getLogger(__name__)
 class CollegeScraper:
     """Scrapes college data from websites with domain-aware parsing and fallbacks."""
 
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({'User-Agent': USER_AGENT})
+    def __init__(self, cache_dir: Optional[str] = HTTP_CACHE_DIR, db=None,
+                 parser_backend: Optional[str] = HTML_PARSER,
+                 domain_registry: Optional[DomainRegistry] = None,
+                 archive: Optional[PageArchive] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None,
+                 max_page_bytes: int = MAX_PAGE_BYTES,
+                 renderer: Optional[BrowserPool] = None,
+                 metrics: Optional[MetricsRegistry] = None):
+        # Response cache for conditional revalidation; disabled when cache_dir is empty
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        # Optional CollegeDatabase used to skip re-extracting unchanged pages
+        self.db = db
+        self.parser_backend = resolve_backend(parser_backend)
+        # Per-domain selector rules, loaded from DOMAIN_RULES_PATH by default
+        self.domain_registry = domain_registry or get_default_registry()
+        # Offline page archive to replay from or record into (SCRAPER_ARCHIVE by default)
+        self.archive = archive if archive is not None else get_default_archive()
+        # Backoff between retries, and fail-fast for hosts that keep failing
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        # Bodies are read up to this many bytes; the rest of an oversized page is skipped
+        self.max_page_bytes = max_page_bytes
+        # Headless browsers for pages whose programs only appear after JavaScript runs (USE_RENDERER)
+        self.renderer = renderer if renderer is not None else get_default_renderer()
+        # Keep-alive pools sized for concurrent scrapes, so connections are reused, not re-handshaked
+        self.session = make_session()
+        # Per-URL timings and counters (the process-wide registry by default)
+        self.metrics = metrics if metrics is not None else get_default_metrics()
 
     def scrape_college(self, url: str) -> Optional[Dict]:
         """Scrape college data from a URL with retry and safe fallbacks."""
-        for attempt in range(MAX_RETRIES):
-            try:
-                response = self.session.get(url, timeout=SCRAPING_TIMEOUT)
-                response.raise_for_status()
+        page = self.fetch_page(url)
+        if page is None:
+            return None
+        if page.record is not None:
+            return page.record
+
+        college_data = self._parse_content(page.content, url)
+        college_data = self._render_if_empty(url, college_data)
+        self.remember(page, college_data)
 
-                soup = BeautifulSoup(response.content, 'html.parser')
-                college_data = self._extract_college_data(soup, url)
+        logger.info(f"Successfully scraped {college_data.get('name') or url}")
+        return college_data
 
-                logger.info(f"Successfully scraped {college_data.get('name') or url}")
-                return college_data
+    def scrape_college_deep(self, url: str, max_depth: int = CRAWL_MAX_DEPTH,
+                            max_pages: int = CRAWL_MAX_PAGES,
+                            use_sitemaps: bool = USE_SITEMAPS) -> Optional[Dict]:
+        """Scrape a college plus the catalogue pages linked from it, merging their programs.
+
+        Follows same-site program/course/department links up to `max_depth`
+        levels deep, fetching at most `max_pages` pages (see crawl_frontier).
+        With `use_sitemaps`, course pages listed in the site's sitemaps are
+        fetched first (see sitemap.py).
+        """
+        from crawl_frontier import CatalogueCrawler
+        seeds = []
+        if use_sitemaps:
+            from sitemap import SitemapDiscovery
+            seeds = SitemapDiscovery(self).discover(url, limit=max(0, max_pages - 1))
+        return CatalogueCrawler(self, max_depth=max_depth, max_pages=max_pages).crawl(url, seeds)
+
+    def _scrape_page_with_links(self, url: str) -> Tuple[Optional[Dict], List[Tuple[str, str]]]:
+        """Scrape one page and also return its (href, link text) pairs; (None, []) on failure."""
+        page = self.fetch_page(url)
+        if page is None:
+            return None, []
+        content = page.content
+        if content is None and self.cache:
+            # A cached record has no links: re-read them from the cached body
+            content = self.cache.get_body(url)
+        if content is None:
+            return page.record, []
+
+        with self.metrics.timer(url, 'parse'):
+            soup = make_soup(content, self.parser_backend)
+            rules = self.domain_registry.lookup(self._get_domain(url))
+            candidates = PageCandidates(soup, rules)
+            college_data = page.record
+            if college_data is None:
+                college_data = self._extract_college_data(soup, url, candidates)
+                college_data['content_hash'] = hashlib.sha256(content).hexdigest()
+        if page.record is None:
+            # A JavaScript-built page: take both the programs and the links from the rendered DOM
+            rendered = self._render(url, college_data)
+            if rendered is not None:
+                with self.metrics.timer(url, 'parse'):
+                    rendered_soup = make_soup(rendered, self.parser_backend)
+                    rendered_candidates = PageCandidates(rendered_soup, rules)
+                    rendered_data = self._extract_college_data(rendered_soup, url, rendered_candidates)
+                if rendered_data.get('programs'):
+                    rendered_data['content_hash'] = college_data['content_hash']
+                    college_data, candidates = rendered_data, rendered_candidates
+            self.remember(page, college_data)
+        return college_data, [(a['href'], a.get_text(' ', strip=True)) for a in candidates.links]
+
+    def _render_if_empty(self, url: str, college_data: Dict) -> Dict:
+        """Re-extract from the browser-rendered page when static extraction found no programs.
+
+        The rendered record keeps the static page's content_hash, so an
+        unchanged page later reuses it from the database without rendering.
+        Used by scrape_college, the deep crawl and ScrapePipeline alike.
+        """
+        rendered = self._render(url, college_data)
+        if rendered is None:
+            return college_data
+        rendered_data = self._extract_from_content(rendered, url, college_data.get('content_hash'))
+        if not rendered_data.get('programs'):
+            return college_data
+        return rendered_data
+
+    def _render(self, url: str, college_data: Dict) -> Optional[bytes]:
+        """The browser-rendered page if static extraction found no programs and a renderer is set."""
+        if self.renderer is None or college_data.get('programs'):
+            return None
+        if self.archive is not None and self.archive.replaying:
+            return None
+        logger.info(f"No programs in the static HTML of {url}, rendering it")
+        with self.metrics.timer(url, 'render'):
+            rendered = self.renderer.render(url)
+        return rendered or None
+
+    def fetch_page(self, url: str) -> Optional['FetchedPage']:
+        """Fetch a URL without parsing it, retrying transient failures.
+
+        Connection errors, timeouts and retryable statuses (429, 503, ...) are
+        retried after an exponential, jittered backoff or the server's
+        Retry-After; other 4xx/5xx fail at once. Hosts that keep failing are
+        skipped by the circuit breaker (see retry_policy).
+
+        Returns a FetchedPage holding either a ready record (fresh cache entry
+        or a 304 revalidation) or the body to parse; None if every attempt failed.
+        When replaying a page archive, the body comes from the archive instead.
+        Timings, byte counts and retries are recorded in `self.metrics`.
+        """
+        with self.metrics.timer(url, 'fetch'):
+            return self._fetch_page(url)
+
+    def _fetch_page(self, url: str) -> Optional['FetchedPage']:
+        metrics = self.metrics
+        if self.archive is not None and self.archive.replaying:
+            content = self.archive.get(url)
+            if content is None:
+                logger.warning(f"{url} is not in page archive {self.archive.path}")
+                return None
+            metrics.set(url, source='archive')
+            metrics.count(url, 'body_bytes', len(content))
+            return FetchedPage(url, content=content)
+
+        cached, page = self._cached_page(url)
+        if page is not None:
+            return page
+
+        host = self._get_domain(url)
+        policy = self.retry_policy
+        for attempt in range(policy.max_retries):
+            if not self._begin_attempt(url, host, attempt):
+                return None
 
-            except requests.RequestException as e:
-                logger.warning(f"Attempt {attempt + 1} failed for {url}: {e}")
-                if attempt == MAX_RETRIES - 1:
-                    logger.error(f"Failed to scrape {url} after {MAX_RETRIES} attempts")
+            content, truncated = None, False
+            try:
+                take_connect_time()
+                started = time.perf_counter()
+                try:
+                    # Streamed, so the body can be refused by type and cut off at the byte budget
+                    response = self.session.get(url, timeout=policy.timeout, stream=True,
+                                                headers=ResponseCache.conditional_headers(cached))
+                    metrics.add_time(url, 'ttfb', time.perf_counter() - started)
+                    self._record_connect_time(url)
+                    with response:
+                        status = response.status_code
+                        if self._wants_body(status, response.headers):
+                            with metrics.timer(url, 'download'):
+                                content, truncated = read_bounded(response.iter_content(CHUNK_SIZE),
+                                                                  self.max_page_bytes)
+                            # Bytes off the wire, before decompression
+                            metrics.count(url, 'bytes', response.raw.tell())
+                            metrics.count(url, 'body_bytes', len(content))
+                        else:
+                            # Error pages and non-HTML bodies: drained so the connection is reused
+                            discard_body(response)
+                except requests.RequestException as e:
+                    self._record_connect_time(url)
+                    error, retry_after = e, None
+                else:
+                    page, error, retry_after = self._handle_response(url, cached, status, response.headers,
+                                                                     content, truncated)
+                    if error is None:
+                        return page
+                if self._attempt_failed(url, host, attempt, error):
                     return None
+            finally:
+                # Frees the half-open probe if something other than a request error escaped
+                self.breaker.release(host)
+            time.sleep(policy.delay(attempt, retry_after))
 
         return None
 
-    def _extract_college_data(self, soup: BeautifulSoup, url: str) -> Dict:
-        """Extract college information from BeautifulSoup object using multiple strategies."""
+    def fetch_resource(self, url: str, max_bytes: Optional[int] = None) -> Optional[bytes]:
+        """One GET of a non-page file (robots.txt, a sitemap) without retries; its body or None.
+
+        Such files are often simply absent, so a failure isn't retried, but
+        the circuit breaker, metrics and byte budget (`max_bytes`, default
+        max_page_bytes) apply as for pages. A body over budget is dropped
+        rather than truncated. The page archive is used like fetch_page does.
+        """
+        if self.archive is not None and self.archive.replaying:
+            return self.archive.get(url)
+        host = self._get_domain(url)
+        if not self._begin_attempt(url, host, 0):
+            return None
+
+        max_bytes = max_bytes or self.max_page_bytes
+        metrics = self.metrics
+        take_connect_time()
+        try:
+            with metrics.timer(url, 'fetch'):
+                started = time.perf_counter()
+                response = self.session.get(url, timeout=self.retry_policy.timeout, stream=True)
+                metrics.add_time(url, 'ttfb', time.perf_counter() - started)
+                self._record_connect_time(url)
+                with response:
+                    status = response.status_code
+                    metrics.set(url, status=status, source='network')
+                    if self.retry_policy.should_retry_status(status):
+                        self.breaker.record_failure(host)
+                    else:
+                        self.breaker.record_success(host)
+                    if status != 200:
+                        discard_body(response)
+                        return None
+                    with metrics.timer(url, 'download'):
+                        content, truncated = read_bounded(response.iter_content(CHUNK_SIZE), max_bytes)
+                    metrics.count(url, 'bytes', response.raw.tell())
+                    metrics.count(url, 'body_bytes', len(content))
+        except requests.RequestException as e:
+            self._record_connect_time(url)
+            self.breaker.record_failure(host)
+            logger.debug(f"Could not fetch {url}: {e}")
+            return None
+        finally:
+            self.breaker.release(host)
+
+        if truncated:
+            logger.warning(f"Skipping {url}: larger than {max_bytes} bytes")
+            return None
+        if self.archive is not None and self.archive.recording:
+            self.archive.record(url, content)
+        return content
+
+    # The steps below are shared with AsyncCollegeScraper, which does only the network I/O itself
+
+    def _cached_page(self, url: str) -> Tuple[Optional[Dict], Optional['FetchedPage']]:
+        """The cache entry to revalidate against, and a ready page if that entry is still fresh."""
+        # While recording, always download so the archive gets every body
+        recording = self.archive is not None and self.archive.recording
+        cached = self.cache.get(url) if self.cache and not recording else None
+        if cached and cached.get('record') and self.cache.is_fresh(cached):
+            logger.info(f"Using cached data for {url}")
+            self.metrics.set(url, source='cache')
+            return cached, FetchedPage(url, record=cached['record'])
+        return cached, None
+
+    def _begin_attempt(self, url: str, host: str, attempt: int) -> bool:
+        """Count a request attempt; False if the host's circuit is open and it must be skipped."""
+        if not self.breaker.allow(host):
+            logger.warning(f"Skipping {url}: {host} is failing, circuit open")
+            return False
+        self.metrics.count(url, 'requests')
+        if attempt:
+            self.metrics.count(url, 'retries')
+        return True
+
+    @staticmethod
+    def _wants_body(status: int, headers) -> bool:
+        """Whether a response's body is worth reading (a successful HTML page)."""
+        return status < 400 and status != 304 and is_html_content_type(headers.get('Content-Type'))
+
+    def _handle_response(self, url: str, cached: Optional[Dict], status: int, headers,
+                         content: Optional[bytes], truncated: bool
+                         ) -> Tuple[Optional['FetchedPage'], Optional[str], Optional[float]]:
+        """Work out what one HTTP response means for the fetch of `url`.
+
+        Returns (page, error, retry_after). When error is None the fetch is
+        over: page is the result, or None for a non-HTML page or a status not
+        worth retrying. Otherwise the attempt failed, and a retry should
+        wait at least retry_after seconds (None when the server didn't say).
+        Updates the breaker, metrics, response cache and archive on the way.
+        """
+        host = self._get_domain(url)
+        self.metrics.set(url, status=status, source='network')
+        # Not modified: reuse the stored record without re-parsing
+        if status == 304 and cached and cached.get('record'):
+            self.breaker.record_success(host)
+            self.cache.refresh(url, cached, headers)
+            logger.info(f"Not modified, using cached data for {url}")
+            self.metrics.set(url, source='cache')
+            return FetchedPage(url, record=cached['record']), None, None
+
+        if status < 400:
+            self.breaker.record_success(host)
+            if content is None:
+                logger.info(f"Skipping {url}: not an HTML page ({headers.get('Content-Type')})")
+                return None, None, None
+            if truncated:
+                logger.info(f"{url} is larger than {self.max_page_bytes} bytes, parsing its head only")
+            if self.archive is not None and self.archive.recording:
+                self.archive.record(url, content)
+            return FetchedPage(url, content=content, headers=headers, truncated=truncated), None, None
+
+        if not self.retry_policy.should_retry_status(status):
+            # The host answered; retrying a 404 or 403 won't change it
+            self.breaker.record_success(host)
+            logger.error(f"Failed to scrape {url}: HTTP {status}")
+            return None, None, None
+        return None, f"HTTP {status}", parse_retry_after(headers.get('Retry-After'))
+
+    def _attempt_failed(self, url: str, host: str, attempt: int, error) -> bool:
+        """Record a failed attempt against the host; True if it was the last one allowed."""
+        self.breaker.record_failure(host)
+        logger.warning(f"Attempt {attempt + 1} failed for {url}: {error}")
+        if attempt == self.retry_policy.max_retries - 1:
+            logger.error(f"Failed to scrape {url} after {self.retry_policy.max_retries} attempts")
+            return True
+        return False
+
+    def _record_connect_time(self, url: str):
+        """Record the time this thread just spent opening a connection (none if one was reused)."""
+        connect_time = take_connect_time()
+        if connect_time:
+            self.metrics.add_time(url, 'connect', connect_time)
+
+    def connection_stats(self) -> Dict:
+        """Connection reuse so far: requests, new connections and reuse ratio, per host and overall."""
+        return self.session.get_adapter('https://').connection_stats()
+
+    def remember(self, page: 'FetchedPage', college_data: Dict):
+        """Cache the record extracted from a freshly fetched page."""
+        if self.cache and not (self.archive is not None and self.archive.replaying):
+            self.cache.store(page.url, page.content, page.headers, college_data)
+
+    def scrape_many(self, urls: Iterable[str], max_concurrency: int = MAX_CONCURRENCY,
+                    parse_workers: int = PARSE_WORKERS, max_depth: int = 0,
+                    use_sitemaps: bool = False) -> Iterator[Tuple[str, Optional[Dict]]]:
+        """Scrape many URLs with at most `max_concurrency` requests in flight.
+
+        Yields (url, college_data) pairs in completion order. Each URL goes through
+        scrape_college, so retries and fallbacks are unchanged and a failed URL
+        yields None as its college_data. With `parse_workers` > 0, parsing moves
+        to a process pool (see scrape_pipeline.ScrapePipeline). With `max_depth`
+        > 0 or `use_sitemaps`, each URL is crawled with scrape_college_deep
+        instead (parsed on the fetching threads).
+        """
+        scrape = self.scrape_college
+        if (max_depth and max_depth > 0) or use_sitemaps:
+            scrape = partial(self.scrape_college_deep, max_depth=max_depth, use_sitemaps=use_sitemaps)
+        elif parse_workers and parse_workers > 0:
+            from scrape_pipeline import ScrapePipeline
+            pipeline = ScrapePipeline(self, fetch_concurrency=max_concurrency, parse_workers=parse_workers)
+            yield from pipeline.run(urls)
+            return
+
+        url_iter = iter(urls)
+        executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency))
+        pending = {}
+        try:
+            # Keep the window full: submit lazily so huge URL lists aren't queued up front
+            for url in url_iter:
+                pending[executor.submit(scrape, url)] = url
+                if len(pending) >= max_concurrency:
+                    break
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = pending.pop(future)
+                    try:
+                        college_data = future.result()
+                    except Exception as e:
+                        logger.error(f"Unexpected error scraping {url}: {e}")
+                        college_data = None
+                    yield url, college_data
+
+                for url in url_iter:
+                    pending[executor.submit(scrape, url)] = url
+                    if len(pending) >= max_concurrency:
+                        break
+
+            usage = self.connection_stats()
+            logger.info(f"Connection reuse: {usage['requests']} requests over "
+                        f"{usage['connections']} connections ({usage['reuse_ratio']:.0%} reused)")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _parse_content(self, content: bytes, url: str) -> Dict:
+        """Parse a fetched page body into a college record.
+
+        If the body is byte-identical to the one behind the stored competitor
+        row (same content digest), that row is returned without parsing.
+        """
+        content_hash = hashlib.sha256(content).hexdigest()
+        stored = self._stored_record_if_unchanged(url, content_hash)
+        if stored is not None:
+            return stored
+        return self._extract_from_content(content, url, content_hash)
+
+    def _stored_record_if_unchanged(self, url: str, content_hash: str) -> Optional[Dict]:
+        """The stored competitor row for a URL if its content digest matches, else None."""
+        if self.db is not None:
+            stored = self.db.get_competitor(self._generate_college_id(url))
+            if stored and stored.get('content_hash') == content_hash:
+                logger.info(f"Content unchanged, reusing stored record for {url}")
+                # Callers add keys and store it as JSON, so copy compact records into a dict
+                return dict(stored)
+        return None
+
+    def _extract_from_content(self, content: bytes, url: str, content_hash: Optional[str] = None) -> Dict:
+        """Build the tree and run extraction; pure CPU work with no I/O."""
+        with self.metrics.timer(url, 'parse'):
+            soup = make_soup(content, self.parser_backend)
+            college_data = self._extract_college_data(soup, url)
+        college_data['content_hash'] = content_hash or hashlib.sha256(content).hexdigest()
+        return college_data
+
+    def _extract_college_data(self, soup: BeautifulSoup, url: str,
+                              page: Optional['PageCandidates'] = None) -> Dict:
+        """Extract college information from BeautifulSoup object using multiple strategies.
+
+        The tree is walked once to collect candidates for every strategy (or
+        `page` is reused if already collected); the strategies are then applied
+        in priority order on those candidates.
+        """
         domain = self._get_domain(url)
+        rules = self.domain_registry.lookup(domain)
+        if page is None:
+            page = PageCandidates(soup, rules)
+        fields = rules.field_selectors
 
         # Name: try common places, meta tags, title and fall back to domain
-        name = self._extract_text(soup, ['h1', '.college-name', '.institution-name'])
+        name = page.first_text(fields['name'])
         if not name:
-            name = self._extract_meta(soup, ['og:site_name', 'application-name', 'og:title', 'twitter:title'])
+            name = page.meta_content(['og:site_name', 'application-name', 'og:title', 'twitter:title'])
         if not name:
-            title = soup.title.string if soup.title and soup.title.string else None
+            title = page.title.string if page.title and page.title.string else None
             if title:
                 name = title.strip()
         if not name:
             name = domain
 
-        # Programs: try domain-specific parsers first, then structured data, then generic fallbacks
-        programs = []
-        parser = getattr(self, f"_parse_{domain.replace('.', '_')}", None)
-        if callable(parser):
-            try:
-                programs = parser(soup)
-            except Exception:
-                programs = []
+        # Programs: try domain-specific selectors first, then structured data, then generic fallbacks
+        programs = self._timed_strategy(url, 'domain_rules', self._programs_from_domain_hits, page.domain_hits)
 
         if not programs:
-            programs = self._extract_programs_from_jsonld(soup)
+            programs = self._timed_strategy(url, 'jsonld', self._programs_from_jsonld_scripts,
+                                            page.jsonld_scripts)
 
         if not programs:
-            programs = self._extract_programs(soup)
+            programs = self._timed_strategy(url, 'selectors', self._programs_from_selector_hits,
+                                            page.program_hits)
 
         if not programs:
-            programs = self._extract_programs_by_headers(soup)
+            programs = self._timed_strategy(url, 'headings', self._programs_from_headings, page.headings)
 
         # Links-based extraction as a last-ditch: look for links that contain 'program' or 'major'
         if not programs:
-            programs = self._extract_programs_from_links(soup)
+            programs = self._timed_strategy(url, 'links', self._programs_from_link_tags, page.links)
 
         college_data = {
             'source_url': url,
             'college_id': self._generate_college_id(url),
             'name': name,
-            'location': self._extract_text(soup, ['.location', '.address', '[data-location]']),
-            'tuition': self._extract_number(soup, ['.tuition', '[data-tuition]']),
-            'enrollment': self._extract_number(soup, ['.enrollment', '[data-enrollment]']),
-            'acceptance_rate': self._extract_percentage(soup, ['.acceptance-rate', '[data-acceptance]']),
-            'avg_gpa': self._extract_number(soup, ['.avg-gpa', '[data-gpa]']),
-            'avg_sat': self._extract_number(soup, ['.avg-sat', '[data-sat]']),
-            'avg_act': self._extract_number(soup, ['.avg-act', '[data-act]']),
+            'location': page.first_text(fields['location']),
+            'tuition': self._parse_number(page.first_text(fields['tuition'])),
+            'enrollment': self._parse_number(page.first_text(fields['enrollment'])),
+            'acceptance_rate': self._parse_percentage(page.first_text(fields['acceptance_rate'])),
+            'avg_gpa': self._parse_number(page.first_text(fields['avg_gpa'])),
+            'avg_sat': self._parse_number(page.first_text(fields['avg_sat'])),
+            'avg_act': self._parse_number(page.first_text(fields['avg_act'])),
             'programs': programs
         }
 
         return college_data
 
+    def _timed_strategy(self, url: str, name: str, strategy, candidates) -> List[str]:
+        """Run one program-extraction strategy, recording its time and whether it found programs."""
+        with self.metrics.timer(url, f'strategy.{name}'):
+            programs = strategy(candidates)
+        if programs:
+            self.metrics.set(url, strategy=name)
+        return programs
+
     @staticmethod
     def _get_domain(url: str) -> str:
         try:
@@ -128,7 +554,14 @@ class CollegeScraper:
 
     @staticmethod
     def _extract_number(soup: BeautifulSoup, selectors: list) -> Optional[float]:
-        text = CollegeScraper._extract_text(soup, selectors)
+        return CollegeScraper._parse_number(CollegeScraper._extract_text(soup, selectors))
+
+    @staticmethod
+    def _extract_percentage(soup: BeautifulSoup, selectors: list) -> Optional[float]:
+        return CollegeScraper._parse_percentage(CollegeScraper._extract_text(soup, selectors))
+
+    @staticmethod
+    def _parse_number(text: Optional[str]) -> Optional[float]:
         if text:
             try:
                 return float(''.join(filter(lambda x: x.isdigit() or x == '.', text)))
@@ -137,8 +570,7 @@ class CollegeScraper:
         return None
 
     @staticmethod
-    def _extract_percentage(soup: BeautifulSoup, selectors: list) -> Optional[float]:
-        text = CollegeScraper._extract_text(soup, selectors)
+    def _parse_percentage(text: Optional[str]) -> Optional[float]:
         if text:
             try:
                 num = float(''.join(filter(lambda x: x.isdigit() or x == '.', text)))
@@ -150,30 +582,43 @@ class CollegeScraper:
     @staticmethod
     def _extract_programs(soup: BeautifulSoup) -> List[str]:
         """Look for common program element classes/lists."""
-        programs = []
-        program_selectors = [
-            '.program', '.major', '[data-program]', 'li.program', '.programs li', '.majors li', '.degree-list li'
-        ]
+        return CollegeScraper._programs_from_selector_hits(
+            [soup.select(selector) for selector in PROGRAM_SELECTORS]
+        )
 
-        for selector in program_selectors:
-            elements = soup.select(selector)
+    @staticmethod
+    def _programs_from_selector_hits(hits: List[List]) -> List[str]:
+        """Program texts from elements matched by PROGRAM_SELECTORS (one list per selector)."""
+        programs = []
+        for elements in hits:
             for elem in elements:
                 program_text = elem.get_text(separator=' ', strip=True)
                 if program_text:
                     programs.append(program_text)
 
-        # De-duplicate and limit
-        cleaned = []
-        for p in programs:
-            p_clean = re.sub(r'\s+', ' ', p).strip()
-            if len(p_clean) > 2 and p_clean.lower() not in [c.lower() for c in cleaned]:
-                cleaned.append(p_clean)
-        return cleaned[:50]
+        return dedupe_programs(programs, limit=50)
+
+    @staticmethod
+    def _programs_from_domain_hits(hits: List[List]) -> List[str]:
+        """Program texts from elements matched by a domain's selectors (one list per selector)."""
+        programs = []
+        for elements in hits:
+            for li in elements:
+                t = li.get_text(' ', strip=True)
+                if t:
+                    programs.append(t)
+        return programs
 
     @staticmethod
     def _extract_programs_from_jsonld(soup: BeautifulSoup) -> List[str]:
+        return CollegeScraper._programs_from_jsonld_scripts(
+            soup.find_all('script', type='application/ld+json')
+        )
+
+    @staticmethod
+    def _programs_from_jsonld_scripts(scripts) -> List[str]:
         programs = []
-        for script in soup.find_all('script', type='application/ld+json'):
+        for script in scripts:
             try:
                 data = json.loads(script.string or '{}')
             except Exception:
@@ -186,121 +631,164 @@ class CollegeScraper:
                     continue
                 # Look for Course objects
                 if item.get('@type') == 'Course' and item.get('name'):
-                    programs.append(item.get('name').strip())
+                    programs.append(item.get('name'))
                 # Look for educational offerings
                 if item.get('name') and ('course' in item.get('@type', '').lower() or 'educ' in item.get('@type', '').lower()):
-                    programs.append(item.get('name').strip())
+                    programs.append(item.get('name'))
                 # Some sites embed items inside graph
                 if '@graph' in item and isinstance(item['@graph'], list):
                     for node in item['@graph']:
                         if isinstance(node, dict) and node.get('@type') == 'Course' and node.get('name'):
-                            programs.append(node.get('name').strip())
+                            programs.append(node.get('name'))
 
-        # dedupe
-        out = []
-        for p in programs:
-            if p and p.lower() not in [o.lower() for o in out]:
-                out.append(p)
-        return out
+        return dedupe_programs(programs)
 
     @staticmethod
     def _extract_programs_by_headers(soup: BeautifulSoup) -> List[str]:
         """Find headings like 'Programs' or 'Majors' and extract following lists."""
+        return CollegeScraper._programs_from_headings(
+            {header_tag: soup.find_all(header_tag) for header_tag in HEADING_TAGS}
+        )
+
+    @staticmethod
+    def _programs_from_headings(headings: Dict[str, List]) -> List[str]:
+        """Collect list items following or surrounding program-like headings."""
         keywords = ['program', 'programs', 'major', 'majors', 'degree', 'degrees', 'undergraduate', 'graduate', 'academics']
         programs = []
-        for header_tag in ['h2', 'h3', 'h4', 'h5']:
-            for h in soup.find_all(header_tag):
+        # A section's list items only need collecting once, however many headings share it
+        seen_containers = set()
+        for header_tag in HEADING_TAGS:
+            for h in headings.get(header_tag, []):
                 txt = h.get_text(' ', strip=True).lower()
                 if any(k in txt for k in keywords):
-                    # try next sibling lists
-                    sib = h.find_next_sibling()
-                    # collect from ul/li
-                    if sib:
-                        lis = sib.find_all('li')
-                        for li in lis:
-                            t = li.get_text(' ', strip=True)
-                            if t:
-                                programs.append(t)
-                    # collect paragraphs under the section
-                    parent = h.parent
-                    if parent:
-                        for li in parent.find_all('li'):
+                    # try next sibling lists, then list items in the enclosing section
+                    for container in (h.find_next_sibling(), h.parent):
+                        if container is None or id(container) in seen_containers:
+                            continue
+                        seen_containers.add(id(container))
+                        for li in container.find_all('li'):
                             t = li.get_text(' ', strip=True)
                             if t:
                                 programs.append(t)
 
-        # dedupe and cleanup
-        out = []
-        for p in programs:
-            p_clean = re.sub(r'\s+', ' ', p).strip()
-            if len(p_clean) > 2 and p_clean.lower() not in [o.lower() for o in out]:
-                out.append(p_clean)
-        return out
+        return dedupe_programs(programs)
 
     @staticmethod
     def _extract_programs_from_links(soup: BeautifulSoup) -> List[str]:
+        return CollegeScraper._programs_from_link_tags(soup.find_all('a', href=True))
+
+    @staticmethod
+    def _programs_from_link_tags(links) -> List[str]:
         programs = []
-        for a in soup.find_all('a', href=True):
+        for a in links:
             href = a['href'].lower()
             if 'program' in href or 'major' in href or 'degree' in href or 'academics' in href:
-                txt = a.get_text(' ', strip=True)
-                if txt and len(txt) > 2:
-                    programs.append(txt)
-        # dedupe
-        out = []
-        for p in programs:
-            if p.lower() not in [o.lower() for o in out]:
-                out.append(p)
-        return out
-
-    # domain-specific parsers (lightweight heuristics)
-    def _parse_harvard_edu(self, soup: BeautifulSoup) -> List[str]:
-        # Harvard often lists programs under elements with class 'programs-list' or 'field-list'
-        programs = []
-        for sel in ['.programs-list li', '.field-list li', '.academic-programs li', '.degree-list li']:
-            for li in soup.select(sel):
-                t = li.get_text(' ', strip=True)
-                if t:
-                    programs.append(t)
-        return programs
-
-    def _parse_stanford_edu(self, soup: BeautifulSoup) -> List[str]:
-        programs = []
-        for sel in ['.academics-list li', '.programs-list li', '.major-list li']:
-            for li in soup.select(sel):
-                t = li.get_text(' ', strip=True)
-                if t:
-                    programs.append(t)
-        return programs
-
-    def _parse_mit_edu(self, soup: BeautifulSoup) -> List[str]:
-        programs = []
-        for sel in ['.degree-list li', '.program-list li', '.department-list li']:
-            for li in soup.select(sel):
-                t = li.get_text(' ', strip=True)
-                if t:
-                    programs.append(t)
-        return programs
-
-    def _parse_berkeley_edu(self, soup: BeautifulSoup) -> List[str]:
-        programs = []
-        for sel in ['.programs li', '.majors li', '.degree-list li']:
-            for li in soup.select(sel):
-                t = li.get_text(' ', strip=True)
-                if t:
-                    programs.append(t)
-        return programs
-
-    def _parse_yale_edu(self, soup: BeautifulSoup) -> List[str]:
-        programs = []
-        for sel in ['.programs li', '.academics li', '.majors li']:
-            for li in soup.select(sel):
-                t = li.get_text(' ', strip=True)
-                if t:
-                    programs.append(t)
-        return programs
+                programs.append(a.get_text(' ', strip=True))
+        return dedupe_programs(programs)
 
     @staticmethod
     def _generate_college_id(url: str) -> str:
         """Generate unique ID from URL"""
         return url.replace('https://', '').replace('http://', '').replace('/', '_')
+
+
+class FetchedPage:
+    """Result of fetching one URL: a ready record, or a body still to be parsed."""
+
+    __slots__ = ('url', 'content', 'headers', 'record', 'truncated')
+
+    def __init__(self, url: str, content: Optional[bytes] = None, headers=None,
+                 record: Optional[Dict] = None, truncated: bool = False):
+        self.url = url
+        self.content = content
+        self.headers = headers if headers is not None else {}
+        self.record = record
+        # True when content is only the first max_page_bytes of a larger body
+        self.truncated = truncated
+
+
+def is_html_content_type(content_type: Optional[str]) -> bool:
+    """Whether a Content-Type header is HTML (a missing header is given the benefit of the doubt)."""
+    if not content_type:
+        return True
+    return content_type.split(';', 1)[0].strip().lower() in HTML_CONTENT_TYPES
+
+
+def read_bounded(chunks: Iterable[bytes], max_bytes: int) -> Tuple[bytes, bool]:
+    """Join body chunks up to `max_bytes`; returns (body, truncated).
+
+    Stops reading as soon as the budget is reached, so an oversized page
+    never sits in memory in full.
+    """
+    body = bytearray()
+    for chunk in chunks:
+        body += chunk
+        if len(body) > max_bytes:
+            return bytes(body[:max_bytes]), True
+    return bytes(body), False
+
+
+class PageCandidates:
+    """Candidates for every extraction strategy, gathered in a single walk of the tree.
+
+    Rule hits are bucketed per selector in document order, which is exactly
+    what a separate `soup.select(selector)` per selector would have returned.
+    """
+
+    def __init__(self, soup: BeautifulSoup, rules: DomainRules):
+        self.title = None
+        self.metas = []
+        self.jsonld_scripts = []
+        self.links = []
+        self.headings = {tag: [] for tag in HEADING_TAGS}
+        index = rules.index
+        hits = [[] for _ in range(len(index))]
+
+        for tag in soup.find_all(True):
+            name = tag.name
+            if name == 'title':
+                if self.title is None:
+                    self.title = tag
+            elif name == 'meta':
+                self.metas.append(tag)
+            elif name == 'script':
+                if tag.get('type') == 'application/ld+json':
+                    self.jsonld_scripts.append(tag)
+            elif name == 'a':
+                if tag.has_attr('href'):
+                    self.links.append(tag)
+            elif name in self.headings:
+                self.headings[name].append(tag)
+
+            for i in index.matching(tag):
+                hits[i].append(tag)
+
+        field_count = len(rules.field_list)
+        program_end = field_count + rules.program_count
+        self._field_hits = dict(zip(rules.field_list, hits[:field_count]))
+        self.program_hits = hits[field_count:program_end]
+        self.domain_hits = hits[program_end:]
+
+    def first_text(self, selectors: List[str]) -> Optional[str]:
+        """Same result as CollegeScraper._extract_text over the given field selectors."""
+        for selector in selectors:
+            elements = self._field_hits.get(selector)
+            if elements:
+                text = elements[0].get_text(strip=True)
+                if text:
+                    return text
+        return None
+
+    def meta_content(self, keys: List[str]) -> Optional[str]:
+        """Same result as CollegeScraper._extract_meta over the collected meta tags."""
+        for key in keys:
+            attr = 'property' if ':' in key else 'name'
+            tag = next((m for m in self.metas if m.get(attr) == key), None)
+            if tag and tag.get('content'):
+                return tag['content'].strip()
+        return None
+
+
+HEADING_TAGS = ['h2', 'h3', 'h4', 'h5']
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+CHUNK_SIZE = 64 * 1024
@@ -0,0 +1,108 @@
+"""Discovery of competitor course pages from robots.txt and XML sitemaps.
+
+Big university sites link to thousands of pages, but most publish a sitemap
+listing every URL they have. `SitemapDiscovery` reads the `Sitemap:` lines
+in a site's robots.txt (falling back to /sitemap.xml), walks sitemap indexes
+and gzipped sitemaps, and keeps only same-site URLs that look like course or
+program pages and that robots.txt allows. The scraper then fetches those few
+pages directly instead of crawling the site blind.
+"""
+import gzip
+import io
+import logging
+import xml.etree.ElementTree as ET
+from collections import deque
+from typing import Deque, List, Optional, Set
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+from config import USER_AGENT, SITEMAP_MAX_FILES, CRAWL_MAX_PAGES
+from crawl_frontier import normalize_url, site_domain, is_catalogue_link
+
+logger = logging.getLogger(__name__)
+
+# Cap on a (decompressed) sitemap file; the sitemap protocol itself allows 50 MB
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def site_root(url: str) -> str:
+    """scheme://host[:port] of a URL."""
+    parsed = urlparse(url)
+    return f"{parsed.scheme or 'https'}://{parsed.netloc}"
+
+
+def parse_sitemap(content: bytes):
+    """Split a sitemap (plain or gzipped) into (child sitemap URLs, page URLs)."""
+    if content[:2] == GZIP_MAGIC:
+        with gzip.GzipFile(fileobj=io.BytesIO(content)) as gz:
+            content = gz.read(MAX_SITEMAP_BYTES)
+    sitemaps, pages = [], []
+    try:
+        for _, elem in ET.iterparse(io.BytesIO(content), events=('end',)):
+            # Tags are namespaced, e.g. {http://www.sitemaps.org/schemas/sitemap/0.9}loc
+            tag = elem.tag.rsplit('}', 1)[-1]
+            if tag == 'sitemap' or tag == 'url':
+                loc = next((child.text for child in elem if child.tag.rsplit('}', 1)[-1] == 'loc'), None)
+                if loc and loc.strip():
+                    (sitemaps if tag == 'sitemap' else pages).append(loc.strip())
+                elem.clear()
+    except ET.ParseError as e:
+        logger.warning(f"Malformed sitemap skipped: {e}")
+    return sitemaps, pages
+
+
+class SitemapDiscovery:
+    """Finds a site's course-like pages from robots.txt and its sitemaps."""
+
+    def __init__(self, scraper, max_sitemaps: int = SITEMAP_MAX_FILES):
+        # Fetches through the scraper: its session, breaker, metrics and page archive
+        self.scraper = scraper
+        self.max_sitemaps = max(1, max_sitemaps)
+
+    def discover(self, url: str, limit: int = CRAWL_MAX_PAGES) -> List[str]:
+        """Up to `limit` course-like URLs on the same site as `url`, in sitemap order."""
+        root = site_root(url)
+        domain = site_domain(url)
+        robots = RobotFileParser()
+        robots_txt = self._fetch(f"{root}/robots.txt")
+        robots.parse(robots_txt.decode('utf-8', 'replace').splitlines() if robots_txt else [])
+
+        queue: Deque[str] = deque(robots.site_maps() or [f"{root}/sitemap.xml"])
+        seen_sitemaps: Set[str] = set()
+        found: List[str] = []
+        seen_pages: Set[str] = set()
+
+        while queue and len(seen_sitemaps) < self.max_sitemaps and len(found) < limit:
+            sitemap_url = queue.popleft()
+            if sitemap_url in seen_sitemaps:
+                continue
+            seen_sitemaps.add(sitemap_url)
+            content = self._fetch(sitemap_url)
+            if not content:
+                continue
+
+            children, pages = parse_sitemap(content)
+            # Course-specific child sitemaps (e.g. sitemap-courses.xml) are read first
+            queue.extendleft(reversed([c for c in children if is_catalogue_link(c)]))
+            queue.extend(c for c in children if not is_catalogue_link(c))
+
+            for page_url in pages:
+                page = normalize_url(page_url)
+                if page is None or page in seen_pages:
+                    continue
+                page_domain = site_domain(page)
+                if page_domain != domain and not page_domain.endswith('.' + domain):
+                    continue
+                if not is_catalogue_link(page) or not robots.can_fetch(USER_AGENT, page):
+                    continue
+                seen_pages.add(page)
+                found.append(page)
+                if len(found) >= limit:
+                    break
+
+        logger.info(f"Sitemaps for {domain}: {len(found)} course page(s) from {len(seen_sitemaps)} file(s)")
+        return found
+
+    def _fetch(self, url: str) -> Optional[bytes]:
+        """robots.txt or a sitemap through the scraper: bounded, breaker-guarded and in its metrics."""
+        return self.scraper.fetch_resource(url, MAX_SITEMAP_BYTES)
@@ -6,22 +6,26 @@ This demonstrates the complete workflow:
 2. Extract their courses
 3. Match against your college
 4. Generate competition report
+
+Competitor courses come from the imported CSV. With SCRAPER_ARCHIVE set
+(see page_archive.py) they are scraped from the archived pages instead, so
+the scrape -> extract -> match pass runs end to end without network access.
 """
 
+import os
 import sys
+import tempfile
 from pathlib import Path
 from course_matcher import CourseMatcherAI
 from importers import import_from_csv
 from database import CollegeDatabase
 
-# Clean up old test database if it exists
-test_db = "test_course_match.db"
-if Path(test_db).exists():
-    Path(test_db).unlink()
+# A fresh database in a temporary directory, so no committed database file is touched
+test_db = os.path.join(tempfile.mkdtemp(prefix='course_match_'), "test_course_match.db")
 
 # Initialize
 db = CollegeDatabase(db_path=test_db)
-matcher = CourseMatcherAI()
+matcher = CourseMatcherAI(db=db)
 
 print("""
 ╔════════════════════════════════════════════════════════════════════════╗
@@ -102,17 +106,23 @@ print("\n🔍 Analyzing competitor course offerings...\n")
 competitors = db.get_all_competitors()
 competitor_courses = {}
 
-for comp in competitors:
-    name = comp.get('name')
-    programs = comp.get('programs', [])
-    
-    competitor_courses[name] = {
-        'url': comp.get('source_url', 'N/A'),
-        'raw_courses': programs,
-        'normalized_courses': [p.lower().strip() for p in programs if p],
-        'course_count': len(programs)
-    }
-    
+archive = matcher.scraper.archive
+if archive is not None and archive.replaying:
+    print(f"Scraping competitor websites from page archive {archive.path}\n")
+    urls = [comp['source_url'] for comp in competitors if comp.get('source_url')]
+    competitor_courses = matcher.detect_competitor_courses(urls)
+else:
+    for comp in competitors:
+        programs = comp.get('programs', [])
+        competitor_courses[comp.get('name')] = {
+            'url': comp.get('source_url', 'N/A'),
+            'raw_courses': programs,
+            'normalized_courses': [p.lower().strip() for p in programs if p],
+            'course_count': len(programs)
+        }
+
+for name, courses in competitor_courses.items():
+    programs = courses['raw_courses']
     print(f"📍 {name}")
     print(f"   Courses found: {len(programs)}")
     if programs:
@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+"""
+Test script: CollegeDatabase connections, bulk writes, program and course indexes, queries and migrations.
+"""
+import os
+import tempfile
+import threading
+from database import CollegeDatabase
+
+
+def test_database_connection_and_transactions():
+    """One WAL connection shared by threads; transactions commit once and nested failures roll back."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CollegeDatabase(os.path.join(tmp, 'tx.db'))
+        assert db._query('PRAGMA journal_mode')[0][0] == 'wal'
+
+        commits = []
+        db._conn.set_trace_callback(lambda sql: commits.append(sql) if sql == 'COMMIT' else None)
+        with db.transaction():
+            for i in range(50):
+                db.add_competitor({'college_id': f'c{i}', 'name': f'College {i}', 'programs': ['Law']})
+            try:
+                with db.transaction():
+                    db.add_competitor({'college_id': 'bad', 'name': 'Rolled Back'})
+                    raise RuntimeError('abort inner block')
+            except RuntimeError:
+                pass
+        assert commits == ['COMMIT']
+        assert len(db.get_all_competitors()) == 50 and db.get_competitor('bad') is None
+
+        try:
+            with db.transaction():
+                db.add_competitor({'college_id': 'gone', 'name': 'Gone'})
+                raise RuntimeError('abort outer block')
+        except RuntimeError:
+            pass
+        assert db.get_competitor('gone') is None
+
+        # Concurrent writers share the connection without interleaving transactions
+        def write(start):
+            for i in range(start, start + 25):
+                db.add_competitor({'college_id': f't{i}', 'name': f'Thread {i}'})
+        threads = [threading.Thread(target=write, args=(n * 25,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        db.close()
+
+        reopened = CollegeDatabase(os.path.join(tmp, 'tx.db'))
+        assert len(reopened.get_all_competitors()) == 150
+        reopened.close()
+    print("✓ database: 50 rows in one commit, nested rollback, 4 threads on one connection")
+
+
+def test_bulk_import_commits_once():
+    """CSV imports and comparison results are written with executemany batches in one transaction."""
+    from importers import import_from_csv
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'bulk.csv')
+        with open(csv_path, 'w', encoding='utf-8') as fh:
+            fh.write('id,name,programs_list,students\n')
+            for i in range(2500):
+                fh.write(f'c{i},College {i},"Law, Nursing",{1000 + i}\n')
+
+        db = CollegeDatabase(os.path.join(tmp, 'bulk.db'))
+        statements = []
+        db._conn.set_trace_callback(statements.append)
+        imported = import_from_csv(csv_path, {'college_id': 'id', 'name': 'name', 'programs': 'programs_list',
+                                              'enrollment': 'students'}, db)
+        saved = db.save_comparisons_bulk(({'competitor_id': f'c{i}', 'similarity_score': i / 2500,
+                                           'competition_level': 'LOW', 'analysis': ''} for i in range(2500)),
+                                         batch_size=1000)
+        assert imported == 2500 and saved == 2500
+        assert statements.count('COMMIT') == 2
+        competitor = db.get_competitor('c2499')
+        assert competitor['programs'] == ['Law', 'Nursing'] and competitor['enrollment'] == 3499
+        assert len(db.get_comparisons()) == 2500
+
+        # A failed batch rolls the whole import back
+        try:
+            db.add_competitors_bulk([{'college_id': 'ok', 'name': 'Fine'}, {'college_id': 'bad', 'name': None}])
+        except Exception:
+            pass
+        assert db.get_competitor('ok') is None
+        db.close()
+    print("✓ bulk import: 2500 competitors and 2500 comparisons in 2 commits")
+
+
+def test_programs_normalised_and_indexed():
+    """Program lookups go through the programs/competitor_programs tables, including for old databases."""
+    import json
+    import sqlite3
+    from config import MY_COLLEGE_ID
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'programs.db')
+        # A database from before the program tables: only the JSON columns are filled
+        legacy = sqlite3.connect(path)
+        CollegeDatabase._create_tables(legacy.cursor())
+        legacy.execute("INSERT INTO my_college (id, name, programs, metadata) VALUES (?, 'Mine', ?, '{}')",
+                       (MY_COLLEGE_ID, json.dumps(['Data Science', 'Law'])))
+        legacy.execute("INSERT INTO competitor_colleges (college_id, name, programs, metadata) "
+                       "VALUES ('old', 'Old College', ?, '{}')", (json.dumps(['data  science', 'Art']),))
+        legacy.commit()
+        legacy.close()
+
+        db = CollegeDatabase(path)
+        db.add_competitor({'college_id': 'new', 'name': 'New College', 'programs': ['Law', 'DATA SCIENCE', 'Law']})
+        db.add_competitors_bulk([{'college_id': f'b{i}', 'name': f'Bulk {i}', 'programs': ['Nursing']}
+                                 for i in range(5)], batch_size=2)
+
+        assert [c['college_id'] for c in db.competitors_offering('Data\u00a0Science')] == ['new', 'old']
+        assert len(db.competitors_offering('nursing')) == 5
+        # One programs row per key, named by the first spelling stored
+        assert db.get_competitor_programs('new') == ['Law', 'Data Science']
+        assert db.get_program_overlap() == {'new': ['Data Science', 'Law'], 'old': ['Data Science']}
+
+        # Re-saving a competitor replaces its program rows
+        db.add_competitor({'college_id': 'new', 'name': 'New College', 'programs': ['Art']})
+        assert db.competitors_offering('law') == []
+        # The same competitor twice in one batch: the last row wins, as with one add_competitor per row
+        db.add_competitors_bulk([{'college_id': 'x', 'name': 'X', 'programs': ['Law', 'Art']},
+                                 {'college_id': 'x', 'name': 'X', 'programs': ['Nursing']}])
+        assert db.get_competitor('x')['programs'] == ['Nursing']
+        assert db.get_competitor_programs('x') == ['Nursing']
+        assert db.competitors_offering('law') == []
+        plan = ' '.join(row[3] for row in db._query(
+            'EXPLAIN QUERY PLAN SELECT competitor_id FROM competitor_programs WHERE program_id = 1'))
+        assert 'idx_competitor_programs_program' in plan or 'COVERING INDEX' in plan
+        db.close()
+    print("✓ programs: indexed lookups, backfilled from JSON, replaced on update")
+
+
+def test_search_courses_uses_trigram_index():
+    """search_courses ranks fuzzy matches from the FTS5 index and falls back to LIKE without it."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CollegeDatabase(os.path.join(tmp, 'search.db'))
+        assert db.has_course_index
+        db.add_competitor({'college_id': 'a', 'name': 'A', 'programs': ['Data Science', 'Law']})
+        db.add_competitors_bulk([{'college_id': 'b', 'name': 'B', 'programs': ['Data Science BSc', 'Nursing']},
+                                 {'college_id': 'c', 'name': 'C', 'programs': ['Computer Science']}])
+
+        # A misspelt query still finds the course; the closest name ranks first
+        results = db.search_courses('data sceince', limit=3)
+        assert results[0] == {'name': 'Data Science', 'competitor_ids': ['a']}
+        assert 'Data Science BSc' in [r['name'] for r in results]
+        assert [r['name'] for r in db.search_courses('nurs')] == ['Nursing']
+        # Names only in my college's list aren't competitor courses
+        db.add_my_college({'name': 'Mine', 'programs': ['Astrophysics']})
+        assert db.search_courses('astrophysics') == []
+
+        # Re-saving a competitor updates what it is returned for
+        db.add_competitor({'college_id': 'a', 'name': 'A', 'programs': ['Law']})
+        assert db.search_courses('data science', limit=1)[0]['name'] == 'Data Science BSc'
+        # Too short for a trigram, and the LIKE fallback used when FTS5 is unavailable
+        assert db.search_courses('la') == [{'name': 'Law', 'competitor_ids': ['a']}]
+        db.has_course_index = False
+        assert [r['name'] for r in db.search_courses('science')] == ['Computer Science', 'Data Science BSc']
+        assert db.search_courses('100%') == []
+        db.close()
+
+        # Reopening keeps the index in step with rows added meanwhile
+        db = CollegeDatabase(os.path.join(tmp, 'search.db'))
+        db.add_competitor({'college_id': 'd', 'name': 'D', 'programs': ['Marine Biology']})
+        assert db.search_courses('marine biology')[0]['competitor_ids'] == ['d']
+        db.close()
+    print("✓ course search: trigram index with typo tolerance, LIKE fallback")
+
+
+def test_iter_competitors_filters_and_pages():
+    """iter_competitors filters in SQL, pages by id and only returns (and decodes) the requested columns."""
+    from datetime import datetime
+    from interactive_analyzer import bounding_box
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CollegeDatabase(os.path.join(tmp, 'iter.db'))
+        db.add_competitors_bulk({'college_id': f'c{i}', 'name': f'College {i}',
+                                 'location': 'Leeds' if i % 2 else 'York', 'latitude': 50 + i / 10,
+                                 'longitude': -1.0, 'enrollment': 1000 * i, 'tuition': 9000 + i,
+                                 'programs': ['Law']} for i in range(25))
+        db.add_competitor({'college_id': 'fiji', 'name': 'Pacific', 'latitude': -17.7, 'longitude': 179.9,
+                           'location': '100% Online'})
+        with db.transaction() as conn:
+            conn.execute("UPDATE competitor_colleges SET scraped_date = '2020-01-01 00:00:00' WHERE college_id = 'c0'")
+
+        statements = []
+        db._conn.set_trace_callback(statements.append)
+        rows = list(db.iter_competitors(batch_size=10))
+        assert len(rows) == 26 and rows[0]['programs'] == ['Law'] and rows[0]['metadata'] == {}
+        pages = [sql for sql in statements if sql.startswith('SELECT id,')]
+        assert len(pages) == 3 and 'id > 20' in pages[-1]
+
+        leeds = list(db.iter_competitors({'location': 'leeds', 'enrollment': (5000, None)},
+                                         columns=['college_id', 'enrollment']))
+        assert all(set(r) == {'college_id', 'enrollment'} and r['enrollment'] >= 5000 for r in leeds)
+        assert [r['college_id'] for r in leeds][:3] == ['c5', 'c7', 'c9'] and len(leeds) == 10
+        assert [r['college_id'] for r in db.iter_competitors({'tuition': (9010, 9012)}, ['college_id'])] == \
+            ['c10', 'c11', 'c12']
+        assert [r['college_id'] for r in db.iter_competitors({'location': '100%'}, ['college_id'])] == ['fiji']
+        old = db.iter_competitors({'scraped_date': (None, datetime(2021, 1, 1))}, ['college_id'])
+        assert [r['college_id'] for r in old] == ['c0']
+
+        # Bounding boxes, including one that wraps the antimeridian
+        near = db.iter_competitors({'bbox': bounding_box(51.0, -1.0, 20)}, ['college_id', 'latitude'])
+        assert {r['college_id'] for r in near} == {f'c{i}' for i in range(8, 13)}
+        pacific = db.iter_competitors({'bbox': bounding_box(-17.7, -179.9, 50)}, ['college_id'])
+        assert [r['college_id'] for r in pacific] == ['fiji']
+
+        # Rejected when called, before any row is read
+        for bad in ({'columns': ['password']}, {'filters': {'colour': 'red'}}, {'batch_size': 0},
+                    {'batch_size': -5}):
+            try:
+                db.iter_competitors(**bad)
+                assert False, bad
+            except ValueError:
+                pass
+        db.close()
+    print("✓ iter_competitors: SQL filters, keyset pages of batch_size rows, column projection")
+
+
+def test_compact_records_match_dicts():
+    """Compact records read like the dicts they replace and decode JSON only when it is used."""
+    import json
+    import pickle
+    from college_records import CompetitorRecord, MyCollegeRecord
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'records.db')
+        db = CollegeDatabase(path)
+        db.add_my_college({'name': 'Mine', 'programs': ['Law'], 'tuition': 9250})
+        db.add_competitor({'college_id': 'a', 'name': 'A', 'programs': ['Law', 'Art'], 'metadata': {'k': 1},
+                           'latitude': 53.3, 'source_url': 'https://a.example.ac.uk'})
+        plain_competitor, plain_mine = db.get_competitor('a'), db.get_my_college()
+        db.close()
+
+        db = CollegeDatabase(path, compact_records=True)
+        record, mine = db.get_competitor('a'), db.get_my_college()
+        assert isinstance(record, CompetitorRecord) and isinstance(mine, MyCollegeRecord)
+        assert not hasattr(record, '__dict__')
+        # JSON stays raw until first read
+        assert object.__getattribute__(record, '_programs_json') == '["Law", "Art"]'
+        assert record['programs'] == ['Law', 'Art'] and record.programs is record['programs']
+        assert record == {**plain_competitor, 'scraped_date': record['scraped_date']}
+        assert mine == plain_mine and mine.get('nope', 'x') == 'x'
+        assert db.get_all_competitors() == [record] and db.competitors_offering('art') == [record]
+
+        # Projected rows only carry the selected fields
+        projected = next(db.iter_competitors(columns=['college_id', 'metadata']))
+        assert isinstance(projected, CompetitorRecord) and list(projected) == ['college_id', 'metadata']
+        assert 'name' not in projected and projected['metadata'] == {'k': 1}
+        try:
+            projected['name']
+            assert False
+        except KeyError:
+            pass
+
+        record['latitude'] = 51.0
+        assert record.latitude == 51.0 and json.loads(json.dumps(record.to_dict()))['latitude'] == 51.0
+        assert pickle.loads(pickle.dumps(record)) == record
+        db.close()
+    print("✓ compact records: dict-compatible, slotted, JSON decoded lazily")
+
+
+def test_schema_migrations():
+    """Old databases are migrated in one transaction, once; a failing step changes nothing."""
+    import sqlite3
+    import database
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'legacy.db')
+        # The original schema: no content_hash, schedule, program tables, indexes or version table
+        legacy = sqlite3.connect(path)
+        CollegeDatabase._create_tables(legacy.cursor())
+        legacy.execute("INSERT INTO competitor_colleges (college_id, name, programs, metadata, source_url) "
+                       "VALUES ('a', 'A', '[\"Law\"]', '{}', 'https://a.example.ac.uk')")
+        legacy.execute("INSERT INTO comparison_results (competitor_id, similarity_score) VALUES ('a', 0.5)")
+        legacy.commit()
+        legacy.close()
+
+        db = CollegeDatabase(path)
+        assert db.schema_version() == database.SCHEMA_VERSION
+        assert db.get_competitor('a')['content_hash'] is None
+        assert [c['college_id'] for c in db.competitors_offering('law')] == ['a']
+        assert db.get_competitor_by_url('https://a.example.ac.uk')['name'] == 'A'
+        assert db.get_comparison_history('a')[0][2] == 0.5
+        plan = ' '.join(row[3] for row in db._query(
+            'EXPLAIN QUERY PLAN SELECT * FROM comparison_results WHERE competitor_id = ?', ('a',)))
+        assert 'idx_comparison_results_competitor' in plan
+        # Already current: nothing re-runs
+        with db.transaction() as conn:
+            assert db.migrate(conn) == []
+        db.close()
+
+        # A failing step rolls back the whole startup, including earlier steps in the same run
+        def add_column(conn):
+            conn.execute('ALTER TABLE competitor_colleges ADD COLUMN ranking INTEGER')
+
+        def broken(conn):
+            raise sqlite3.OperationalError('boom')
+
+        original = database.MIGRATIONS
+        database.MIGRATIONS = original + ((90, 'ranking column', add_column), (91, 'broken', broken))
+        try:
+            CollegeDatabase(path)
+            assert False, 'migration should have failed'
+        except sqlite3.OperationalError:
+            pass
+        finally:
+            database.MIGRATIONS = original
+        db = CollegeDatabase(path)
+        assert db.schema_version() == database.SCHEMA_VERSION
+        assert 'ranking' not in [col[1] for col in db._query('PRAGMA table_info(competitor_colleges)')]
+        db.close()
+    print("✓ migrations: legacy database upgraded once, failed run rolled back")
+
+
+if __name__ == '__main__':
+    test_database_connection_and_transactions()
+    test_bulk_import_commits_once()
+    test_programs_normalised_and_indexed()
+    test_search_courses_uses_trigram_index()
+    test_iter_competitors_filters_and_pages()
+    test_compact_records_match_dicts()
+    test_schema_migrations()
@@ -3,6 +3,7 @@
 Test script: import sample competitors from CSV and verify database.
 """
 import os
+import tempfile
 from database import CollegeDatabase
 from importers import import_from_csv
 
@@ -12,13 +13,8 @@ def test_csv_import():
     print("TESTING CSV IMPORT")
     print("=" * 70)
     
-    # Use a test database so we don't corrupt the real one
-    test_db_path = 'test_college_data.db'
-    
-    # Remove old test DB if it exists
-    if os.path.exists(test_db_path):
-        os.remove(test_db_path)
-        print(f"✓ Removed old test database: {test_db_path}")
+    # Use a fresh database in a temporary directory so we don't touch the real one
+    test_db_path = os.path.join(tempfile.mkdtemp(prefix='csv_import_'), 'test_college_data.db')
     
     # Create new test database
     db = CollegeDatabase(test_db_path)
@@ -0,0 +1,1012 @@
+#!/usr/bin/env python
+"""
+Test script: scrape pages served by a local HTTP server (no internet needed).
+"""
+import gzip
+import os
+import tempfile
+import threading
+import time
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from database import CollegeDatabase
+from scraper import CollegeScraper
+
+PAGE = """<html><head><title>{name}</title></head>
+<body><h1>{name}</h1>
+<ul class="programs"><li>Computer Science</li><li>Engineering</li><li>Business</li></ul>
+</body></html>"""
+
+
+class _ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def start_local_server(pages, delay=0.0, compress=False):
+    """Serve `pages` over keep-alive HTTP/1.1 on localhost and track peak in-flight requests.
+
+    Each value is an html str, raw bytes, a (status, headers, body) tuple, or
+    a list of those served in turn (the last one repeats). With `compress`,
+    200 responses are gzip-encoded for clients that accept it.
+    """
+    stats = {'in_flight': 0, 'peak': 0, 'requests': 0, 'not_modified': 0, 'connections': 0, 'gzipped': 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            with lock:
+                stats['connections'] += 1
+
+        def reply(self, status, headers=None, data=b''):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            with lock:
+                stats['in_flight'] += 1
+                stats['requests'] += 1
+                stats['peak'] = max(stats['peak'], stats['in_flight'])
+            try:
+                time.sleep(delay)
+                body = pages.get(self.path)
+                if isinstance(body, list):
+                    # A scripted sequence of responses; the last one repeats
+                    with lock:
+                        body = body.pop(0) if len(body) > 1 else body[0]
+                if isinstance(body, tuple):
+                    status, headers, body = body
+                    self.reply(status, headers, body.encode('utf-8'))
+                    return
+                if body is None:
+                    self.reply(404)
+                    return
+                data = body if isinstance(body, bytes) else body.encode('utf-8')
+                etag = f'"{hash(body) & 0xffffffff:x}"'
+                if self.headers.get('If-None-Match') == etag:
+                    with lock:
+                        stats['not_modified'] += 1
+                    self.reply(304)
+                    return
+                headers = {'ETag': etag, 'Content-Type': 'text/html; charset=utf-8'}
+                if compress and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    data = gzip.compress(data)
+                    headers['Content-Encoding'] = 'gzip'
+                    with lock:
+                        stats['gzipped'] += 1
+                self.reply(200, headers, data)
+            finally:
+                with lock:
+                    stats['in_flight'] -= 1
+
+        def log_message(self, *args):
+            pass
+
+    server = _ThreadingServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    return server, base_url, stats
+
+
+def test_scrape_many_bounded_concurrency():
+    """scrape_many yields every URL and never exceeds max_concurrency in flight."""
+    pages = {f"/college{i}": PAGE.format(name=f"College {i}") for i in range(12)}
+    server, base_url, stats = start_local_server(pages, delay=0.05)
+    try:
+        scraper = CollegeScraper(cache_dir=None)
+        urls = [f"{base_url}/college{i}" for i in range(12)] + [f"{base_url}/missing"]
+        results = dict(scraper.scrape_many(urls, max_concurrency=4))
+    finally:
+        server.shutdown()
+
+    assert set(results) == set(urls)
+    assert results[f"{base_url}/missing"] is None
+    assert results[f"{base_url}/college3"]['name'] == 'College 3'
+    assert results[f"{base_url}/college3"]['programs'] == ['Computer Science', 'Engineering', 'Business']
+    assert stats['peak'] <= 4
+    print(f"✓ scrape_many: {len(results)} results, peak in-flight {stats['peak']}")
+
+
+def test_async_scraper_per_host_limits():
+    """The async scraper respects the per-host cap and minimum delay between requests."""
+    from async_scraper import scrape_urls
+
+    pages = {f"/page{i}": PAGE.format(name=f"Page {i}") for i in range(6)}
+    server, base_url, stats = start_local_server(pages, delay=0.05)
+    try:
+        urls = [f"{base_url}/page{i}" for i in range(6)]
+        start = time.monotonic()
+        results = scrape_urls(urls, max_concurrency=50, per_host_concurrency=2, per_host_delay=0.05,
+                              cache_dir=None)
+        elapsed = time.monotonic() - start
+    finally:
+        server.shutdown()
+
+    assert all(results[url] for url in urls)
+    assert results[f"{base_url}/page5"]['name'] == 'Page 5'
+    assert stats['peak'] <= 2
+    # Six request starts to one host, at least 0.05s apart
+    assert elapsed >= 0.25
+    print(f"✓ async scraper: {len(results)} results, peak per-host in-flight {stats['peak']}")
+
+
+def test_async_scraper_survives_one_failing_page():
+    """An unexpected error parsing one URL gives that URL None; the rest of the sweep still returns."""
+    from async_scraper import scrape_urls
+
+    pages = {f"/page{i}": PAGE.format(name=f"Page {i}") for i in range(4)}
+    server, base_url, _ = start_local_server(pages)
+    urls = [f"{base_url}/page{i}" for i in range(4)]
+    original = CollegeScraper._parse_content
+
+    def parse(self, content, url, *args, **kwargs):
+        if url == urls[1]:
+            raise RuntimeError("parser crashed")
+        return original(self, content, url, *args, **kwargs)
+
+    CollegeScraper._parse_content = parse
+    try:
+        results = scrape_urls(urls, cache_dir=None)
+    finally:
+        CollegeScraper._parse_content = original
+        server.shutdown()
+
+    assert results[urls[1]] is None
+    assert [results[url]['name'] for url in (urls[0], urls[2], urls[3])] == ['Page 0', 'Page 2', 'Page 3']
+    print("✓ async scraper: one failing page doesn't lose the sweep")
+
+
+def test_async_scrape_urls_reraises_from_running_loop():
+    """Called from inside an event loop, scrape_urls re-raises a failure in its helper thread."""
+    import asyncio
+    from async_scraper import AsyncCollegeScraper, scrape_urls
+
+    async def failing(self, urls):
+        raise RuntimeError("crawl failed")
+
+    async def caller():
+        return scrape_urls(["http://127.0.0.1:9/"], cache_dir=None)
+
+    original = AsyncCollegeScraper.scrape_all
+    AsyncCollegeScraper.scrape_all = failing
+    try:
+        asyncio.run(caller())
+    except RuntimeError as e:
+        assert str(e) == "crawl failed"
+    else:
+        raise AssertionError("scrape_urls returned instead of raising")
+    finally:
+        AsyncCollegeScraper.scrape_all = original
+    print("✓ async scrape_urls re-raises helper-thread errors")
+
+
+def test_response_cache_revalidation():
+    """Fresh cache entries skip the network; stale ones revalidate with a conditional GET."""
+    pages = {"/cached": PAGE.format(name="Cached College")}
+    server, base_url, stats = start_local_server(pages)
+    url = f"{base_url}/cached"
+    with tempfile.TemporaryDirectory() as cache_dir:
+        try:
+            scraper = CollegeScraper(cache_dir=cache_dir)
+            first = scraper.scrape_college(url)
+            assert stats['requests'] == 1
+
+            # Within the TTL: served from disk, no request at all
+            assert scraper.scrape_college(url) == first
+            assert stats['requests'] == 1
+
+            # Past the TTL: conditional GET answered with 304, stored record reused
+            scraper.cache.ttl = 0
+            assert scraper.scrape_college(url) == first
+            assert stats['requests'] == 2
+            assert stats['not_modified'] == 1
+        finally:
+            server.shutdown()
+    print("✓ response cache: fresh hit and 304 revalidation")
+
+
+def test_response_cache_lru_eviction():
+    """A full cache drops least-recently-used entries down to the low-water mark, without listing the directory."""
+    import http_cache
+    from http_cache import ResponseCache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(tmp, max_bytes=10_000)
+        body = b'x' * 1500
+        for i in range(5):
+            cache.store(f"https://college.edu/{i}", body, {}, None)
+        cache.get("https://college.edu/0")  # now the most recently used
+
+        listdir = http_cache.os.listdir
+        http_cache.os.listdir = lambda path: (_ for _ in ()).throw(AssertionError("directory listed"))
+        try:
+            cache.store("https://college.edu/5", body, {}, None)
+            cache.store("https://college.edu/6", body, {}, None)
+        finally:
+            http_cache.os.listdir = listdir
+
+        kept = [i for i in range(7) if cache.get(f"https://college.edu/{i}")]
+        assert cache._total_bytes <= 10_000 * http_cache.EVICT_TO
+        assert 0 in kept and 1 not in kept and 6 in kept
+        # The index is rebuilt from disk on the next start
+        assert ResponseCache(tmp, max_bytes=10_000)._total_bytes == cache._total_bytes
+    print(f"✓ response cache: LRU eviction kept {len(kept)} entries")
+
+
+def test_unchanged_content_reuses_stored_record():
+    """A body whose digest matches the stored competitor row is not re-extracted."""
+    pages = {"/same": PAGE.format(name="Same College")}
+    server, base_url, _ = start_local_server(pages)
+    url = f"{base_url}/same"
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CollegeDatabase(os.path.join(tmp, 'hash.db'))
+        try:
+            scraper = CollegeScraper(cache_dir=None, db=db)
+            first = scraper.scrape_college(url)
+            assert first['content_hash']
+            db.add_competitor(first)
+
+            extract_calls = []
+            original = scraper._extract_college_data
+            scraper._extract_college_data = lambda soup, u: extract_calls.append(u) or original(soup, u)
+
+            second = scraper.scrape_college(url)
+            assert extract_calls == []
+            assert second['content_hash'] == first['content_hash']
+            assert second['programs'] == first['programs']
+
+            # A changed body is extracted again
+            pages["/same"] = PAGE.format(name="Renamed College")
+            third = scraper.scrape_college(url)
+            assert extract_calls == [url]
+            assert third['name'] == 'Renamed College'
+        finally:
+            server.shutdown()
+    print("✓ content hash: unchanged page reused stored record")
+
+
+def test_course_matcher_second_run_skips_unchanged_parse():
+    """CourseMatcherAI stores full scraped records, so an unchanged page isn't parsed on the next run."""
+    from course_matcher import CourseMatcherAI
+    from scrape_metrics import MetricsRegistry
+
+    pages = {"/matched": PAGE.format(name="Matched College")}
+    server, base_url, _ = start_local_server(pages)
+    url = f"{base_url}/matched"
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CollegeDatabase(os.path.join(tmp, 'matcher.db'))
+        try:
+            matcher = CourseMatcherAI(use_async=False, full_refresh=True, db=db)
+            matcher.scraper.cache = None
+            runs = []
+            for _ in range(2):
+                matcher.scraper.metrics = MetricsRegistry()
+                matcher.generate_competition_report('college_1', [url])
+                runs.append(matcher.scraper.metrics.get(url))
+        finally:
+            server.shutdown()
+
+        assert 'parse' in runs[0]['timings']
+        # Fetched again, but the body's digest matched the stored row
+        assert runs[1]['requests'] == 1 and 'parse' not in runs[1]['timings']
+        stored = db.get_competitor(CollegeScraper._generate_college_id(url))
+        assert stored['programs'] == ['Computer Science', 'Engineering', 'Business']
+        assert stored['content_hash'] and 'competition_score' in stored['metadata']
+        db.close()
+    print("✓ course matcher: second run reused the stored record without parsing")
+
+
+def test_analyze_competitors_stores_in_batches():
+    """Competitors are written batch by batch, and the pending batch survives an interrupted run."""
+    from main import CollegeCompetitionAI
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CollegeDatabase(os.path.join(tmp, 'main.db'))
+        ai = CollegeCompetitionAI(db=db)
+        ai.mapper.get_coordinates = lambda location: None
+        ai.setup_my_college({'name': 'Home College', 'location': 'Boston, MA',
+                             'programs': ['Computer Science', 'Business']})
+        stored_before_interrupt = []
+
+        def scrape_many(urls):
+            for i in range(3):
+                yield urls[i], {'college_id': f'c{i}', 'name': f'College {i}', 'location': 'Boston, MA',
+                                'programs': ['Computer Science', 'Nursing'], 'source_url': urls[i]}
+            stored_before_interrupt.append(len(db.get_all_competitors()))
+            raise KeyboardInterrupt
+
+        ai.scraper.scrape_many = scrape_many
+        try:
+            ai.analyze_competitors([f"https://college{i}.edu" for i in range(4)], batch_size=2)
+            assert False, 'the interrupt should propagate'
+        except KeyboardInterrupt:
+            pass
+        # The first batch was committed mid-run; the third competitor was flushed on the way out
+        assert stored_before_interrupt == [2]
+        assert len(db.get_all_competitors()) == 3 and len(db.get_comparisons()) == 3
+        db.close()
+    print("✓ analyze_competitors: batched writes kept after an interrupted run")
+
+
+def test_parser_backends_agree_on_fixtures():
+    """Every installed parser backend extracts the same records from the fixture pages."""
+    from benchmarks import load_fixture_pages
+    from html_parsers import available_backends
+
+    pages = load_fixture_pages()
+    records = {}
+    for backend in available_backends():
+        scraper = CollegeScraper(cache_dir=None, parser_backend=backend)
+        records[backend] = [scraper._parse_content(body, url) for url, body in pages]
+
+    baseline = records.pop('html.parser')
+    assert all(r['programs'] for r in baseline)
+    for backend, result in records.items():
+        assert result == baseline, f"{backend} disagrees with html.parser"
+    print(f"✓ parser backends agree: {', '.join(['html.parser'] + list(records))}")
+
+
+def test_extraction_strategy_priority():
+    """Each fixture page is resolved by the strategy it was built for, in priority order."""
+    from benchmarks import load_fixture_pages
+
+    scraper = CollegeScraper(cache_dir=None)
+    records = {url: scraper._parse_content(body, url) for url, body in load_fixture_pages()}
+
+    # Domain selectors win over the generic '.degree-list li' style rules
+    assert len(records['https://www.harvard.edu']['programs']) == 40
+    # JSON-LD @graph courses
+    assert len(records['https://lakeside-college.ac.uk/study']['programs']) == 20
+    # Generic CSS selectors, plus the scalar fields
+    state = records['https://www.stateuniversity.edu']
+    assert len(state['programs']) == 30
+    assert state['location'] == 'Springfield, IL'
+    assert state['tuition'] == 24500.0
+    assert state['acceptance_rate'] == 0.68
+    # Heading-based lists under "Undergraduate" and "Graduate" headings
+    assert len(records['https://www.riverside-institute.org']['programs']) == 25
+    # Links as the last resort
+    assert len(records['https://hilltop.edu']['programs']) == 52
+    print("✓ extraction strategies resolved in priority order")
+
+
+def test_dedupe_programs_normalises_consistently():
+    """Whitespace and Unicode case variants collapse to the first spelling seen."""
+    from program_names import dedupe_programs
+
+    names = ['Computer Science', 'COMPUTER\n  SCIENCE', 'computer\u00a0science',
+             'Straße Studies', 'STRASSE STUDIES', 'Art', 'AI', None, 'Physics']
+    assert dedupe_programs(names) == ['Computer Science', 'Straße Studies', 'Art', 'Physics']
+    assert dedupe_programs(names, limit=2) == ['Computer Science', 'Straße Studies']
+    print("✓ dedupe_programs: whitespace and case folding")
+
+
+def test_pipeline_parses_in_worker_processes():
+    """The process-pool pipeline yields the same records as in-thread parsing and writes them."""
+    from benchmarks import FIXTURE_DIR
+    from scrape_pipeline import ScrapePipeline
+
+    pages = {f"/{path.name}": path.read_text(encoding='utf-8') for path in FIXTURE_DIR.glob('*.html')}
+    server, base_url, _ = start_local_server(pages)
+    urls = [f"{base_url}{path}" for path in sorted(pages)] + [f"{base_url}/missing"]
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CollegeDatabase(os.path.join(tmp, 'pipeline.db'))
+        try:
+            expected = dict(CollegeScraper(cache_dir=None).scrape_many(urls))
+            pipeline = ScrapePipeline(CollegeScraper(cache_dir=None), fetch_concurrency=4,
+                                      parse_workers=2, db=db)
+            results = dict(pipeline.run(urls))
+        finally:
+            server.shutdown()
+
+        assert results == expected
+        assert results[f"{base_url}/missing"] is None
+        assert len(db.get_all_competitors()) == len(pages)
+    print(f"✓ pipeline: {len(results)} results parsed in worker processes")
+
+
+def test_domain_registry_lookup_and_overrides():
+    """Registry rules match exact domains and subdomain patterns and override generic selectors."""
+    import json
+    from domain_rules import DomainRegistry
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'rules.json')
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump({
+                '_comment': 'ignored',
+                'www.example-uni.edu': {'programs': ['.catalogue li']},
+                '*.example-uni.edu': {'programs': ['.dept-courses td'],
+                                      'fields': {'location': ['.campus']}},
+            }, fh)
+        registry = DomainRegistry.from_file(path)
+
+    assert len(registry) == 2
+    assert registry.lookup('example_uni.edu').pattern == 'www.example-uni.edu'
+    assert registry.lookup('cs.example_uni.edu').pattern == '*.example-uni.edu'
+    assert registry.lookup('a.b.example_uni.edu').pattern == '*.example-uni.edu'
+    assert registry.lookup('other.edu') is registry.default
+
+    html = b"""<html><body><h1>Physics Dept</h1><p class="campus">North Campus</p>
+        <div class="location">Ignored</div><ul class="programs"><li>Generic Program</li></ul>
+        <table class="dept-courses"><tr><td>Quantum Mechanics</td></tr><tr><td>Optics</td></tr></table></body></html>"""
+    scraper = CollegeScraper(cache_dir=None, domain_registry=registry)
+    record = scraper._parse_content(html, 'https://physics.example-uni.edu/')
+    assert record['programs'] == ['Quantum Mechanics', 'Optics']
+    assert record['location'] == 'North Campus'
+
+    try:
+        DomainRegistry({'bad.edu': {'programs': ['li[']}})
+    except ValueError as e:
+        assert 'bad.edu' in str(e)
+    else:
+        raise AssertionError("invalid selector was accepted")
+    print("✓ domain registry: exact, wildcard and field overrides")
+
+
+def test_page_archive_record_and_replay():
+    """Pages recorded during a live scrape replay identically with the server gone."""
+    from page_archive import PageArchive
+
+    pages = {f"/college{i}": PAGE.format(name=f"College {i}") for i in range(3)}
+    server, base_url, stats = start_local_server(pages)
+    urls = [f"{base_url}/college{i}" for i in range(3)]
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, 'pages'), os.path.join(tmp, 'pages.tar.gz')]
+        try:
+            for path in paths:
+                with PageArchive(path, 'record') as archive:
+                    live = dict(CollegeScraper(cache_dir=None, archive=archive).scrape_many(urls))
+                assert len(PageArchive(path)) == 3
+        finally:
+            server.shutdown()
+        requests_made = stats['requests']
+
+        for path in paths:
+            scraper = CollegeScraper(cache_dir=None, archive=PageArchive(path))
+            replayed = dict(scraper.scrape_many(urls + [f"{base_url}/missing"]))
+            assert {url: replayed[url] for url in urls} == live
+            assert replayed[f"{base_url}/missing"] is None
+            # A trailing slash doesn't matter for lookups
+            assert scraper.scrape_college(urls[0] + '/')['programs'] == live[urls[0]]['programs']
+
+        # The directory index is rewritten every flush_every pages and on close, not per page
+        path = os.path.join(tmp, 'batched')
+        archive = PageArchive(path, 'record', flush_every=2)
+        for i in range(3):
+            archive.record(f"https://college{i}.edu", b'<html></html>')
+        assert len(PageArchive(path)) == 2
+        archive.close()
+        assert len(PageArchive(path)) == 3
+        assert not [name for name in os.listdir(path) if name.endswith('.tmp')]
+
+    assert stats['requests'] == requests_made == 6
+    print(f"✓ page archive: {len(live)} pages recorded and replayed offline")
+
+
+def test_deep_crawl_follows_catalogue_links():
+    """The catalogue crawl stays on site, respects depth and page budget, and merges programs."""
+    from crawl_frontier import normalize_url
+
+    def page(title, items, links=''):
+        lis = ''.join(f'<li>{item}</li>' for item in items)
+        return f'<html><body><h1>{title}</h1><ul class="programs">{lis}</ul>{links}</body></html>'
+
+    pages = {
+        '/': page('Hilltop College', ['Business'],
+                  '<a href="/academics/programs/?utm_source=nav#top">All programs</a>'
+                  '<a href="/academics/programs">Programs A-Z</a>'
+                  '<a href="/about">About us</a>'
+                  '<a href="/prospectus.pdf">Course guide</a>'
+                  '<a href="https://elsewhere.edu/programs">Partner programs</a>'),
+        '/academics/programs': page('Programs', ['Business', 'Nursing'],
+                                    '<a href="/departments/science">Science department</a>'),
+        '/departments/science': page('Science', ['Physics', 'NURSING'],
+                                     '<a href="/departments/science/courses">Science courses</a>'),
+        '/departments/science/courses': page('Courses', ['Astronomy']),
+        '/about': page('About', ['Not A Program']),
+    }
+    server, base_url, stats = start_local_server(pages)
+    try:
+        scraper = CollegeScraper(cache_dir=None)
+        shallow = scraper.scrape_college_deep(base_url + '/', max_depth=1)
+        requests_depth_1 = stats['requests']
+        deep = scraper.scrape_college_deep(base_url + '/', max_depth=2)
+        budget = scraper.scrape_college_deep(base_url + '/', max_depth=3, max_pages=2)
+        missing = scraper.scrape_college_deep(base_url + '/missing', max_depth=2)
+    finally:
+        server.shutdown()
+
+    assert shallow['programs'] == ['Business', 'Nursing']
+    assert requests_depth_1 == 2  # the tracking/fragment variant is the same URL
+    assert deep['programs'] == ['Business', 'Nursing', 'Physics']
+    assert deep['name'] == 'Hilltop College' and deep['source_url'] == base_url + '/'
+    assert budget['programs'] == ['Business', 'Nursing']
+    assert missing is None
+    assert normalize_url('HTTP://Example.EDU:80/a//b/?b=2&utm_medium=x&a=1#frag') == 'http://example.edu/a/b?a=1&b=2'
+    print(f"✓ deep crawl: {len(deep['programs'])} programs merged from catalogue pages")
+
+
+def test_sitemap_discovery_targets_course_pages():
+    """robots.txt and (gzipped) sitemap indexes yield only allowed, same-site course pages."""
+    from scrape_metrics import MetricsRegistry
+    from sitemap import SitemapDiscovery
+
+    def urlset(urls):
+        locs = ''.join(f'<url><loc>{url}</loc></url>' for url in urls)
+        return f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{locs}</urlset>'
+
+    pages = {}  # filled in once the server's port is known
+    server, base_url, _ = start_local_server(pages)
+    courses = [f"{base_url}{path}" for path in
+               ('/courses/nursing', '/courses/physics', '/courses/private/draft', '/news/open-day')]
+    pages.update({
+        '/robots.txt': f"User-agent: *\nDisallow: /courses/private\nSitemap: {base_url}/sitemap_index.xml\n",
+        '/sitemap_index.xml': (
+            '<?xml version="1.0"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            f'<sitemap><loc>{base_url}/sitemap-news.xml</loc></sitemap>'
+            f'<sitemap><loc>{base_url}/sitemap-courses.xml.gz</loc></sitemap></sitemapindex>'),
+        '/sitemap-courses.xml.gz': gzip.compress(urlset(courses).encode('utf-8')),
+        '/sitemap-news.xml': urlset([f"{base_url}/news/sports", 'https://elsewhere.edu/programs/art',
+                                     f"{base_url}/programs/business"]),
+        '/': '<html><body><h1>Sitemap College</h1></body></html>',
+        '/courses/nursing': '<html><body><ul class="programs"><li>Nursing</li></ul></body></html>',
+        '/courses/physics': '<html><body><ul class="programs"><li>Physics</li></ul></body></html>',
+    })
+    metrics = MetricsRegistry()
+    try:
+        scraper = CollegeScraper(cache_dir=None, metrics=metrics)
+        found = SitemapDiscovery(scraper).discover(base_url + '/', limit=10)
+        record = scraper.scrape_college_deep(base_url + '/', max_depth=0, use_sitemaps=True)
+        # Sitemap files share the page byte budget machinery: an oversized one is dropped
+        assert scraper.fetch_resource(f"{base_url}/sitemap_index.xml", max_bytes=64) is None
+    finally:
+        server.shutdown()
+
+    # Course sitemap first, disallowed and off-site URLs dropped
+    assert found == [f"{base_url}/courses/nursing", f"{base_url}/courses/physics",
+                     f"{base_url}/programs/business"]
+    assert record['name'] == 'Sitemap College'
+    assert record['programs'] == ['Nursing', 'Physics']
+    robots = metrics.get(f"{base_url}/robots.txt")
+    assert robots['status'] == 200 and robots['body_bytes'] > 0
+    print(f"✓ sitemap discovery: {len(found)} course pages from robots.txt and sitemaps")
+
+
+def test_retry_backoff_and_circuit_breaker():
+    """Transient errors are retried (honouring Retry-After), 404s are not, and dead hosts fail fast."""
+    import socket
+    from retry_policy import RetryPolicy, CircuitBreaker, parse_retry_after
+
+    pages = {
+        '/flaky': [(503, {'Retry-After': '0'}, 'busy'), (429, {}, 'slow down'), PAGE.format(name='Flaky College')],
+    }
+    server, base_url, stats = start_local_server(pages)
+    policy = RetryPolicy(max_retries=3, backoff_base=0.01, connect_timeout=1, read_timeout=2)
+    try:
+        scraper = CollegeScraper(cache_dir=None, retry_policy=policy, breaker=CircuitBreaker(3, 60))
+        assert scraper.scrape_college(f"{base_url}/flaky")['name'] == 'Flaky College'
+        assert stats['requests'] == 3
+        assert scraper.scrape_college(f"{base_url}/missing") is None
+        assert stats['requests'] == 4  # not retried
+    finally:
+        server.shutdown()
+
+    # Nothing listens on this port: the first URL uses up its attempts, the rest fail fast
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        dead_url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+    start = time.monotonic()
+    results = [scraper.scrape_college(f"{dead_url}/page{i}") for i in range(5)]
+    assert results == [None] * 5
+    assert scraper.breaker.is_open(CollegeScraper._get_domain(dead_url))
+    assert time.monotonic() - start < 2
+
+    for attempt in range(6):
+        assert 0 <= policy.delay(attempt) <= min(policy.backoff_max, 0.01 * 2 ** attempt)
+    assert policy.delay(0, retry_after=120) == policy.backoff_max
+    assert parse_retry_after('7') == 7
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+    assert parse_retry_after('soon') is None
+    print("✓ retry policy: backoff, Retry-After and circuit breaker")
+
+
+def test_circuit_breaker_probe_released_on_unexpected_error():
+    """A half-open probe that dies with a non-request exception doesn't block its host for good."""
+    from retry_policy import CircuitBreaker
+
+    class ExplodingSession:
+        def get(self, url, **kwargs):
+            raise ValueError("bad header value")
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure('http://college.test')
+    scraper = CollegeScraper(cache_dir=None, breaker=breaker)
+    scraper.session = ExplodingSession()
+    try:
+        scraper.fetch_page('http://college.test/courses')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("the session's error should propagate")
+    # The probe slot is free again: the next request is let through as a new probe
+    assert breaker.is_open('http://college.test')
+    assert breaker.allow('http://college.test')
+    assert not breaker.allow('http://college.test')
+    print("✓ circuit breaker: probe released after an unexpected error")
+
+
+def test_connection_pool_reuse_and_compression():
+    """Concurrent scrapes of one host reuse pooled keep-alive connections and decode gzip."""
+    from http_pool import make_session
+
+    pages = {f"/course{i}": PAGE.format(name=f"Course {i}") * 20 for i in range(24)}
+    server, base_url, stats = start_local_server(pages, delay=0.01, compress=True)
+    try:
+        scraper = CollegeScraper(cache_dir=None)
+        scraper.session = make_session(pool_connections=4, pool_maxsize=4)
+        results = dict(scraper.scrape_many([f"{base_url}/course{i}" for i in range(24)], max_concurrency=4))
+    finally:
+        server.shutdown()
+
+    assert stats['gzipped'] == 24
+    assert results[f"{base_url}/course7"]['programs'] == ['Computer Science', 'Engineering', 'Business']
+    usage = scraper.connection_stats()
+    assert usage['requests'] == stats['requests'] == 24
+    # At most one connection per concurrent worker, each reused for the rest of the crawl
+    assert usage['connections'] == stats['connections'] <= 4
+    assert usage['reuse_ratio'] >= 0.8
+    assert list(usage['hosts']) == [base_url]
+    print(f"✓ connection pool: {usage['requests']} requests over {usage['connections']} connections")
+
+
+def test_unwanted_bodies_drained_for_connection_reuse():
+    """Error pages and non-HTML responses are drained, so their keep-alive connection is reused."""
+    pages = {
+        '/gone': (404, {'Content-Type': 'text/html'}, 'not here ' * 200),
+        '/brochure.pdf': (200, {'Content-Type': 'application/pdf'}, '%PDF' * 2000),
+        '/courses': PAGE.format(name='Drained College'),
+    }
+    server, base_url, stats = start_local_server(pages)
+    try:
+        scraper = CollegeScraper(cache_dir=None)
+        assert scraper.scrape_college(f"{base_url}/gone") is None
+        assert scraper.scrape_college(f"{base_url}/brochure.pdf") is None
+        assert scraper.scrape_college(f"{base_url}/courses")['name'] == 'Drained College'
+    finally:
+        server.shutdown()
+
+    assert stats['requests'] == 3
+    assert stats['connections'] == 1
+    assert scraper.connection_stats()['connections'] == 1
+    print("✓ connection pool: unwanted bodies drained, one connection for three responses")
+
+
+def test_bounded_download_and_content_type():
+    """Oversized pages are cut at the byte budget and parsed from their head; non-HTML is refused."""
+    from async_scraper import scrape_urls
+    from scraper import read_bounded
+
+    padding = ''.join(f'<p class="filler">Paragraph {i} of script-heavy page</p>' for i in range(20000))
+    pages = {
+        '/huge': PAGE.format(name='Huge University').replace('</body>', padding + '</body>'),
+        '/prospectus.pdf': (200, {'Content-Type': 'application/pdf'}, '%PDF-1.4 not html'),
+    }
+    server, base_url, stats = start_local_server(pages)
+    try:
+        scraper = CollegeScraper(cache_dir=None, max_page_bytes=16 * 1024)
+        page = scraper.fetch_page(f"{base_url}/huge")
+        huge = scraper.scrape_college(f"{base_url}/huge")
+        pdf = scraper.scrape_college(f"{base_url}/prospectus.pdf")
+        requests_made = stats['requests']
+        async_results = scrape_urls([f"{base_url}/huge", f"{base_url}/prospectus.pdf"], cache_dir=None,
+                                    per_host_delay=0)
+    finally:
+        server.shutdown()
+
+    assert len(pages['/huge']) > 1024 * 1024
+    assert page.truncated and len(page.content) == 16 * 1024
+    assert huge['name'] == 'Huge University'
+    assert huge['programs'] == ['Computer Science', 'Engineering', 'Business']
+    assert pdf is None and requests_made == 3  # refused, not retried
+    assert async_results[f"{base_url}/prospectus.pdf"] is None
+    assert async_results[f"{base_url}/huge"]['name'] == 'Huge University'
+    assert read_bounded([b'abc', b'def'], 4) == (b'abcd', True)
+    assert read_bounded([b'abc', b'def'], 6) == (b'abcdef', False)
+    print(f"✓ bounded download: {len(pages['/huge']) // 1024} KB page parsed from its first 16 KB")
+
+
+RENDER_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'rendered', 'js_catalogue.html')
+
+
+class FakeBrowser:
+    """WebDriver stand-in that 'runs' js_catalogue.html's script by inlining its course data."""
+
+    lock = threading.Lock()
+    in_flight = peak = started = quits = 0
+
+    def __init__(self):
+        with FakeBrowser.lock:
+            FakeBrowser.started += 1
+        self.page_source = None
+
+    def get(self, url):
+        import json
+        import re
+        import urllib.request
+        with FakeBrowser.lock:
+            FakeBrowser.in_flight += 1
+            FakeBrowser.peak = max(FakeBrowser.peak, FakeBrowser.in_flight)
+        try:
+            time.sleep(0.05)
+            if '/slow' in url:
+                raise TimeoutError(f"page load timed out: {url}")
+            html = urllib.request.urlopen(url).read().decode('utf-8')
+            data = re.search(r'<script type="application/json" id="catalogue-data">(.*?)</script>', html, re.S)
+            items = ''.join(f'<li>{name}</li>' for name in json.loads(data.group(1))) if data else ''
+            self.page_source = re.sub(r'<div id="catalogue">.*?</div>',
+                                      f'<div id="catalogue"><ul class="programs">{items}</ul></div>', html, flags=re.S)
+        finally:
+            with FakeBrowser.lock:
+                FakeBrowser.in_flight -= 1
+
+    def quit(self):
+        with FakeBrowser.lock:
+            FakeBrowser.quits += 1
+
+
+def test_renderer_pool_renders_only_empty_pages():
+    """Only pages with no static programs are rendered, within the pool's size, and failures fall back."""
+    from renderer import BrowserPool
+
+    with open(RENDER_FIXTURE, encoding='utf-8') as fh:
+        catalogue = fh.read()
+    pages = {f"/js{i}": catalogue for i in range(6)}
+    pages['/static'] = PAGE.format(name='Static College')
+    pages['/slow'] = catalogue
+    server, base_url, _ = start_local_server(pages)
+    pool = BrowserPool(size=2, settle_time=0, max_pages_per_browser=100, driver_factory=FakeBrowser)
+    try:
+        scraper = CollegeScraper(cache_dir=None, renderer=pool)
+        static_only = CollegeScraper(cache_dir=None)._parse_content(catalogue.encode('utf-8'), base_url + '/js0')
+        urls = [f"{base_url}/js{i}" for i in range(6)] + [f"{base_url}/static", f"{base_url}/slow"]
+        results = dict(scraper.scrape_many(urls, max_concurrency=8))
+    finally:
+        pool.close()
+        server.shutdown()
+
+    assert static_only['programs'] == []
+    assert results[f"{base_url}/js3"]['name'] == 'Summit College'
+    assert results[f"{base_url}/js3"]['programs'][:2] == ['Marine Biology', 'Software Engineering']
+    assert results[f"{base_url}/js3"]['content_hash'] == static_only['content_hash']
+    assert results[f"{base_url}/static"]['programs'] == ['Computer Science', 'Engineering', 'Business']
+    # The timed-out render keeps the static record, and its browser is replaced
+    assert results[f"{base_url}/slow"]['programs'] == []
+    assert FakeBrowser.peak <= 2
+    assert FakeBrowser.started <= 3 and FakeBrowser.quits == FakeBrowser.started
+    print(f"✓ renderer pool: 7 pages rendered by {FakeBrowser.started} browsers, peak {FakeBrowser.peak}")
+
+
+def test_renderer_used_by_pipeline_and_deep_crawl():
+    """The process-pool pipeline and the catalogue crawl render JavaScript-only pages too."""
+    from renderer import BrowserPool
+    from scrape_pipeline import ScrapePipeline
+
+    with open(RENDER_FIXTURE, encoding='utf-8') as fh:
+        catalogue = fh.read()
+    server, base_url, _ = start_local_server({'/js': catalogue, '/static': PAGE.format(name='Static College')})
+    pool = BrowserPool(size=1, settle_time=0, max_pages_per_browser=100, driver_factory=FakeBrowser)
+    try:
+        pipeline = ScrapePipeline(CollegeScraper(cache_dir=None, renderer=pool), fetch_concurrency=2,
+                                  parse_workers=1)
+        results = dict(pipeline.run([f"{base_url}/js", f"{base_url}/static"]))
+        deep = CollegeScraper(cache_dir=None, renderer=pool).scrape_college_deep(
+            f"{base_url}/js", max_depth=1, max_pages=3, use_sitemaps=False)
+    finally:
+        pool.close()
+        server.shutdown()
+
+    assert results[f"{base_url}/js"]['programs'][:2] == ['Marine Biology', 'Software Engineering']
+    assert results[f"{base_url}/static"]['programs'] == ['Computer Science', 'Engineering', 'Business']
+    assert 'Veterinary Nursing' in deep['programs']
+    print("✓ renderer: used by the parse pipeline and the deep crawl")
+
+
+def test_renderer_with_headless_browser():
+    """A real headless browser renders the client-side catalogue fixture (skipped without one)."""
+    from renderer import BrowserPool, renderer_available
+
+    if not renderer_available():
+        print("- headless browser test skipped: no selenium-driven browser available")
+        return
+    with open(RENDER_FIXTURE, encoding='utf-8') as fh:
+        server, base_url, _ = start_local_server({'/courses': fh.read()})
+    try:
+        with BrowserPool(size=1) as pool:
+            record = CollegeScraper(cache_dir=None, renderer=pool).scrape_college(f"{base_url}/courses")
+    finally:
+        server.shutdown()
+    assert record['programs'] == ['Marine Biology', 'Software Engineering', 'Sports Science',
+                                  'Creative Writing', 'Veterinary Nursing']
+    print("✓ headless browser: client-side catalogue rendered")
+
+
+def test_recrawl_scheduler_fetches_only_due_competitors():
+    """Only due URLs are re-fetched; intervals adapt to change, failures back off, priority orders."""
+    from datetime import datetime, timedelta
+    from recrawl_scheduler import RecrawlScheduler
+
+    changed = PAGE.format(name='Alpha College').replace('<li>Business</li>', '<li>Law</li>')
+    pages = {
+        '/alpha': [PAGE.format(name='Alpha College'), changed],
+        '/beta': PAGE.format(name='Beta College'),
+        '/gamma': [PAGE.format(name='Gamma College'), (404, {}, 'gone')],
+    }
+    server, base_url, stats = start_local_server(pages)
+    urls = [f"{base_url}/alpha", f"{base_url}/beta", f"{base_url}/gamma"]
+    start = datetime(2024, 1, 1, 2, 0, 0)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = CollegeDatabase(os.path.join(tmp, 'schedule.db'))
+            scraper = CollegeScraper(cache_dir=None)
+            fetched = []
+
+            def fetch(batch):
+                fetched.append(list(batch))
+                return dict(scraper.scrape_many(batch))
+
+            scheduler = RecrawlScheduler(db, default_interval=24, min_interval=6, max_interval=96,
+                                         failure_backoff=1)
+            first = scheduler.refresh(urls, fetch, now=start)
+            # Nothing is due an hour later: no requests, answers come from the stored records
+            second = scheduler.refresh(urls, fetch, now=start + timedelta(hours=1))
+            assert fetched == [urls] and stats['requests'] == 3
+            assert second == first
+
+            third = scheduler.refresh(urls, fetch, now=start + timedelta(hours=25))
+            schedule = db.get_crawl_schedule()
+            assert third[urls[0]]['programs'] == ['Computer Science', 'Engineering', 'Law']
+            assert schedule[urls[0]]['interval_hours'] == 12 and schedule[urls[0]]['changes'] == 1
+            assert schedule[urls[1]]['interval_hours'] == 48 and schedule[urls[1]]['checks'] == 2
+            # Gamma failed: it keeps its last good record and is retried in an hour
+            assert third[urls[2]]['name'] == 'Gamma College'
+            assert schedule[urls[2]]['failures'] == 1
+            assert schedule[urls[2]]['next_due'] == '2024-01-02 04:00:00'
+
+            # Due URLs are ordered by competition score and capped per run
+            scheduler.set_priority(urls[1], 0.9)
+            scheduler.set_priority(urls[2], 0.4)
+            later = start + timedelta(hours=100)
+            assert scheduler.due(urls, later) == [urls[1], urls[2], urls[0]]
+            scheduler.max_per_run = 1
+            assert scheduler.due(urls + [f"{base_url}/new"], later) == [f"{base_url}/new", urls[1]]
+            # A full refresh fetches everything regardless of schedule
+            scheduler.refresh(urls, fetch, full=True, now=start + timedelta(hours=26))
+            assert fetched[-1] == urls
+
+            # A URL that has never been fetched successfully backs off too
+            broken = f"{base_url}/broken"
+            assert scheduler.refresh([broken], lambda batch: {}, now=later) == {broken: None}
+            assert scheduler.due([broken], later + timedelta(minutes=30)) == []
+            assert scheduler.due([broken], later + timedelta(hours=1)) == [broken]
+    finally:
+        server.shutdown()
+    print(f"✓ recrawl scheduler: {stats['requests']} fetches over 4 runs, due order by priority")
+
+
+def test_scrape_metrics_registry():
+    """Per-URL phase timings, bytes, retries and winning strategy are recorded and exported."""
+    import json
+    from retry_policy import RetryPolicy
+    from scrape_metrics import MetricsRegistry
+
+    pages = {
+        '/one': PAGE.format(name='One College'),
+        '/two': PAGE.format(name='Two College'),
+        '/flaky': [(503, {'Retry-After': '0'}, 'busy'), PAGE.format(name='Flaky College')],
+    }
+    server, base_url, _ = start_local_server(pages, compress=True)
+    metrics = MetricsRegistry()
+    try:
+        scraper = CollegeScraper(cache_dir=None, metrics=metrics, retry_policy=RetryPolicy(backoff_base=0))
+        urls = [f"{base_url}/one", f"{base_url}/two", f"{base_url}/flaky"]
+        results = dict(scraper.scrape_many(urls, max_concurrency=1))
+        # Parsing in worker processes still reports parse and strategy timings
+        piped = MetricsRegistry()
+        pipeline_scraper = CollegeScraper(cache_dir=None, metrics=piped)
+        dict(pipeline_scraper.scrape_many([f"{base_url}/one"], parse_workers=1))
+    finally:
+        server.shutdown()
+
+    assert all(results.values())
+    one, two, flaky = (metrics.get(url) for url in urls)
+    # One keep-alive connection: only the first request pays for connecting
+    assert one['timings']['connect'] > 0 and 'connect' not in two['timings']
+    for name in ('ttfb', 'download', 'fetch', 'parse', 'strategy.domain_rules', 'strategy.selectors'):
+        assert one['timings'][name] >= 0, name
+    assert one['strategy'] == 'selectors' and one['status'] == 200 and one['source'] == 'network'
+    # Gzipped on the wire, so fewer bytes transferred than decoded
+    assert 0 < one['bytes'] < one['body_bytes']
+    assert flaky['requests'] == 2 and flaky['retries'] == 1
+
+    summary = metrics.summary()
+    assert summary['urls'] == 3 and summary['retries'] == 1
+    assert summary['strategy_wins'] == {'selectors': 3}
+    assert summary['phases']['ttfb']['count'] == 3
+    assert 'programs found by: selectors (3)' in metrics.format_summary()
+    exported = json.loads(metrics.to_json())
+    assert len(exported['urls']) == 3 and exported['summary']['requests'] == 4
+
+    piped_entry = piped.get(f"{base_url}/one")
+    assert piped_entry['strategy'] == 'selectors' and 'parse' in piped_entry['timings']
+    assert 'fetch' in piped_entry['timings']
+    print(f"✓ scrape metrics: {summary['requests']} requests, "
+          f"mean TTFB {summary['phases']['ttfb']['mean'] * 1000:.1f} ms")
+
+
+def test_metrics_registry_bounded_and_swappable():
+    """Old URL entries fold into per-host totals past the cap, and the default registry can be swapped."""
+    from scrape_metrics import (MetricsRegistry, OTHER_HOSTS, get_default_metrics, set_default_metrics)
+
+    metrics = MetricsRegistry(max_urls=3, max_hosts=2)
+    for i in range(10):
+        url = f"https://host{i % 4}.edu/course{i}"
+        metrics.add_time(url, 'fetch', 0.5)
+        metrics.count(url, 'requests')
+        metrics.set(url, strategy='selectors')
+    assert len(metrics) == 3
+    assert [e['url'] for e in metrics.entries()] == [f"https://host{i % 4}.edu/course{i}" for i in (7, 8, 9)]
+    summary = metrics.summary()
+    # Totals still cover every URL; folded hosts beyond the cap share one label
+    assert summary['urls'] == 10 and summary['folded_urls'] == 7 and summary['requests'] == 10
+    assert summary['strategy_wins'] == {'selectors': 10}
+    assert sum(host['urls'] for host in summary['slowest_hosts'].values()) == 10
+    assert len(metrics._folded) == 3 and OTHER_HOSTS in metrics._folded
+    metrics.reset()
+    assert len(metrics) == 0 and metrics.summary()['urls'] == 0
+
+    fresh = MetricsRegistry()
+    previous = set_default_metrics(fresh)
+    try:
+        assert CollegeScraper(cache_dir=None).metrics is fresh
+    finally:
+        set_default_metrics(previous)
+    assert get_default_metrics() is previous
+    print("✓ scrape metrics: bounded per-URL entries, swappable default registry")
+
+
+if __name__ == '__main__':
+    test_scrape_many_bounded_concurrency()
+    test_async_scraper_per_host_limits()
+    test_async_scraper_survives_one_failing_page()
+    test_async_scrape_urls_reraises_from_running_loop()
+    test_response_cache_revalidation()
+    test_response_cache_lru_eviction()
+    test_unchanged_content_reuses_stored_record()
+    test_course_matcher_second_run_skips_unchanged_parse()
+    test_analyze_competitors_stores_in_batches()
+    test_parser_backends_agree_on_fixtures()
+    test_extraction_strategy_priority()
+    test_dedupe_programs_normalises_consistently()
+    test_pipeline_parses_in_worker_processes()
+    test_domain_registry_lookup_and_overrides()
+    test_page_archive_record_and_replay()
+    test_deep_crawl_follows_catalogue_links()
+    test_sitemap_discovery_targets_course_pages()
+    test_retry_backoff_and_circuit_breaker()
+    test_circuit_breaker_probe_released_on_unexpected_error()
+    test_connection_pool_reuse_and_compression()
+    test_unwanted_bodies_drained_for_connection_reuse()
+    test_bounded_download_and_content_type()
+    test_renderer_pool_renders_only_empty_pages()
+    test_renderer_used_by_pipeline_and_deep_crawl()
+    test_renderer_with_headless_browser()
+    test_recrawl_scheduler_fetches_only_due_competitors()
+    test_scrape_metrics_registry()
+    test_metrics_registry_bounded_and_swappable()